@@ -0,0 +1,43 @@
+"""Conditional GET (ETag / If-None-Match) and Cache-Control for public read endpoints."""
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def etag_for(*parts) -> str:
+    """Strong ETag from a data version token (or any JSON-serializable content)."""
+    raw = json.dumps(jsonable_encoder(parts), separators=(",", ":"), sort_keys=True)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_control(max_age: int, stale_while_revalidate: int = 0) -> str:
+    value = f"public, max-age={max_age}"
+    if stale_while_revalidate:
+        value += f", stale-while-revalidate={stale_while_revalidate}"
+    return value
+
+
+def conditional_json(request: Request, etag: str, build_payload, cache_control_value: str) -> Response:
+    """304 if the client already has `etag`, else JSON from build_payload() (built only when needed)."""
+    headers = {"ETag": etag, "Cache-Control": cache_control_value}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(build_payload()), headers=headers)
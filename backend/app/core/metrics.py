@@ -0,0 +1,291 @@
+"""Prometheus-style metrics without external dependencies (text format 0.0.4 on /metrics).
+
+Counters and histograms live in process memory; recording is a dict update under a
+lock (no I/O on the hot path). With several uvicorn workers (WEB_CONCURRENCY > 1)
+each process also writes its values to METRICS_DIR/<pid>.json — at most every
+METRICS_FLUSH_SECONDS, on scrape and on shutdown — and /metrics, whichever worker
+serves it, sums the files of all processes. Counters of exited workers stay in the
+sum; per-process gauges (`pid` label) are dropped once the process is gone.
+
+Gauges that describe shared state (e-mail queue depth) are computed at scrape time.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+from time import monotonic, perf_counter
+
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1") or 1), 1)
+# uvicorn-Worker haben denselben Elternprozess: ein Verzeichnis pro Server-Start
+METRICS_DIR = os.getenv("METRICS_DIR") or os.path.join(tempfile.gettempdir(), f"carwash-metrics-{os.getppid()}")
+METRICS_MULTIPROCESS = WEB_CONCURRENCY > 1 or bool(os.getenv("METRICS_DIR"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labelnames: tuple[str, ...], labels: dict) -> tuple[str, ...]:
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(total: dict, values: dict) -> None:
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+
+    def samples(self, values: dict):
+        for key, value in sorted(values.items()):
+            yield self.name, json.loads(key), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values: dict[tuple[str, ...], list[float]] = {}  # [count per bucket..., +Inf, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            entry[index] += 1
+            entry[-1] += value
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {json.dumps(key): list(entry) for key, entry in self._values.items()}
+
+    @staticmethod
+    def merge(total: dict, values: dict) -> None:
+        for key, entry in values.items():
+            current = total.setdefault(key, [0] * len(entry))
+            for i, value in enumerate(entry):
+                current[i] += value
+
+    def samples(self, values: dict):
+        for key, entry in sorted(values.items()):
+            labels = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                cumulative += count
+                yield self.name + "_bucket", labels + ["+Inf" if bound == float("inf") else repr(bound)], cumulative
+            yield self.name + "_count", labels, cumulative
+            yield self.name + "_sum", labels, entry[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._collectors = []  # callables -> [(name, doc, labelnames, [(labels, value), ...]), ...]
+        self._last_flush = 0.0
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func):
+        """Register a scrape-time callable returning gauge families (used as decorator)."""
+        self._collectors.append(func)
+        return func
+
+    # --- mehrere Prozesse ---
+    def _dump(self) -> dict:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def flush(self, force: bool = False) -> None:
+        """Write this process's values for the other workers (no-op with one process)."""
+        if not METRICS_MULTIPROCESS:
+            return
+        now = monotonic()
+        if not force and now - self._last_flush < METRICS_FLUSH_SECONDS:
+            return
+        self._last_flush = now
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"metrics": self._dump(), "gauges": self._collect(per_process=True)}, f)
+        os.replace(tmp, path)
+
+    def _read_all(self) -> list[dict]:
+        if not METRICS_MULTIPROCESS:
+            return [{"metrics": self._dump(), "gauges": self._collect(per_process=True)}]
+        self.flush(force=True)
+        states = []
+        for filename in os.listdir(METRICS_DIR):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, filename), encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _alive(int(filename[:-5])):
+                state["gauges"] = []
+            states.append(state)
+        return states
+
+    def _collect(self, per_process: bool) -> list:
+        families = []
+        for func in self._collectors:
+            if getattr(func, "per_process", False) == per_process:
+                families.extend(func())
+        return families
+
+    # --- Ausgabe ---
+    def render(self) -> str:
+        states = self._read_all()
+        lines = []
+        for name, metric in self._metrics.items():
+            total = {}
+            for state in states:
+                metric.merge(total, state["metrics"].get(name, {}))
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            labelnames = metric.labelnames + (("le",) if metric.type == "histogram" else ())
+            for sample_name, labels, value in metric.samples(total):
+                names = labelnames if sample_name.endswith("_bucket") else metric.labelnames
+                lines.append(_sample(sample_name, names, labels, value))
+
+        gauges = {}
+        for state in states:
+            for name, documentation, labelnames, samples in state["gauges"]:
+                gauges.setdefault(name, (documentation, labelnames, []))[2].extend(samples)
+        for name, documentation, labelnames, samples in self._collect(per_process=False):
+            gauges.setdefault(name, (documentation, labelnames, []))[2].extend(samples)
+        for name, (documentation, labelnames, samples) in gauges.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(_sample(name, labelnames, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name: str, labelnames, labels, value) -> str:
+    if labelnames:
+        rendered = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(labelnames, labels))
+        name = f"{name}{{{rendered}}}"
+    return f"{name} {int(value)}" if value == int(value) else f"{name} {float(value)!r}"
+
+
+def per_process(func):
+    """Mark a collector as describing this process (pid label, summed over live workers)."""
+    func.per_process = True
+    return func
+
+
+def process_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource  # max RSS (KiB on Linux) where /proc is unavailable
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status.", ["method", "route", "status"]
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ["method", "route"]
+)
+# created / overlap / outside_hours / rejected (booking_service), rate_limited (rate_limit)
+booking_attempts = registry.counter("booking_attempts_total", "Booking attempts by outcome.", ["outcome"])
+
+
+class MetricsMiddleware:
+    """Pure ASGI: counts and times each request under its route template (/public/cancel/{token})."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # FastAPI legt die gefundene Route in den Scope; unbekannte Pfade nicht einzeln zählen
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_requests.inc(method=scope["method"], route=route, status=status)
+            http_request_duration.observe(perf_counter() - started, method=scope["method"], route=route)
+            registry.flush()
+
+
+@registry.collector
+@per_process
+def _process_metrics():
+    from app.db.pool import pool_stats
+    from app.db.session import async_engine, engine
+
+    pid = str(os.getpid())
+    pools = [("sync", pool_stats(engine)), ("async", pool_stats(async_engine.sync_engine))]
+    return [
+        ("process_resident_memory_bytes", "Resident memory per worker process.", ["pid"],
+         [([pid], process_memory_bytes())]),
+        ("db_pool_size", "Configured pool size.", ["pid", "pool"],
+         [([pid, name], stats.get("size", 0)) for name, stats in pools]),
+        ("db_pool_checked_out", "Connections currently checked out.", ["pid", "pool"],
+         [([pid, name], stats.get("checked_out", 0)) for name, stats in pools]),
+        ("db_pool_overflow", "Connections above pool_size.", ["pid", "pool"],
+         [([pid, name], max(stats.get("overflow", 0), 0)) for name, stats in pools]),
+        ("db_pool_checkout_timeouts", "Checkout timeouts since process start.", ["pid", "pool"],
+         [([pid, name], stats.get("timeouts", 0)) for name, stats in pools]),
+    ]
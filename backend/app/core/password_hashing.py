@@ -0,0 +1,72 @@
+"""Password hashing (passlib pbkdf2_sha256) and its offloading for /auth/login.
+
+pbkdf2 costs ~10-30 ms of pure CPU per call. In the login handler it runs in a small
+process pool, so a burst of logins neither holds the GIL nor blocks other requests.
+A semaphore caps how many hashes are in flight at once. This module only imports
+passlib, so pool workers start quickly.
+
+PASSWORD_HASH_ROUNDS sets the pbkdf2 cost. Hashes with fewer rounds are flagged by
+verify_and_update and transparently re-hashed on the next successful login.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from weakref import WeakKeyDictionary
+
+import anyio
+from passlib.context import CryptContext
+
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# 0 = no process pool (hash in a worker thread), e.g. where multiprocessing is unavailable
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "4"))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+_executor: ProcessPoolExecutor | None = None
+# asyncio.Semaphore is bound to one event loop (tests run several)
+_semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    # module-level function: executed inside the pool worker process
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except (ValueError, TypeError):
+        # empty / unknown hash format: treat like a wrong password
+        return False, None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: the app process has threads (uvicorn, pools), fork would copy their locks
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """(valid, new_hash or None) without blocking the event loop; new_hash means: store it."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+    async with semaphore:
+        if PASSWORD_HASH_WORKERS <= 0:
+            return await anyio.to_thread.run_sync(_verify_and_update, plain_password, hashed_password)
+        return await loop.run_in_executor(_get_executor(), _verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
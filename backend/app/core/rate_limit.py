@@ -1,26 +1,259 @@
-"""Simple in-memory rate limit for public booking (per IP)."""
-from collections import defaultdict
+"""Rate limits: sliding-window counters with a pluggable backend.
+
+Each (bucket, key) keeps two fixed-window counters (current and previous window); the
+estimate is previous * (unused part of the window) + current. This is O(1) memory per
+key and close to an exact sliding log.
+
+Backends (RATE_LIMIT_BACKEND):
+  memory   — per process, LRU-bounded to RATE_LIMIT_MAX_KEYS idle keys (default);
+  database — rate_limit_counters table, shared by all uvicorn workers, so the limit is
+             the real limit and not limit x WEB_CONCURRENCY.
+
+Usage: `dependencies=[Depends(rate_limit("cancel", 30, 60))]` on a route, or the
+limiter methods directly (login failures are only counted when the password is wrong).
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
 from time import time
-from fastapi import Request, HTTPException
 
-# ip -> list of timestamps (last 60 seconds)
-_booking_attempts = defaultdict(list)
-_WINDOW = 60  # seconds
-_MAX_PER_WINDOW = 20
+from fastapi import HTTPException, Request
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.metrics import booking_attempts, registry
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+# Public booking per IP
+BOOKING_WINDOW = 60  # seconds
+BOOKING_MAX_PER_WINDOW = 20
+
+# Cancel links per IP (token guessing)
+CANCEL_WINDOW = 60
+CANCEL_MAX_PER_WINDOW = int(os.getenv("CANCEL_MAX_PER_WINDOW", "30"))
+
+# Login: all attempts per IP, failed attempts per username
+LOGIN_WINDOW = int(os.getenv("LOGIN_RATE_WINDOW", "300"))
+LOGIN_MAX_PER_IP = int(os.getenv("LOGIN_MAX_PER_IP", "30"))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
 
+# Reverse proxies in front of the app that append to X-Forwarded-For (render.yaml: 1).
+# 0 (default, no proxy) = ignore the header, it is client-controlled; use the socket address.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
 
-def get_client_ip(request: Request) -> str:
+
+def get_client_ip(request: Request, trusted_hops: int | None = None) -> str:
+    # Слева в X-Forwarded-For — то, что прислал клиент (подделывается); справа — адреса,
+    # дописанные нашими прокси. Берём адрес, который добавил самый внешний доверенный прокси.
+    hops = TRUSTED_PROXY_HOPS if trusted_hops is None else trusted_hops
     forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host or "unknown"
-
-
-def check_booking_rate_limit(request: Request) -> None:
-    ip = get_client_ip(request)
-    now = time()
-    # keep only last window
-    _booking_attempts[ip] = [t for t in _booking_attempts[ip] if now - t < _WINDOW]
-    if len(_booking_attempts[ip]) >= _MAX_PER_WINDOW:
-        raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
-    _booking_attempts[ip].append(now)
+    if forwarded and hops > 0:
+        addresses = [part.strip() for part in forwarded.split(",") if part.strip()]
+        if addresses:
+            return addresses[-min(hops, len(addresses))]
+    return (request.client.host if request.client else None) or "unknown"
+
+
+def _window_start(now: float, window: int) -> int:
+    return int(now // window * window)
+
+
+def _estimate(now: float, window: int, current_start: int, current: int, previous: int) -> float:
+    unused = 1 - (now - current_start) / window
+    return previous * unused + current
+
+
+# -------------------------------------------------
+# Backends
+# -------------------------------------------------
+class MemoryBackend:
+    """Per-process counters; least recently used keys are evicted above max_keys."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._max_keys = max_keys
+        self._entries: "OrderedDict[tuple[str, str], list[int]]" = OrderedDict()  # [start, current, previous]
+        self._lock = threading.Lock()
+
+    def _entry(self, bucket: str, key: str, window: int, now: float) -> list[int]:
+        # caller holds _lock
+        start = _window_start(now, window)
+        entry = self._entries.get((bucket, key))
+        if entry is None:
+            entry = [start, 0, 0]
+            self._entries[(bucket, key)] = entry
+            while len(self._entries) > self._max_keys:
+                self._entries.popitem(last=False)
+        elif entry[0] != start:
+            entry[2] = entry[1] if start - entry[0] == window else 0
+            entry[0], entry[1] = start, 0
+        self._entries.move_to_end((bucket, key))
+        return entry
+
+    def count(self, bucket: str, key: str, window: int, now: float) -> float:
+        with self._lock:
+            if (bucket, key) not in self._entries:
+                return 0
+            start, current, previous = self._entry(bucket, key, window, now)
+            return _estimate(now, window, start, current, previous)
+
+    def incr(self, bucket: str, key: str, window: int, now: float) -> float:
+        with self._lock:
+            entry = self._entry(bucket, key, window, now)
+            entry[1] += 1
+            return _estimate(now, window, *entry)
+
+    def reset(self, bucket: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((bucket, key), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseBackend:
+    """Counters in rate_limit_counters (one row per key and window), shared across workers."""
+
+    CLEANUP_EVERY = 500  # incr calls between deletes of expired rows
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from app.db.session import engine
+        from app.models.rate_limit import RateLimitCounter
+
+        self._engine = engine
+        self._table = RateLimitCounter.__table__
+        self._insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        self._calls = 0
+
+    def _read(self, conn, bucket: str, key: str, window: int, now: float) -> float:
+        start = _window_start(now, window)
+        t = self._table
+        rows = dict(conn.execute(
+            select(t.c.window_start, t.c.count).where(
+                t.c.bucket == bucket, t.c.key == key, t.c.window_start.in_((start, start - window))
+            )
+        ).all())
+        return _estimate(now, window, start, rows.get(start, 0), rows.get(start - window, 0))
+
+    def count(self, bucket: str, key: str, window: int, now: float) -> float:
+        with self._engine.connect() as conn:
+            return self._read(conn, bucket, key, window, now)
+
+    def incr(self, bucket: str, key: str, window: int, now: float) -> float:
+        start = _window_start(now, window)
+        t = self._table
+        stmt = self._insert(t).values(
+            bucket=bucket, key=key, window_start=start, count=1, expires_at=start + 2 * window
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.bucket, t.c.key, t.c.window_start],
+            set_={"count": t.c.count + 1},
+        )
+        with self._engine.begin() as conn:
+            conn.execute(stmt)
+            self._calls += 1
+            if self._calls % self.CLEANUP_EVERY == 0:
+                conn.execute(delete(t).where(t.c.expires_at < int(now)))
+            return self._read(conn, bucket, key, window, now)
+
+    def reset(self, bucket: str, key: str) -> None:
+        t = self._table
+        with self._engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.bucket == bucket, t.c.key == key))
+
+
+# -------------------------------------------------
+# Limiter
+# -------------------------------------------------
+rate_limited = registry.counter("rate_limited_total", "Requests rejected with 429 by bucket.", ["bucket"])
+
+
+class RateLimiter:
+    def __init__(self, backend, clock=time):
+        self.backend = backend
+        self._clock = clock
+
+    def _too_many(self, window: int, estimate: float, limit: int) -> HTTPException:
+        # грубая оценка: через сколько секунд оценка опустится ниже лимита
+        retry_after = max(1, math.ceil(window * (estimate - limit + 1) / max(estimate, 1)))
+        return HTTPException(
+            status_code=429,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(min(retry_after, window))},
+        )
+
+    def hit(self, bucket: str, key: str, limit: int, window: int) -> None:
+        """Count one request; 429 if it exceeds `limit` per sliding `window` seconds."""
+        estimate = self.backend.incr(bucket, key, window, self._clock())
+        if estimate > limit:
+            rate_limited.inc(bucket=bucket)
+            raise self._too_many(window, estimate, limit)
+
+    def check(self, bucket: str, key: str, limit: int, window: int) -> None:
+        """429 if the counter is already at `limit`; does not count this request."""
+        estimate = self.backend.count(bucket, key, window, self._clock())
+        if estimate >= limit:
+            rate_limited.inc(bucket=bucket)
+            raise self._too_many(window, estimate + 1, limit)
+
+    def record(self, bucket: str, key: str, window: int) -> None:
+        self.backend.incr(bucket, key, window, self._clock())
+
+    def reset(self, bucket: str, key: str) -> None:
+        self.backend.reset(bucket, key)
+
+
+def _make_backend():
+    if RATE_LIMIT_BACKEND == "database":
+        return DatabaseBackend()
+    if RATE_LIMIT_BACKEND != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+    return MemoryBackend()
+
+
+limiter = RateLimiter(_make_backend())
+
+
+def rate_limit(bucket: str, limit: int, window: int, key_func=get_client_ip):
+    """FastAPI dependency: `limit` requests per `window` seconds per key (client IP by default)."""
+    def dependency(request: Request) -> None:
+        limiter.hit(bucket, key_func(request), limit, window)
+    return dependency
+
+
+_booking_rate_limit = rate_limit("booking", BOOKING_MAX_PER_WINDOW, BOOKING_WINDOW)
+cancel_rate_limit = rate_limit("cancel", CANCEL_MAX_PER_WINDOW, CANCEL_WINDOW)
+login_ip_rate_limit = rate_limit("login_ip", LOGIN_MAX_PER_IP, LOGIN_WINDOW)
+
+
+def booking_rate_limit(request: Request) -> None:
+    # abgewiesene Buchungen erscheinen auch in booking_attempts_total{outcome="rate_limited"}
+    try:
+        _booking_rate_limit(request)
+    except HTTPException:
+        booking_attempts.inc(outcome="rate_limited")
+        raise
+
+
+# -------------------------------------------------
+# Login failures per username
+# -------------------------------------------------
+def _username_key(username: str) -> str:
+    return username.strip().lower()[:255]
+
+
+def check_login_failures(username: str) -> None:
+    """Before the password is checked, so a stuffing burst does not cost any hashing."""
+    limiter.check("login_user", _username_key(username), LOGIN_MAX_FAILURES_PER_USER, LOGIN_WINDOW)
+
+
+def record_login_failure(username: str) -> None:
+    limiter.record("login_user", _username_key(username), LOGIN_WINDOW)
+
+
+def reset_login_failures(username: str) -> None:
+    limiter.reset("login_user", _username_key(username))
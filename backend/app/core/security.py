@@ -1,22 +1,22 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
 
+from app.core.password_hashing import pwd_context
 from app.db.session import get_db
 from app.models.user import User
+from app.services.catalog_cache import VersionedCache
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto"
-)
+# Реестр пользователей для get_current_user: перепроверка версии не чаще раза в N секунд
+AUTH_REGISTRY_RECHECK_SECONDS = float(os.getenv("AUTH_REGISTRY_RECHECK_SECONDS", "5"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -38,11 +38,62 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def create_user_token(user: User) -> str:
+    return create_access_token({
+        "user_id": user.id,
+        "sub": user.username,
+        "role": user.role,
+        "tv": user.token_version or 0,
+    })
+
+
+# 🔐 Реестр пользователей (отзыв токенов)
+@dataclass(frozen=True)
+class CurrentUser:
+    """Что нужно хендлерам от пользователя; ORM-объект (password_hash) грузится отдельно."""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+    token_version: int = 0
+
+
+def _load_users(db: Session) -> dict[int, CurrentUser]:
+    rows = db.query(User.id, User.username, User.role, User.is_active, User.token_version).all()
+    return {row.id: _current_user(row) for row in rows}
+
+
+def _current_user(row) -> CurrentUser:
+    return CurrentUser(
+        id=row.id,
+        username=row.username,
+        role=row.role,
+        is_active=row.is_active is not False,
+        token_version=row.token_version or 0,
+    )
+
+
+# Все пользователи (owner + сотрудники — десятки строк) в памяти процесса. Изменения
+# поднимают версию "users" в cache_versions: этот процесс видит их сразу, остальные
+# uvicorn-воркеры — не позже чем через AUTH_REGISTRY_RECHECK_SECONDS.
+user_registry = VersionedCache("users", _load_users, recheck_seconds=AUTH_REGISTRY_RECHECK_SECONDS)
+
+
+def invalidate_users(db: Session) -> None:
+    """Вызывать в транзакции создания/изменения/удаления пользователя (кэш сбрасывается после commit)."""
+    user_registry.invalidate(db)
+
+
+def revoke_tokens(user: User) -> None:
+    """Все ранее выданные токены пользователя перестают действовать (после commit)."""
+    user.token_version = (user.token_version or 0) + 1
+
+
 # 🔐 Получение текущего пользователя
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-):
+) -> CurrentUser:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = payload.get("user_id")
@@ -51,17 +102,30 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    user = user_registry.get(db).get(user_id)
+    if user is None:
+        # пользователь создан в другом воркере после последней перепроверки реестра
+        row = db.query(
+            User.id, User.username, User.role, User.is_active, User.token_version
+        ).filter(User.id == user_id).first()
+        if not row:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = _current_user(row)
+
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="User is inactive")
+    # токены без "tv" выданы до введения версий и соответствуют версии 0;
+    # "sub": id удалённого сотрудника может достаться новому пользователю (SQLite переиспользует id)
+    if payload.get("tv", 0) != user.token_version or payload.get("sub", user.username) != user.username:
+        raise HTTPException(status_code=401, detail="Token revoked")
 
     return user
 
 
 # 🔐 Проверка роли
 def require_role(required_role: str):
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: CurrentUser = Depends(get_current_user)):
         if current_user.role != required_role:
             raise HTTPException(status_code=403, detail="Forbidden")
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
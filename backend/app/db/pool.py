@@ -0,0 +1,105 @@
+"""Connection pool with wait-time statistics.
+
+QueuePool only tells how many connections are checked out right now; under load the
+interesting number is how long requests wait for one. InstrumentedQueuePool (sync engine)
+and InstrumentedAsyncQueuePool (async engine) time every checkout and keep counters
+(see pool_stats()); slow waits and timeouts are logged.
+"""
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+log = logging.getLogger(__name__)
+
+POOL_WAIT_WARN_MS = float(os.getenv("DB_POOL_WAIT_WARN_MS", "200"))
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited * 1000 >= POOL_WAIT_WARN_MS:
+                self.slow_waits += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "slow_waits": self.slow_waits,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+            }
+
+
+class _TimedCheckout:
+    """Pool mixin that measures how long each checkout waited for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            log.warning("DB pool exhausted: %s", self.status())
+            raise
+        waited = time.perf_counter() - started
+        self.stats.record(waited)
+        if waited * 1000 >= POOL_WAIT_WARN_MS:
+            log.warning("DB pool checkout waited %.0f ms: %s", waited * 1000, self.status())
+        return conn
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    result = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        result.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        result.update(stats.snapshot())
+    return result
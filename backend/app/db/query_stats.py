@@ -0,0 +1,151 @@
+"""Per-request SQL statistics and slow-query logging.
+
+SQLAlchemy cursor events on both engines (sync and async) add every statement to the
+QueryStats of the current request, found through a contextvar. This works for async
+handlers (AsyncSession runs in a greenlet of the same context) and for def handlers
+(the threadpool copies the context; the QueryStats object is shared).
+
+QueryStatsMiddleware creates the QueryStats for each HTTP request and then:
+  - adds `Server-Timing: db;dur=<ms>;desc="<n> queries"` (SERVER_TIMING=0 disables it);
+  - logs one key=value line per request: always with QUERY_STATS_LOG=all, otherwise only
+    when the request ran more than QUERY_COUNT_WARN statements or a slow one.
+
+Every statement slower than SLOW_QUERY_MS is logged with its SQL and the shape of its
+bound parameters (types, never values), inside or outside a request.
+"""
+import logging
+import os
+import re
+from contextvars import ContextVar
+from time import perf_counter
+
+log = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_COUNT_WARN = int(os.getenv("QUERY_COUNT_WARN", "20"))
+QUERY_STATS_LOG = os.getenv("QUERY_STATS_LOG", "slow")  # slow | all
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") not in ("0", "false", "no")
+
+_SQL_LOG_CHARS = 2000
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    __slots__ = ("count", "total_ms", "slowest_ms", "slowest_sql")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ""
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _current.get()
+
+
+def _one_line(statement: str, limit: int = _SQL_LOG_CHARS) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()[:limit]
+
+
+def param_shape(parameters, executemany: bool = False):
+    """Types of the bound parameters, e.g. {'id_1': 'int'} or '500 x (str, int)'."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return f"{len(parameters)} x {param_shape(parameters[0]) if parameters else '()'}"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+# -------------------------------------------------
+# Engine events
+# -------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (perf_counter() - conn.info["query_start"].pop()) * 1000
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        log.warning(
+            "slow_query duration_ms=%.1f params=%s sql=%s",
+            elapsed_ms, param_shape(parameters, executemany), _one_line(statement),
+        )
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for a failed statement
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def install(engine) -> None:
+    """Attach the statement hooks to a (sync) Engine; for AsyncEngine pass .sync_engine."""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# -------------------------------------------------
+# Middleware
+# -------------------------------------------------
+class QueryStatsMiddleware:
+    """Pure ASGI middleware (no extra task per request, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    headers.append((
+                        b"server-timing",
+                        f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'.encode("latin-1"),
+                    ))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            duration_ms = (perf_counter() - started) * 1000
+            noisy = stats.count > QUERY_COUNT_WARN or stats.slowest_ms >= SLOW_QUERY_MS
+            if noisy or QUERY_STATS_LOG == "all":
+                log.log(
+                    logging.WARNING if noisy else logging.INFO,
+                    "request method=%s path=%s status=%s duration_ms=%.1f db_queries=%d db_ms=%.1f "
+                    "slowest_ms=%.1f slowest_sql=%s",
+                    scope["method"], scope["path"], status, duration_ms, stats.count, stats.total_ms,
+                    stats.slowest_ms, _one_line(stats.slowest_sql, 200),
+                )
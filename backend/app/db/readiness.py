@@ -0,0 +1,100 @@
+"""Cached database readiness for /readyz.
+
+A background thread runs `SELECT 1` every READINESS_INTERVAL seconds and stores the
+result; /readyz only reads it, so frequent probes cost no query and no pool slot.
+The check counts as failed when it takes longer than READINESS_TIMEOUT (on PostgreSQL
+also enforced with statement_timeout) or when the last result is older than
+interval + timeout — a check hanging on an exhausted pool or a dead connection turns
+the service "not ready" instead of blocking the probe.
+
+Liveness (/livez) never looks at this: a slow database makes the instance not ready,
+it must not make the platform restart it.
+"""
+import logging
+import os
+import threading
+from time import monotonic
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+log = logging.getLogger(__name__)
+
+READINESS_INTERVAL = float(os.getenv("READINESS_INTERVAL", "10"))
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+
+
+class ReadinessCheck:
+    def __init__(self, engine=engine, interval: float = READINESS_INTERVAL, timeout: float = READINESS_TIMEOUT,
+                 clock=monotonic):
+        self._engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ok = False
+        self._error = "not checked yet"
+        self._latency_ms: float | None = None
+        self._checked_at: float | None = None
+        self._running_since: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check(self) -> bool:
+        """Run one database round trip and store the result (blocking; background thread only)."""
+        started = self._clock()
+        with self._lock:
+            self._running_since = started
+        ok, error = True, None
+        try:
+            with self._engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    conn.execute(text(f"SET LOCAL statement_timeout = {int(self.timeout * 1000)}"))
+                conn.execute(text("SELECT 1"))
+        except Exception as exc:
+            ok, error = False, type(exc).__name__
+        elapsed = self._clock() - started
+        if ok and elapsed > self.timeout:
+            ok, error = False, "timeout"
+        with self._lock:
+            if ok != self._ok:
+                log.log(logging.INFO if ok else logging.WARNING, "DB readiness: %s", "ok" if ok else error)
+            self._ok, self._error = ok, error
+            self._latency_ms = round(elapsed * 1000, 1)
+            self._checked_at = self._clock()
+            self._running_since = None
+        return ok
+
+    def status(self) -> dict:
+        """Last result without touching the database."""
+        now = self._clock()
+        with self._lock:
+            ok, error = self._ok, self._error
+            if self._running_since is not None and now - self._running_since > self.timeout:
+                ok, error = False, "timeout"
+            elif self._checked_at is None or now - self._checked_at > self.interval + self.timeout:
+                ok, error = False, error or "stale"
+            age = None if self._checked_at is None else round(now - self._checked_at, 1)
+            return {"ready": ok, "error": error, "db_latency_ms": self._latency_ms, "checked_seconds_ago": age}
+
+    # --- Hintergrund-Thread ---
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="db-readiness", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
+
+
+readiness = ReadinessCheck()
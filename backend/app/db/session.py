@@ -1,17 +1,117 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app.db import query_stats
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./crm.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:")
+
+# Тот же URL с async-драйвером (asyncpg / aiosqlite) для публичного API
+if DATABASE_URL.startswith("postgresql://"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL.startswith("sqlite://"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+else:
+    ASYNC_DATABASE_URL = DATABASE_URL
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+# --- Пул соединений ---
+# Каждый uvicorn-воркер (WEB_CONCURRENCY) держит два пула: sync (owner/worker API) и async
+# (публичное API). Если задан DB_MAX_CONNECTIONS (лимит тарифа Postgres), он делится между
+# воркерами, а доля воркера — между пулами (DB_ASYNC_POOL_SHARE у async-пула), так что
+# sync + async всех воркеров не превышают лимит. Без лимита: DB_POOL_SIZE / DB_MAX_OVERFLOW
+# и DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW.
+WEB_CONCURRENCY = max(_int_env("WEB_CONCURRENCY", 1), 1)
+DB_MAX_CONNECTIONS = _int_env("DB_MAX_CONNECTIONS", 0)
+DB_ASYNC_POOL_SHARE = float(os.getenv("DB_ASYNC_POOL_SHARE", "0.5"))
+
+
+def pool_budget(max_connections: int, workers: int, async_share: float) -> dict:
+    """(pool_size, max_overflow) per engine of one worker; 2/3 of a budget stay open."""
+    per_worker = max_connections // workers
+    if per_worker < 2:
+        # каждому пулу нужно хотя бы одно соединение — иначе лимит тарифа будет превышен
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} is too small for WEB_CONCURRENCY={workers}: "
+            f"each worker needs at least 2 connections (sync + async pool)"
+        )
+    async_budget = min(max(round(per_worker * async_share), 1), per_worker - 1)
+    sizes = {}
+    for name, budget in (("sync", per_worker - async_budget), ("async", async_budget)):
+        pool_size = max(budget * 2 // 3, 1)
+        sizes[name] = (pool_size, max(budget - pool_size, 0))
+    return sizes
+
+
+_budget = pool_budget(DB_MAX_CONNECTIONS, WEB_CONCURRENCY, DB_ASYNC_POOL_SHARE) if DB_MAX_CONNECTIONS else {}
+DB_POOL_SIZE = _int_env("DB_POOL_SIZE", _budget["sync"][0] if _budget else 5)
+DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", _budget["sync"][1] if _budget else 10)
+DB_ASYNC_POOL_SIZE = _int_env("DB_ASYNC_POOL_SIZE", _budget["async"][0] if _budget else 5)
+DB_ASYNC_MAX_OVERFLOW = _int_env("DB_ASYNC_MAX_OVERFLOW", _budget["async"][1] if _budget else 10)
+DB_POOL_TIMEOUT = _int_env("DB_POOL_TIMEOUT", 30)
+# Render/облачные БД рвут простаивающие соединения: переоткрываем заранее + pre-ping
+DB_POOL_RECYCLE = _int_env("DB_POOL_RECYCLE", 1800)
+
+
+def _engine_kwargs(poolclass, pool_size: int, max_overflow: int) -> dict:
+    kwargs = {"pool_pre_ping": True}
+    if not IS_SQLITE_MEMORY:
+        kwargs.update(
+            poolclass=poolclass,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
 connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
+if IS_SQLITE:
     connect_args["check_same_thread"] = False
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+engine = create_engine(
+    DATABASE_URL, connect_args=connect_args,
+    **_engine_kwargs(InstrumentedQueuePool, DB_POOL_SIZE, DB_MAX_OVERFLOW),
+)
+# Отдельный пул для async-сессий, со своей долей DB_MAX_CONNECTIONS (см. pool_budget)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_kwargs(InstrumentedAsyncQueuePool, DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW)
+)
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: читатели не блокируют запись; busy_timeout вместо мгновенного "database is locked"
+    cursor = dbapi_connection.cursor()
+    if not IS_SQLITE_MEMORY:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={_int_env('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+
+# Число/время запросов на HTTP-запрос и лог медленных запросов (SLOW_QUERY_MS)
+query_stats.install(engine)
+query_stats.install(async_engine.sync_engine)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# expire_on_commit=False: после commit атрибуты остаются доступны без ленивой загрузки
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -19,4 +119,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,8 @@
 import os
 import logging
-from fastapi import FastAPI
+import secrets
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import time
 from app.core.security import hash_password
@@ -18,7 +20,12 @@ if os.getenv("DATABASE_URL", "").startswith("postgres"):
 app = FastAPI(title="Carwash CRM")
 
 # 🔹 Импорт БД
-from app.db.session import engine, Base, SessionLocal
+from app.db.session import async_engine, engine, Base, SessionLocal
+from app.db.pool import pool_stats
+from app.db.query_stats import QueryStatsMiddleware
+from app.db.readiness import readiness
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry
+from app.core.password_hashing import shutdown_executor
 
 # 🔹 Импорт всех моделей ДО create_all
 from app.models.user import User
@@ -26,12 +33,22 @@ from app.models.booking import Booking
 from app.models.service import Service
 from app.models.settings import BusinessSettings
 from app.models.work_time import WorkTime
+from app.models.cache_version import CacheVersion
+from app.models.booking_stats import DailyBookingStats
+from app.models.customer import Customer
+from app.models.rate_limit import RateLimitCounter
+from app.models.email_outbox import EmailOutbox
+from app.models.scheduler_cursor import SchedulerCursor
 
 # 🔹 Импорт роутеров
 from app.routers.auth import router as auth_router
 from app.routers.owner import router as owner_router
 from app.routers.worker import router as worker_router
 from app.routers.public import router as public_router
+from app.services.catalog_cache import invalidate_services, invalidate_settings
+from app.services.email_outbox import EMAIL_OUTBOX_WORKER, outbox_worker
+from app.services.email_service import templates as email_templates
+from app.services.reminder_scheduler import REMINDER_SCHEDULER, reminder_loop
 
 # 🔹 CORS (localhost + фронт на Render)
 # CORS_ORIGINS через запятую в env. Явно добавляем фронт на Render, чтобы точно не блокировать.
@@ -70,6 +87,11 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# 🔹 Server-Timing (число и время SQL-запросов) + лог медленных запросов, см. app/db/query_stats.py
+app.add_middleware(QueryStatsMiddleware)
+# 🔹 Счётчики и гистограммы для GET /metrics, см. app/core/metrics.py
+app.add_middleware(MetricsMiddleware)
+
 # 🔥 ВАЖНО — create_all должен быть после импорта моделей
 Base.metadata.create_all(bind=engine)
 
@@ -97,6 +119,30 @@ def root():
     return {"status": "CRM backend running"}
 
 
+# 🔹 Liveness (healthCheckPath на Render): процесс отвечает, БД не трогаем —
+# медленная БД не должна приводить к перезапускам
+@app.get("/livez", include_in_schema=False)
+def livez():
+    return {"status": "ok"}
+
+
+# 🔹 Readiness: последний результат фоновой проверки БД (SELECT 1 каждые READINESS_INTERVAL с)
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    status = readiness.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.on_event("startup")
+def start_readiness_check():
+    readiness.start()
+
+
+@app.on_event("shutdown")
+def stop_readiness_check():
+    readiness.stop()
+
+
 # 🔹 Диагностика для деплоя (owner/services созданы?)
 @app.get("/public/health")
 def health_check():
@@ -114,6 +160,83 @@ def health_check():
         db.close()
 
 
+# 🔹 Метрики в формате Prometheus: заголовок Authorization: Bearer <METRICS_TOKEN>.
+# На Render (RENDER=true) без METRICS_TOKEN endpoint выключен (трафик, пул, очередь писем не публичны);
+# локально без токена открыт.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+METRICS_ENABLED = bool(METRICS_TOKEN) or not os.getenv("RENDER")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", "").encode(), f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.on_event("startup")
+def warn_metrics_disabled():
+    if not METRICS_ENABLED:
+        log.warning("METRICS_TOKEN not set. Set it in Render Environment to enable GET /metrics.")
+
+
+@app.on_event("shutdown")
+def flush_metrics():
+    metrics_registry.flush(force=True)
+
+
+# 🔹 Параметры пула соединений в лог (статистика: GET /owner/db-pool)
+@app.on_event("startup")
+def log_db_pool():
+    log.info("DB pool: %s", pool_stats(engine))
+    log.info("DB async pool: %s", pool_stats(async_engine.sync_engine))
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
+
+@app.on_event("shutdown")
+def stop_password_hash_pool():
+    shutdown_executor()
+
+
+# 📩 Письма из email_outbox: поток в процессе приложения (на Render free нет background worker).
+# Отдельным процессом: EMAIL_OUTBOX_WORKER=off и python -m scripts.email_worker
+@app.on_event("startup")
+def load_email_templates():
+    log.info("E-mail templates compiled: %d", email_templates.load())
+
+
+@app.on_event("startup")
+def start_email_outbox_worker():
+    if EMAIL_OUTBOX_WORKER == "thread":
+        outbox_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_email_outbox_worker():
+    outbox_worker.stop()
+
+
+# ⏰ Напоминания о записях (email_outbox). Отдельным процессом: REMINDER_SCHEDULER=off
+# и python -m scripts.reminder_scheduler
+@app.on_event("startup")
+def start_reminder_scheduler():
+    if REMINDER_SCHEDULER == "thread":
+        reminder_loop.start()
+
+
+@app.on_event("shutdown")
+def stop_reminder_scheduler():
+    reminder_loop.stop()
+
+
 # 🔹 Создание первого OWNER при старте (пароль из OWNER_INITIAL_PASSWORD)
 @app.on_event("startup")
 def create_owner():
@@ -158,6 +281,7 @@ def create_default_settings():
                 work_end=time(18, 0)
             )
             db.add(settings)
+            invalidate_settings(db)
             db.commit()
             log.info("Default settings created")
         else:
@@ -188,9 +312,10 @@ def seed_default_services():
             return
         for d in DEFAULT_SERVICES:
             db.add(Service(name=d["name"], price=d["price"], duration=d["duration"], description=d.get("description") or ""))
+        invalidate_services(db)
         db.commit()
         log.info("Default services seeded (%d items)", len(DEFAULT_SERVICES))
     except Exception as e:
         log.exception("Seed services failed: %s", e)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
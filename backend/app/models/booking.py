@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -41,8 +41,19 @@ class Booking(Base):
     marketing_consent = Column(Boolean, default=False, nullable=False)
     marketing_consent_at = Column(DateTime, nullable=True)
 
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True, index=True)
+
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     service = relationship("Service")
-    creator = relationship("User")
\ No newline at end of file
+    creator = relationship("User")
+
+    # Составные индексы под реальные запросы (существующая БД: python -m scripts.migrate_indexes,
+    # проверка планов: python -m scripts.explain_queries)
+    __table_args__ = (
+        # проверка пересечения, загрузка слотов по дням, фильтры по статусу и дате
+        Index("ix_bookings_status_start_end", "status", "start_time", "end_time"),
+        # бронирования сотрудника: /worker/bookings/by-date, /owner/bookings?worker_id=
+        Index("ix_bookings_created_by_start", "created_by", "start_time"),
+    )
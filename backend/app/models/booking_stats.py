@@ -0,0 +1,33 @@
+"""Дневные агрегаты по записям (для аналитики владельца без сканирования bookings)."""
+from sqlalchemy import Column, Integer, String, Date, Index, text
+
+from app.db.session import Base
+
+
+class DailyBookingStats(Base):
+    __tablename__ = "daily_booking_stats"
+
+    id = Column(Integer, primary_key=True)
+
+    # ключ агрегата
+    day = Column(Date, nullable=False)
+    source = Column(String, nullable=False)
+    service_id = Column(Integer, nullable=False)
+    created_by = Column(Integer, nullable=True)
+    status = Column(String, nullable=False)
+
+    bookings = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)  # сумма service_price
+
+    # один ряд на ключ (UPSERT в booking_stats._add); NULL в unique-индексе не совпадает с NULL,
+    # поэтому записи без создателя (сайт) — отдельный частичный индекс
+    __table_args__ = (
+        Index(
+            "ux_daily_booking_stats_key", "day", "status", "source", "service_id", "created_by", unique=True,
+            sqlite_where=text("created_by IS NOT NULL"), postgresql_where=text("created_by IS NOT NULL"),
+        ),
+        Index(
+            "ux_daily_booking_stats_key_no_creator", "day", "status", "source", "service_id", unique=True,
+            sqlite_where=text("created_by IS NULL"), postgresql_where=text("created_by IS NULL"),
+        ),
+    )
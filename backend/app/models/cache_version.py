@@ -0,0 +1,11 @@
+"""Версии кэшируемых данных (настройки, каталог услуг) — общие для всех uvicorn-воркеров."""
+from sqlalchemy import Column, Integer, String
+
+from app.db.session import Base
+
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
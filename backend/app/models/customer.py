@@ -0,0 +1,37 @@
+"""Клиент: нормализованный email/телефон + агрегаты, обновляемые при каждой записи."""
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, text
+from datetime import datetime
+
+from app.db.session import Base
+
+
+class Customer(Base):
+    __tablename__ = "customers"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # последние указанные значения (как в последней записи)
+    name = Column(String, nullable=False)
+    email = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+
+    # ключи поиска: email (если есть), иначе телефон
+    email_normalized = Column(String, nullable=True)
+    phone_normalized = Column(String, nullable=True)
+
+    total_bookings = Column(Integer, nullable=False, default=0)
+    last_booking_at = Column(DateTime, nullable=True, index=True)
+    marketing_consent = Column(Boolean, default=False, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ux_customers_email_normalized", "email_normalized", unique=True),
+        # без email клиент определяется телефоном
+        Index(
+            "ux_customers_phone_normalized_no_email", "phone_normalized", unique=True,
+            sqlite_where=text("email_normalized IS NULL"),
+            postgresql_where=text("email_normalized IS NULL"),
+        ),
+        Index("ix_customers_phone_normalized", "phone_normalized"),
+    )
@@ -0,0 +1,33 @@
+"""Исходящие письма: пишутся в транзакции запроса, отправляются воркером (services/email_outbox)."""
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+
+from app.db.session import Base
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    html_body = Column(Text, nullable=True)  # HTML-часть (multipart/alternative), если есть шаблон .html
+
+    # pending -> sending -> sent; после EMAIL_MAX_ATTEMPTS неудач или постоянной ошибки — dead
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)  # аренда строки воркером (status=sending)
+    last_error = Column(String, nullable=True)
+
+    # одно письмо на событие (например "booking:12:confirmation"), повторная постановка игнорируется
+    dedupe_key = Column(String, unique=True, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,14 @@
+"""Счётчики rate limit по окнам (бэкенд "database" — общий для всех uvicorn-воркеров)."""
+from sqlalchemy import Column, Integer, String
+
+from app.db.session import Base
+
+
+class RateLimitCounter(Base):
+    __tablename__ = "rate_limit_counters"
+
+    bucket = Column(String(32), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    window_start = Column(Integer, primary_key=True)  # unix-время начала окна
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(Integer, nullable=False, index=True)  # после — строка не нужна
@@ -0,0 +1,15 @@
+"""Позиция планировщиков (напоминания): до какой записи очередь уже обработана."""
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.db.session import Base
+
+
+class SchedulerCursor(Base):
+    __tablename__ = "scheduler_cursors"
+
+    name = Column(String, primary_key=True)
+
+    # обработано всё с (start_time, id) <= (position, last_id); дальше — по индексу bookings
+    position = Column(DateTime, nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
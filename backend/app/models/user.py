@@ -10,4 +10,6 @@ class User(Base):
     password_hash = Column(String)
     role = Column(String)  # owner / worker
     is_active = Column(Boolean, default=True)
+    # входит в JWT ("tv"); увеличение отзывает все выданные токены пользователя
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -1,5 +1,5 @@
 """Модель учёта рабочего времени сотрудника."""
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Numeric, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -21,3 +21,8 @@ class WorkTime(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     worker = relationship("User")
+
+    __table_args__ = (
+        # открытая смена (worker_id, date, end_time IS NULL) и список смен сотрудника
+        Index("ix_work_times_worker_date_end", "worker_id", "date", "end_time"),
+    )
@@ -1,25 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
 from app.models.user import User
-from app.core.security import verify_password, create_access_token
+from app.core.password_hashing import pwd_context, verify_and_update_async
+from app.core.rate_limit import (
+    check_login_failures,
+    login_ip_rate_limit,
+    record_login_failure,
+    reset_login_failures,
+)
+from app.core.security import create_user_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/login")
-def login(
+# Для неизвестного логина всё равно считаем хеш: время ответа не выдаёт, есть ли пользователь
+_DUMMY_HASH = pwd_context.hash("not-a-user-password")
+
+
+@router.post("/login", dependencies=[Depends(login_ip_rate_limit)])
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
+    # счётчики могут жить в БД (RATE_LIMIT_BACKEND=database) — не в event loop
+    await run_in_threadpool(check_login_failures, form_data.username)
+
+    user = await db.scalar(select(User).where(User.username == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    # pbkdf2 считается в пуле процессов, event loop и threadpool не блокируются
+    valid, new_hash = await verify_and_update_async(
+        form_data.password, user.password_hash if user and user.password_hash else _DUMMY_HASH
+    )
+    if not user or not valid:
+        await run_in_threadpool(record_login_failure, form_data.username)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    token = create_access_token({
-        "user_id": user.id,
-        "role": user.role
-    })
+    if user.is_active is False:
+        raise HTTPException(status_code=401, detail="User is inactive")
+
+    await run_in_threadpool(reset_login_failures, form_data.username)
+    if new_hash:
+        # параметры хеширования изменились (PASSWORD_HASH_ROUNDS) — пересохраняем
+        user.password_hash = new_hash
+        await db.commit()
+
+    token = create_user_token(user)
 
-    return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": token, "token_type": "bearer"}
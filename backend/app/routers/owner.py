@@ -1,22 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import func, case, or_
 from datetime import datetime, time, timedelta
 from pydantic import BaseModel, Field
 from typing import Optional
 import io
+import tempfile
 
 from openpyxl import Workbook
 
-from app.db.session import get_db
-from app.core.security import require_role, hash_password, verify_password
+from app.db.session import async_engine, engine, get_db
+from app.db.pool import pool_stats
+from app.core.security import (
+    CurrentUser,
+    create_user_token,
+    hash_password,
+    invalidate_users,
+    require_role,
+    revoke_tokens,
+    verify_password,
+)
 from app.models.user import User
 from app.models.service import Service
 from app.models.booking import Booking, BookingSource
 from app.models.settings import BusinessSettings
 from app.models.work_time import WorkTime
-from app.services.email_service import send_cancellation_email
+from app.models.booking_stats import DailyBookingStats
+from app.models.customer import Customer
+from app.services.booking_listing import MAX_PAGE_SIZE, list_bookings_page
+from app.services.booking_service import reschedule_booking_logic, set_booking_status
+from app.services.catalog_cache import get_services, invalidate_services, invalidate_settings
+from app.services.email_service import queue_cancellation_email
 
 router = APIRouter(prefix="/owner", tags=["owner"])
 
@@ -35,19 +50,29 @@ class UpdateWorkerBody(BaseModel):
     work_start: Optional[str] = None
     work_end: Optional[str] = None
     days_off: Optional[list[str]] = None
+    is_active: Optional[bool] = None
 
 
 # =====================================================
 # DASHBOARD
 # =====================================================
 @router.get("/dashboard")
-def owner_dashboard(current_user: User = Depends(require_role("owner"))):
+def owner_dashboard(current_user: CurrentUser = Depends(require_role("owner"))):
     return {
         "message": f"Welcome, {current_user.username}",
         "role": current_user.role
     }
 
 
+@router.get("/db-pool")
+def owner_db_pool(current_user: CurrentUser = Depends(require_role("owner"))):
+    """Состояние пула соединений: checked_out, overflow, ожидание соединения (мс).
+
+    Верхний уровень — sync-пул (роутеры owner/worker/auth), "async" — пул публичного API.
+    """
+    return {**pool_stats(engine), "async": pool_stats(async_engine.sync_engine)}
+
+
 # =====================================================
 # CHANGE PASSWORD (owner)
 # =====================================================
@@ -60,15 +85,20 @@ class ChangePasswordBody(BaseModel):
 def owner_change_password(
     body: ChangePasswordBody,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
-    if not verify_password(body.current_password, current_user.password_hash):
+    # current_user — снимок из кэша, хеш пароля читаем из БД
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user or not verify_password(body.current_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Current password is wrong")
     if len(body.new_password) < 6:
         raise HTTPException(status_code=400, detail="New password must be at least 6 characters")
-    current_user.password_hash = hash_password(body.new_password)
+    user.password_hash = hash_password(body.new_password)
+    # старые сессии (другие устройства) отзываются, текущая получает новый токен
+    revoke_tokens(user)
+    invalidate_users(db)
     db.commit()
-    return {"message": "Password updated"}
+    return {"message": "Password updated", "access_token": create_user_token(user), "token_type": "bearer"}
 
 
 # =====================================================
@@ -79,7 +109,7 @@ def create_worker(
     username: str,
     password: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     existing = db.query(User).filter(User.username == username).first()
     if existing:
@@ -92,6 +122,7 @@ def create_worker(
     )
 
     db.add(worker)
+    invalidate_users(db)
     db.commit()
 
     return {"message": "Worker created", "username": username}
@@ -105,6 +136,7 @@ def _worker_to_response(user: User) -> dict:
     return {
         "id": user.id,
         "username": user.username,
+        "is_active": user.is_active is not False,
         "work_start": getattr(user, "work_start", None),
         "work_end": getattr(user, "work_end", None),
         "days_off": getattr(user, "days_off", []) or [],
@@ -114,7 +146,7 @@ def _worker_to_response(user: User) -> dict:
 @router.get("/workers")
 def list_workers(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     workers = db.query(User).filter(User.role == "worker").all()
     return [_worker_to_response(w) for w in workers]
@@ -124,7 +156,7 @@ def list_workers(
 def create_worker_v2(
     body: CreateWorkerBody,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     existing = db.query(User).filter(User.username == body.username).first()
     if existing:
@@ -135,6 +167,7 @@ def create_worker_v2(
         role="worker",
     )
     db.add(worker)
+    invalidate_users(db)
     db.commit()
     db.refresh(worker)
     return _worker_to_response(worker)
@@ -145,13 +178,21 @@ def update_worker(
     worker_id: int,
     body: UpdateWorkerBody,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     worker = db.query(User).filter(User.id == worker_id, User.role == "worker").first()
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
     if body.password is not None and body.password != "":
         worker.password_hash = hash_password(body.password)
+        revoke_tokens(worker)
+        invalidate_users(db)
+    if body.is_active is not None and body.is_active != (worker.is_active is not False):
+        worker.is_active = body.is_active
+        if not body.is_active:
+            # деактивированный сотрудник теряет все сессии (и после повторной активации)
+            revoke_tokens(worker)
+        invalidate_users(db)
     db.commit()
     db.refresh(worker)
     return _worker_to_response(worker)
@@ -161,12 +202,13 @@ def update_worker(
 def delete_worker(
     worker_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     worker = db.query(User).filter(User.id == worker_id, User.role == "worker").first()
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
     db.delete(worker)
+    invalidate_users(db)
     db.commit()
     return {"message": "Worker deleted"}
 
@@ -181,7 +223,7 @@ def create_service(
     duration: int,
     description: str = "",
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     service = Service(
         name=name,
@@ -191,6 +233,7 @@ def create_service(
     )
 
     db.add(service)
+    invalidate_services(db)
     db.commit()
     db.refresh(service)
 
@@ -200,7 +243,7 @@ def create_service(
 @router.get("/services")
 def list_services(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     return db.query(Service).all()
 
@@ -213,7 +256,7 @@ def update_service(
     duration: Optional[int] = None,
     description: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     service = db.query(Service).filter(Service.id == service_id).first()
     if not service:
@@ -226,6 +269,7 @@ def update_service(
         service.duration = duration
     if description is not None:
         service.description = description
+    invalidate_services(db)
     db.commit()
     db.refresh(service)
     return service
@@ -235,12 +279,13 @@ def update_service(
 def delete_service(
     service_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     service = db.query(Service).filter(Service.id == service_id).first()
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     db.delete(service)
+    invalidate_services(db)
     db.commit()
     return {"message": "Service deleted"}
 
@@ -250,63 +295,40 @@ def delete_service(
 # =====================================================
 @router.get("/bookings")
 def owner_bookings(
+    response: Response,
     from_date: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = None,
     worker_id: Optional[int] = Query(None, alias="worker_id"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
-    q = db.query(Booking)
-    if from_date:
-        try:
-            start = datetime.strptime(from_date, "%Y-%m-%d")
-            q = q.filter(Booking.start_time >= start)
-        except ValueError:
-            pass
-    if to:
-        try:
-            end = datetime.strptime(to, "%Y-%m-%d") + timedelta(days=1)
-            q = q.filter(Booking.start_time < end)
-        except ValueError:
-            pass
-    if worker_id is not None:
-        q = q.filter(Booking.created_by == worker_id)
-    bookings = q.options(joinedload(Booking.service)).order_by(Booking.start_time).all()
-    return [
-        {
-            "id": b.id,
-            "client_name": b.client_name,
-            "phone": b.phone,
-            "email": b.email,
-            "service_id": b.service_id,
-            "service_price": b.service_price,
-            "service_name": b.service.name if b.service else None,
-            "start_time": b.start_time,
-            "end_time": b.end_time,
-            "status": b.status,
-            "source": b.source,
-            "created_by": b.created_by,
-        }
-        for b in bookings
-    ]
+    """Список записей по (start_time, id); без limit/cursor — весь диапазон, иначе страница и X-Next-Cursor → ?cursor=."""
+    rows, next_cursor = list_bookings_page(
+        db, from_date=from_date, to=to, worker_id=worker_id,
+        cursor=cursor, limit=limit, fields=fields,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 
 @router.post("/bookings/{booking_id}/cancel")
 def owner_cancel_booking(
     booking_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     if str(booking.status) == "cancelled":
         raise HTTPException(status_code=400, detail="Already canceled")
-    booking.status = "cancelled"
-    db.commit()
-    if booking.email and booking.source != BookingSource.worker:
-        background_tasks.add_task(send_cancellation_email, booking)
+    if booking.source != BookingSource.worker:
+        queue_cancellation_email(db, booking)  # commit — в set_booking_status
+    set_booking_status(db, booking, "cancelled")
     return {"message": "Booking canceled"}
 
 
@@ -319,7 +341,7 @@ def owner_reschedule_booking(
     booking_id: int,
     body: RescheduleBody,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not booking:
@@ -327,33 +349,7 @@ def owner_reschedule_booking(
     if str(booking.status) == "cancelled":
         raise HTTPException(status_code=400, detail="Cannot reschedule canceled booking")
     start_time = datetime.fromisoformat(body.start_time.replace("Z", "+00:00"))
-    if start_time.tzinfo:
-        start_time = start_time.replace(tzinfo=None)
-    service = db.query(Service).filter(Service.id == booking.service_id).first()
-    settings = db.query(BusinessSettings).first()
-    end_time = start_time + timedelta(minutes=service.duration)
-    weekday = start_time.weekday()
-    allowed_days = [int(d) for d in settings.working_days.split(",")]
-    if weekday not in allowed_days:
-        raise HTTPException(status_code=400, detail="Closed on this day")
-    if start_time.time() < settings.work_start or end_time.time() > settings.work_end:
-        raise HTTPException(status_code=400, detail="Outside working hours")
-    active_statuses = ("booked",)
-    overlap = (
-        db.query(Booking)
-        .filter(
-            Booking.id != booking_id,
-            Booking.status.in_(active_statuses),
-            Booking.start_time < end_time,
-            Booking.end_time > start_time,
-        )
-        .first()
-    )
-    if overlap:
-        raise HTTPException(status_code=400, detail="Time slot already booked")
-    booking.start_time = start_time
-    booking.end_time = end_time
-    db.commit()
+    reschedule_booking_logic(db, booking, start_time)
     db.refresh(booking)
     return booking
 
@@ -364,7 +360,7 @@ def owner_reschedule_booking(
 @router.get("/settings")
 def get_settings(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     settings = db.query(BusinessSettings).first()
 
@@ -375,6 +371,7 @@ def get_settings(
             working_days="0,1,2,3,4"
         )
         db.add(settings)
+        invalidate_settings(db)
         db.commit()
         db.refresh(settings)
 
@@ -387,7 +384,7 @@ def update_settings(
     work_end: time,
     working_days: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
     settings = db.query(BusinessSettings).first()
 
@@ -399,6 +396,7 @@ def update_settings(
     settings.working_days = working_days or "0,1,2,3,4"
 
     db.add(settings)
+    invalidate_settings(db)
     db.commit()
     db.refresh(settings)
 
@@ -411,62 +409,62 @@ def update_settings(
 @router.get("/analytics")
 def owner_analytics(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
+    """Один запрос по daily_booking_stats (O(дней × групп)), а не 8 агрегатов по bookings."""
     now = datetime.utcnow()
-    start_of_day = datetime(now.year, now.month, now.day)
-    start_of_month = datetime(now.year, now.month, 1)
+    today = now.date()
+    start_of_month = today.replace(day=1)
 
     completed_status = "completed"
-    revenue_today = db.query(func.sum(Booking.service_price)).filter(
-        Booking.status == completed_status,
-        Booking.start_time >= start_of_day
-    ).scalar() or 0
-
-    revenue_month = db.query(func.sum(Booking.service_price)).filter(
-        Booking.status == completed_status,
-        Booking.start_time >= start_of_month
-    ).scalar() or 0
-
-    completed_count = db.query(func.count(Booking.id)).filter(
-        Booking.status == completed_status
-    ).scalar() or 0
-
-    total_bookings = db.query(func.count(Booking.id)).scalar() or 0
-
-    canceled_count = db.query(func.count(Booking.id)).filter(
-        Booking.status == "cancelled"
-    ).scalar() or 0
+    S = DailyBookingStats
+    groups = db.query(
+        S.status,
+        S.source,
+        S.service_id,
+        S.created_by,
+        func.sum(S.bookings),
+        func.sum(S.revenue),
+        func.sum(case((S.day >= today, S.revenue), else_=0)),
+        func.sum(case((S.day >= start_of_month, S.revenue), else_=0)),
+    ).group_by(S.status, S.source, S.service_id, S.created_by).all()
+
+    revenue_today = revenue_month = 0
+    completed_count = total_bookings = canceled_count = 0
+    by_source, by_worker_id, by_service_id = {}, {}, {}
+    for status, source, service_id, created_by, count, revenue, rev_today, rev_month in groups:
+        count, revenue = count or 0, revenue or 0
+        total_bookings += count
+        if status == "cancelled":
+            canceled_count += count
+        if status != completed_status:
+            continue
+        completed_count += count
+        revenue_today += rev_today or 0
+        revenue_month += rev_month or 0
+        by_source[source] = by_source.get(source, 0) + revenue
+        if created_by is not None:
+            by_worker_id[created_by] = by_worker_id.get(created_by, 0) + revenue
+        by_service_id[service_id] = by_service_id.get(service_id, 0) + count
 
     cancel_rate = round((canceled_count / total_bookings) * 100, 2) if total_bookings else 0
     avg_ticket = round(revenue_month / completed_count, 2) if completed_count else 0
 
-    revenue_by_source = db.query(
-        Booking.source,
-        func.sum(Booking.service_price)
-    ).filter(
-        Booking.status == completed_status
-    ).group_by(Booking.source).all()
-
-    source_data = {str(source): revenue or 0 for source, revenue in revenue_by_source}
-
-    revenue_by_worker = db.query(
-        User.username,
-        func.sum(Booking.service_price)
-    ).join(Booking, Booking.created_by == User.id).filter(
-        Booking.status == completed_status
-    ).group_by(User.username).all()
+    source_data = {str(BookingSource(source)): revenue for source, revenue in by_source.items()}
 
-    worker_data = {username: revenue or 0 for username, revenue in revenue_by_worker}
+    worker_data = {}
+    if by_worker_id:
+        users = db.query(User.id, User.username).filter(User.id.in_(by_worker_id)).all()
+        for user_id, username in users:
+            worker_data[username] = worker_data.get(username, 0) + by_worker_id[user_id]
 
-    popular_service = db.query(
-        Service.name,
-        func.count(Booking.id)
-    ).join(Booking).filter(Booking.status == completed_status).group_by(Service.name).order_by(
-        func.count(Booking.id).desc()
-    ).first()
-
-    most_popular = popular_service[0] if popular_service else None
+    service_names = {s.id: s.name for s in get_services(db)}
+    count_by_name = {}
+    for service_id, count in by_service_id.items():
+        name = service_names.get(service_id)
+        if name is not None:
+            count_by_name[name] = count_by_name.get(name, 0) + count
+    most_popular = max(count_by_name, key=count_by_name.get) if count_by_name else None
 
     return {
         "revenue_today": revenue_today,
@@ -484,143 +482,150 @@ def owner_analytics(
 # =====================================================
 # EXPORT
 # =====================================================
+EXPORT_SPOOL_MAX_BYTES = 1024 * 1024  # больше — во временный файл на диске
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_YIELD_PER = 1000
+
+
+def export_filter(start_date: datetime, end_date: datetime) -> tuple:
+    """Условия выборки экспорта (используются и в scripts/explain_queries)."""
+    return (
+        Booking.status == "completed",
+        Booking.start_time >= start_date,
+        Booking.start_time <= end_date,
+    )
+
+
+def _iter_file(f):
+    try:
+        while chunk := f.read(EXPORT_CHUNK_BYTES):
+            yield chunk
+    finally:
+        f.close()
+
+
 @router.get("/export")
 def export_bookings(
     start_date: datetime,
     end_date: datetime,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner"))
+    current_user: CurrentUser = Depends(require_role("owner"))
 ):
-    bookings = (
-        db.query(Booking)
-        .options(joinedload(Booking.service))
-        .filter(
-            Booking.status == "completed",
-            Booking.start_time >= start_date,
-            Booking.start_time <= end_date
+    """XLSX без материализации всех записей: yield_per + write-only Workbook + SpooledTemporaryFile."""
+    rows = (
+        db.query(
+            Booking.start_time,
+            Booking.client_name,
+            Booking.phone,
+            Service.name,
+            Booking.service_price,
+            Booking.source,
         )
-        .all()
+        .outerjoin(Service, Service.id == Booking.service_id)
+        .filter(*export_filter(start_date, end_date))
+        .order_by(Booking.start_time)
+        .yield_per(EXPORT_YIELD_PER)
     )
 
     headers = ["Datum", "Uhrzeit", "Kunde", "Telefon", "Dienstleistung", "Preis (€)", "Quelle"]
-    rows = [
-        [
-            b.start_time.strftime("%d.%m.%Y"),
-            b.start_time.strftime("%H:%M"),
-            b.client_name,
-            b.phone,
-            b.service.name if b.service else "",
-            b.service_price,
-            b.source or "",
-        ]
-        for b in bookings
-    ]
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Buchungen"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Buchungen")
     ws.append(headers)
-    for row in rows:
-        ws.append(row)
-
-    output = io.BytesIO()
+    for start_time, client_name, phone, service_name, service_price, source in rows:
+        ws.append([
+            start_time.strftime("%d.%m.%Y"),
+            start_time.strftime("%H:%M"),
+            client_name,
+            phone,
+            service_name or "",
+            service_price,
+            source.value if source else "",
+        ])
+
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
     wb.save(output)
     output.seek(0)
 
     filename = f"export_{start_date.date()}_{end_date.date()}.xlsx"
 
     return StreamingResponse(
-        output,
+        _iter_file(output),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
 # =====================================================
-# CUSTOMERS (Kunden — группировка по email)
+# CUSTOMERS (Kunden — таблица customers, по email)
 # =====================================================
+CUSTOMER_SORT_FIELDS = ("last_booking_date", "total_bookings", "name", "email")
+DEFAULT_CUSTOMER_PAGE_SIZE = 100
+MAX_CUSTOMER_PAGE_SIZE = 1000
+
+
 @router.get("/customers")
 def owner_customers_list(
+    response: Response,
     marketing: Optional[bool] = Query(None, description="Nur mit Marketing-Zustimmung"),
+    search: Optional[str] = Query(None, description="Teil von Name, Email oder Telefon"),
+    sort: str = Query("last_booking_date", enum=list(CUSTOMER_SORT_FIELDS)),
+    order: str = Query("desc", enum=["asc", "desc"]),
+    limit: int = Query(DEFAULT_CUSTOMER_PAGE_SIZE, ge=1, le=MAX_CUSTOMER_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
-    """Клиенты, сгруппированные по email: name (последний), phone (последний), total_bookings, marketing_consent, last_booking_date."""
-    bookings = (
-        db.query(Booking)
-        .filter(Booking.email.isnot(None), Booking.email != "")
-        .order_by(Booking.start_time.desc())
-        .all()
-    )
-
-    # Группировка по email (нормализуем нижний регистр для ключа)
-    by_email = {}
-    for b in bookings:
-        key = (b.email or "").strip().lower()
-        if not key:
-            continue
-        if key not in by_email:
-            by_email[key] = {
-                "name": b.client_name,
-                "email": b.email,
-                "phone": b.phone or "",
-                "total_bookings": 0,
-                "marketing_consent": False,
-                "last_booking_date": None,
-            }
-        rec = by_email[key]
-        rec["total_bookings"] += 1
-        if b.marketing_consent:
-            rec["marketing_consent"] = True
-        if rec["last_booking_date"] is None and b.start_time:
-            rec["last_booking_date"] = b.start_time.strftime("%Y-%m-%d") if b.start_time else None
-        # Обновляем name/phone только если эта запись новее (bookings уже по убыванию start_time)
-        if b.start_time and (rec.get("_last") is None or b.start_time > rec["_last"]):
-            rec["_last"] = b.start_time
-            rec["name"] = b.client_name
-            rec["phone"] = b.phone or ""
-
-    result = []
-    for key, rec in by_email.items():
-        rec.pop("_last", None)
-        if rec["last_booking_date"] is None:
-            group_bookings = [b for b in bookings if (b.email or "").strip().lower() == key]
-            if group_bookings:
-                last_dt = max(b.start_time for b in group_bookings if b.start_time)
-                rec["last_booking_date"] = last_dt.strftime("%Y-%m-%d")
-        if marketing is True and not rec["marketing_consent"]:
-            continue
-        result.append(rec)
-    result.sort(key=lambda x: (x["last_booking_date"] or ""), reverse=True)
-    return result
+    """Клиенты с email из таблицы customers (агрегаты ведутся при создании записи).
+    Всего клиентов — в заголовке X-Total-Count."""
+    q = db.query(Customer).filter(Customer.email_normalized.isnot(None))
+    if marketing is True:
+        q = q.filter(Customer.marketing_consent == True)
+    if search and search.strip():
+        pattern = f"%{search.strip().lower()}%"
+        q = q.filter(or_(
+            Customer.email_normalized.like(pattern),
+            func.lower(Customer.name).like(pattern),
+            Customer.phone.like(pattern),
+        ))
+
+    response.headers["X-Total-Count"] = str(q.order_by(None).count())
+
+    sort_column = {
+        "last_booking_date": Customer.last_booking_at,
+        "total_bookings": Customer.total_bookings,
+        "name": func.lower(Customer.name),
+        "email": Customer.email_normalized,
+    }[sort]
+    sort_column = sort_column.desc() if order == "desc" else sort_column.asc()
+    customers = q.order_by(sort_column, Customer.id).limit(limit).offset(offset).all()
+    return [
+        {
+            "name": c.name,
+            "email": c.email,
+            "phone": c.phone or "",
+            "total_bookings": c.total_bookings,
+            "marketing_consent": bool(c.marketing_consent),
+            "last_booking_date": c.last_booking_at.strftime("%Y-%m-%d") if c.last_booking_at else None,
+        }
+        for c in customers
+    ]
 
 
 @router.get("/customers/export")
 def owner_customers_export(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     """CSV только клиентов с marketing_consent=True. Колонки: name, email."""
     import csv
-    bookings = (
-        db.query(Booking)
-        .filter(
-            Booking.email.isnot(None),
-            Booking.email != "",
-            Booking.marketing_consent == True,
-        )
-        .order_by(Booking.start_time.desc())
+    customers = (
+        db.query(Customer.name, Customer.email)
+        .filter(Customer.email_normalized.isnot(None), Customer.marketing_consent == True)
+        .order_by(Customer.last_booking_at.desc())
         .all()
     )
-    # Уникальные по email (последнее имя для этого email)
-    by_email = {}
-    for b in bookings:
-        key = (b.email or "").strip().lower()
-        if not key:
-            continue
-        if key not in by_email:
-            by_email[key] = {"name": b.client_name, "email": b.email}
-    rows = [{"name": r["name"], "email": r["email"]} for r in by_email.values()]
+    rows = [{"name": name, "email": email} for name, email in customers]
     output = io.StringIO()
     writer = csv.DictWriter(output, fieldnames=["name", "email"])
     writer.writeheader()
@@ -655,7 +660,7 @@ def owner_worktime_update(
     time_id: int,
     body: WorkTimeUpdateBody,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     """Владелец может редактировать любые записи. total_hours пересчитывается на backend."""
     wt = db.query(WorkTime).filter(WorkTime.id == time_id).first()
@@ -698,7 +703,7 @@ def owner_worktime_list(
     year: Optional[int] = Query(None),
     month: Optional[int] = Query(None, ge=1, le=12),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("owner")),
+    current_user: CurrentUser = Depends(require_role("owner")),
 ):
     from sqlalchemy import extract
     from datetime import date
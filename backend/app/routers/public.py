@@ -1,21 +1,35 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from app.models.settings import BusinessSettings
-from app.db.session import get_db
-from app.models.service import Service
+from app.db.session import get_async_db
 from app.models.booking import Booking
-from app.services.booking_service import create_booking_logic
-from app.services.email_service import (
-    send_booking_confirmation,
-    send_cancellation_email
+from app.services.availability_index import availability_index, SLOT_STEP_MINUTES
+from app.services.booking_service import create_booking_logic_async, set_booking_status
+from app.services.catalog_cache import (
+    get_service,
+    get_services,
+    get_settings,
+    services_cache,
+    settings_cache,
 )
-from app.core.rate_limit import check_booking_rate_limit
+from app.services.email_service import queue_cancellation_email
+from app.core.rate_limit import booking_rate_limit, cancel_rate_limit
+from app.core.http_cache import cache_control, conditional_json, etag_for
 
+# Публичный API работает на async-сессии (get_async_db): ожидание БД не занимает слот
+# threadpool. Синхронные сервисы (кэш каталога, индекс слотов) вызываются через run_sync.
 router = APIRouter(prefix="/public", tags=["public"])
 
+MAX_AVAILABILITY_DAYS = 31
+
+# Каталог и настройки меняются редко; занятость — часто, поэтому короткий max-age
+CATALOG_CACHE_CONTROL = cache_control(max_age=60, stale_while_revalidate=300)
+SLOTS_CACHE_CONTROL = cache_control(max_age=10)
+
 
 # =====================================================
 # REQUEST MODEL (JSON BODY)
@@ -33,33 +47,34 @@ class PublicBookingRequest(BaseModel):
 # GET SERVICES
 # =====================================================
 @router.get("/services")
-def list_public_services(db: Session = Depends(get_db)):
-    services = db.query(Service).all()
+async def list_public_services(request: Request, db: AsyncSession = Depends(get_async_db)):
+    etag = etag_for(await db.run_sync(services_cache.version_token))
+    services = await db.run_sync(get_services)
 
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "price": s.price,
-            "duration": s.duration,
-            "description": s.description or "",
-        }
-        for s in services
-    ]
+    def payload():
+        return [
+            {
+                "id": s.id,
+                "name": s.name,
+                "price": s.price,
+                "duration": s.duration,
+                "description": s.description or "",
+            }
+            for s in services
+        ]
+
+    return conditional_json(request, etag, payload, CATALOG_CACHE_CONTROL)
 
 
 # =====================================================
 # CREATE BOOKING (JSON)
 # =====================================================
-@router.post("/bookings")
-def create_public_booking(
-    request: Request,
+@router.post("/bookings", dependencies=[Depends(booking_rate_limit)])
+async def create_public_booking(
     data: PublicBookingRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    check_booking_rate_limit(request)
-    booking = create_booking_logic(
+    booking = await create_booking_logic_async(
         db=db,
         client_name=data.client_name,
         phone=data.phone,
@@ -69,11 +84,9 @@ def create_public_booking(
         source="website",
         created_by=None,
         marketing_consent=data.marketing_consent,
+        send_confirmation=True,  # 📩 через email_outbox
     )
 
-    # 📩 Email async
-    background_tasks.add_task(send_booking_confirmation, booking)
-
     return {
         "message": "Booking created",
         "id": booking.id
@@ -83,23 +96,21 @@ def create_public_booking(
 # =====================================================
 # CANCEL BY TOKEN
 # =====================================================
-@router.get("/cancel/{token}")
-def cancel_by_token(
+@router.get("/cancel/{token}", dependencies=[Depends(cancel_rate_limit)])
+async def cancel_by_token(
     token: str,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    booking = db.query(Booking).filter(
-        Booking.cancel_token == token
-    ).first()
+    booking = await db.scalar(
+        select(Booking).where(Booking.cancel_token == token)
+    )
 
     if not booking:
         raise HTTPException(status_code=404, detail="Invalid link")
 
-    booking.status = "cancelled"
-    db.commit()
-
-    background_tasks.add_task(send_cancellation_email, booking)
+    # письмо в outbox, commit — вместе со сменой статуса
+    await db.run_sync(queue_cancellation_email, booking)
+    await db.run_sync(set_booking_status, booking, "cancelled")
 
     return {"message": "Booking canceled"}
 
@@ -107,12 +118,11 @@ def cancel_by_token(
 # PUBLIC BOOKINGS BY DATE (für Kalender)
 # =====================================================
 @router.get("/bookings/by-date")
-def public_bookings_by_date(
+async def public_bookings_by_date(
     date: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    from datetime import datetime, timedelta
-
     # 🔥 Безопасно берём только часть даты
     try:
         date_only = date.split("T")[0]
@@ -120,44 +130,97 @@ def public_bookings_by_date(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
 
-    start_of_day = datetime(
-        selected_date.year,
-        selected_date.month,
-        selected_date.day
-    )
-
-    end_of_day = start_of_day + timedelta(days=1)
-
-    bookings = db.query(Booking).filter(
-        Booking.status == "booked",
-        Booking.start_time >= start_of_day,
-        Booking.start_time < end_of_day
-    ).all()
-
-    return [
+    # занятые интервалы дня из индекса (без запроса в БД, если день уже загружен)
+    intervals = await db.run_sync(availability_index.busy_intervals, selected_date.date())
+    result = [
         {
-            "start_time": b.start_time.strftime("%Y-%m-%dT%H:%M:%S"),
-            "end_time": b.end_time.strftime("%Y-%m-%dT%H:%M:%S")
+            "start_time": start.strftime("%Y-%m-%dT%H:%M:%S"),
+            "end_time": end.strftime("%Y-%m-%dT%H:%M:%S")
         }
-        for b in bookings
+        for start, end in intervals
     ]
 
+    return conditional_json(request, etag_for(result), lambda: result, SLOTS_CACHE_CONTROL)
+
 # =====================================================
 # PUBLIC SETTINGS (für Kalender)
 # =====================================================
 @router.get("/settings")
-def get_public_settings(db: Session = Depends(get_db)):
-    settings = db.query(BusinessSettings).first()
+async def get_public_settings(request: Request, db: AsyncSession = Depends(get_async_db)):
+    etag = etag_for(await db.run_sync(settings_cache.version_token))
+    settings = await db.run_sync(get_settings)
+
+    def payload():
+        if not settings:
+            return {
+                "work_start": "07:30:00",
+                "work_end": "18:00:00",
+                "working_days": "0,1,2,3,4"
+            }
 
-    if not settings:
         return {
-            "work_start": "07:30:00",
-            "work_end": "18:00:00",
-            "working_days": "0,1,2,3,4"
+            "work_start": settings.work_start.strftime("%H:%M:%S"),
+            "work_end": settings.work_end.strftime("%H:%M:%S"),
+            "working_days": settings.working_days
         }
 
+    return conditional_json(request, etag, payload, CATALOG_CACHE_CONTROL)
+
+# =====================================================
+# AVAILABILITY (freie Startzeiten pro Tag, für Kalender)
+# =====================================================
+@router.get("/availability")
+async def public_availability(
+    request: Request,
+    service_id: int,
+    from_date: str = Query(..., alias="from"),
+    to: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        first_day = datetime.strptime(from_date.split("T")[0], "%Y-%m-%d").date()
+        last_day = datetime.strptime(to.split("T")[0], "%Y-%m-%d").date() if to else first_day
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    if last_day < first_day:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (last_day - first_day).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {MAX_AVAILABILITY_DAYS} days)")
+
+    result = await db.run_sync(_availability, service_id, first_day, last_day)
+    return conditional_json(request, etag_for(result), lambda: result, SLOTS_CACHE_CONTROL)
+
+
+def _availability(db: Session, service_id: int, first_day, last_day) -> dict:
+    service = get_service(db, service_id)
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    settings = get_settings(db)
+    if not settings:
+        raise HTTPException(status_code=500, detail="Business settings not configured")
+
+    allowed_days = [int(d) for d in settings.working_days.split(",")]
+    # то же правило, что и в create_booking_logic
+    earliest = datetime.utcnow() - timedelta(minutes=2)
+
+    availability_index.preload(db, first_day, last_day)
+
+    days = {}
+    day = first_day
+    while day <= last_day:
+        starts = []
+        if day.weekday() in allowed_days:
+            starts = availability_index.free_starts(
+                db, day, service.duration, settings.work_start, settings.work_end
+            )
+        days[day.isoformat()] = [s.strftime("%H:%M") for s in starts if s >= earliest]
+        day += timedelta(days=1)
+
     return {
-        "work_start": settings.work_start.strftime("%H:%M:%S"),
-        "work_end": settings.work_end.strftime("%H:%M:%S"),
-        "working_days": settings.working_days
-    }
\ No newline at end of file
+        "service_id": service.id,
+        "duration": service.duration,
+        "step_minutes": SLOT_STEP_MINUTES,
+        "days": days,
+    }
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta, date
 from pydantic import BaseModel
 from typing import Optional
 
 from app.db.session import get_db
-from app.core.security import require_role
-from app.models.user import User
+from app.core.security import CurrentUser, require_role
 from app.models.booking import Booking, BookingSource
-from app.models.service import Service
-from app.models.settings import BusinessSettings
 from app.models.work_time import WorkTime
-from app.services.booking_service import create_booking_logic
-from app.services.email_service import send_cancellation_email
+from app.services.booking_listing import MAX_PAGE_SIZE, list_bookings_page
+from app.services.booking_service import (
+    create_booking_logic,
+    reschedule_booking_logic,
+    set_booking_status,
+)
+from app.services.email_service import queue_cancellation_email
 
 
 router = APIRouter(prefix="/worker", tags=["worker"])
@@ -32,7 +34,7 @@ class CreateBookingBody(BaseModel):
 def create_booking(
     body: CreateBookingBody,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     start_time = datetime.fromisoformat(body.start_time.replace("Z", "+00:00"))
     if start_time.tzinfo:
@@ -55,78 +57,54 @@ def create_booking(
 # =====================================================
 @router.get("/bookings")
 def list_bookings(
+    response: Response,
     from_date: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
-    q = db.query(Booking)
-    if from_date:
-        try:
-            start = datetime.strptime(from_date, "%Y-%m-%d")
-            q = q.filter(Booking.start_time >= start)
-        except ValueError:
-            pass
-    if to:
-        try:
-            end = datetime.strptime(to, "%Y-%m-%d") + timedelta(days=1)
-            q = q.filter(Booking.start_time < end)
-        except ValueError:
-            pass
-    bookings = q.options(joinedload(Booking.service)).order_by(Booking.start_time).all()
-    return [
-        {
-            "id": b.id,
-            "client_name": b.client_name,
-            "phone": b.phone,
-            "email": b.email,
-            "service_id": b.service_id,
-            "service_price": b.service_price,
-            "service_name": b.service.name if b.service else None,
-            "start_time": b.start_time,
-            "end_time": b.end_time,
-            "status": b.status,
-            "source": b.source,
-            "created_by": b.created_by,
-        }
-        for b in bookings
-    ]
+    rows, next_cursor = list_bookings_page(
+        db, from_date=from_date, to=to, cursor=cursor, limit=limit, fields=fields,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 
 # =====================================================
 # CANCEL BOOKING (worker может отменить любую; email только если запись не от worker)
 # =====================================================
-def _do_cancel_booking(booking_id: int, db: Session, background_tasks: BackgroundTasks):
+def _do_cancel_booking(booking_id: int, db: Session):
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     if str(booking.status) == "cancelled":
         raise HTTPException(status_code=400, detail="Already canceled")
-    booking.status = "cancelled"
-    db.commit()
-    if booking.email and booking.source != BookingSource.worker:
-        background_tasks.add_task(send_cancellation_email, booking)
+    if booking.source != BookingSource.worker:
+        queue_cancellation_email(db, booking)  # commit — в set_booking_status
+    set_booking_status(db, booking, "cancelled")
     return {"message": "Booking canceled"}
 
 
 @router.patch("/bookings/{booking_id}/cancel")
 def cancel_booking_patch(
     booking_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
-    return _do_cancel_booking(booking_id, db, background_tasks)
+    return _do_cancel_booking(booking_id, db)
 
 
 @router.post("/bookings/{booking_id}/cancel")
 def cancel_booking_post(
     booking_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
-    return _do_cancel_booking(booking_id, db, background_tasks)
+    return _do_cancel_booking(booking_id, db)
 
 
 # =====================================================
@@ -136,7 +114,7 @@ def cancel_booking_post(
 def get_booking(
     booking_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     booking = (
         db.query(Booking)
@@ -170,7 +148,7 @@ def get_booking(
 def mark_booking_completed(
     booking_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     """Кнопка «Erledigt»: установить status=completed без форм и оплаты."""
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
@@ -180,8 +158,7 @@ def mark_booking_completed(
         raise HTTPException(status_code=400, detail="Cannot complete canceled booking")
     if str(booking.status) == "completed":
         raise HTTPException(status_code=400, detail="Booking already completed")
-    booking.status = "completed"
-    db.commit()
+    set_booking_status(db, booking, "completed")
     return {"message": "Erledigt", "status": "completed"}
 
 
@@ -193,7 +170,7 @@ def update_status(
     booking_id: int,
     new_status: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     if new_status not in ("booked", "completed", "cancelled"):
         raise HTTPException(status_code=400, detail="Invalid status")
@@ -202,8 +179,7 @@ def update_status(
         raise HTTPException(status_code=404, detail="Booking not found")
     if str(booking.status) == "cancelled":
         raise HTTPException(status_code=400, detail="Cannot modify canceled booking")
-    booking.status = new_status
-    db.commit()
+    set_booking_status(db, booking, new_status)
     return {"message": "Status updated"}
 
 
@@ -215,7 +191,7 @@ def reschedule_booking(
     booking_id: int,
     new_start_time: datetime,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not booking:
@@ -224,37 +200,7 @@ def reschedule_booking(
     if str(booking.status) == "cancelled":
         raise HTTPException(status_code=400, detail="Cannot modify canceled booking")
 
-    service = db.query(Service).filter(Service.id == booking.service_id).first()
-    settings = db.query(BusinessSettings).first()
-
-    new_end_time = new_start_time + timedelta(minutes=service.duration)
-
-    # --- Проверка дня недели ---
-    weekday = new_start_time.weekday()
-    allowed_days = [int(d) for d in settings.working_days.split(",")]
-
-    if weekday not in allowed_days:
-        raise HTTPException(status_code=400, detail="Closed on this day")
-
-    # --- Проверка рабочего времени ---
-    if new_start_time.time() < settings.work_start or new_end_time.time() > settings.work_end:
-        raise HTTPException(status_code=400, detail="Outside working hours")
-
-    # --- Проверка пересечения ---
-    active_statuses = ("booked",)
-    overlap = db.query(Booking).filter(
-        Booking.id != booking_id,
-        Booking.status.in_(active_statuses),
-        Booking.start_time < new_end_time,
-        Booking.end_time > new_start_time
-    ).first()
-
-    if overlap:
-        raise HTTPException(status_code=400, detail="Time slot already booked")
-
-    booking.start_time = new_start_time
-    booking.end_time = new_end_time
-    db.commit()
+    reschedule_booking_logic(db, booking, new_start_time)
 
     return {"message": "Booking rescheduled"}
 
@@ -266,7 +212,7 @@ def reschedule_booking(
 def bookings_by_date(
     date: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker"))
+    current_user: CurrentUser = Depends(require_role("worker"))
 ):
     from datetime import datetime, timedelta
 
@@ -296,7 +242,7 @@ def bookings_by_date(
 @router.post("/time/start")
 def work_time_start(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     today = date.today()
     existing = (
@@ -317,7 +263,7 @@ def work_time_start(
 def work_time_end(
     pause_minutes: Optional[int] = Query(0, ge=0, le=480),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     today = date.today()
     wt = (
@@ -341,7 +287,7 @@ def work_time_list(
     year: Optional[int] = Query(None),
     month: Optional[int] = Query(None, ge=1, le=12),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("worker")),
+    current_user: CurrentUser = Depends(require_role("worker")),
 ):
     q = db.query(WorkTime).filter(WorkTime.worker_id == current_user.id)
     if year is not None:
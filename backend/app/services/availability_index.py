@@ -0,0 +1,184 @@
+"""Process-local index of booked intervals per day (one bay = no overlaps).
+
+Answers free-slot queries (/public/availability) without a DB round trip. Each day
+is loaded lazily with one query, kept sorted and updated in place on create, cancel,
+complete and reschedule (see booking_service). Entries expire after
+AVAILABILITY_INDEX_TTL seconds so that changes made by other uvicorn workers are
+picked up. Booking itself never consults the index: a stale entry could reject a slot
+that another worker just freed, so accept and reject are both decided by the DB.
+"""
+import bisect
+import os
+import threading
+import time as _time
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingStatus
+
+AVAILABILITY_INDEX_TTL = float(os.getenv("AVAILABILITY_INDEX_TTL", "30"))
+SLOT_STEP_MINUTES = 30
+
+
+class DayIntervals:
+    """Booked intervals of one day, sorted by start (parallel lists for bisect)."""
+
+    __slots__ = ("starts", "ends", "ids", "loaded_at")
+
+    def __init__(self, rows, loaded_at: float):
+        rows = sorted(rows)
+        self.starts = [r[0] for r in rows]
+        self.ends = [r[1] for r in rows]
+        self.ids = [r[2] for r in rows]
+        self.loaded_at = loaded_at
+
+    def add(self, start: datetime, end: datetime, booking_id: int) -> None:
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+
+    def remove(self, booking_id: int) -> None:
+        try:
+            i = self.ids.index(booking_id)
+        except ValueError:
+            return
+        del self.starts[i], self.ends[i], self.ids[i]
+
+    def overlaps(self, start: datetime, end: datetime, exclude_id: int | None = None) -> bool:
+        # Intervals never overlap each other, so ends are sorted as well: only the
+        # last interval starting before `end` (skipping the excluded one) can collide.
+        i = bisect.bisect_left(self.starts, end) - 1
+        if i >= 0 and self.ids[i] == exclude_id:
+            i -= 1
+        return i >= 0 and self.ends[i] > start
+
+    def intervals(self) -> list[tuple[datetime, datetime]]:
+        return list(zip(self.starts, self.ends))
+
+
+class AvailabilityIndex:
+    def __init__(self, ttl: float = AVAILABILITY_INDEX_TTL, clock=_time.monotonic):
+        self._ttl = ttl
+        self._clock = clock
+        self._days: dict[date, DayIntervals] = {}
+        self._day_of: dict[int, date] = {}  # booking id -> day it is indexed under
+        self._changes: dict[date, int] = {}  # bumped on every apply, guards concurrent loads
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Loading
+    # -------------------------------------------------
+    def _get_day(self, db: Session, day: date) -> DayIntervals:
+        return self._load(db, day, day)[day]
+
+    def preload(self, db: Session, first_day: date, last_day: date) -> None:
+        """Load all missing/expired days of a range with a single query."""
+        self._load(db, first_day, last_day)
+
+    def _load(self, db: Session, first_day: date, last_day: date) -> dict[date, DayIntervals]:
+        now = self._clock()
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        result = {}
+        with self._lock:
+            for day in days:
+                entry = self._days.get(day)
+                if entry is not None and now - entry.loaded_at < self._ttl:
+                    result[day] = entry
+            missing = [day for day in days if day not in result]
+            if not missing:
+                return result
+            changes_before = {day: self._changes.get(day, 0) for day in missing}
+
+        range_start = datetime.combine(missing[0], time.min)
+        range_end = datetime.combine(missing[-1], time.min) + timedelta(days=1)
+        rows = db.query(Booking.start_time, Booking.end_time, Booking.id).filter(
+            Booking.status == BookingStatus.booked,
+            Booking.start_time >= range_start,
+            Booking.start_time < range_end,
+        ).all()
+        rows_by_day = {day: [] for day in missing}
+        for start, end, booking_id in rows:
+            if start.date() in rows_by_day:
+                rows_by_day[start.date()].append((start, end, booking_id))
+
+        with self._lock:
+            for day in missing:
+                entry = DayIntervals(rows_by_day[day], now)
+                result[day] = entry
+                # A booking changed on this day while we were reading: the snapshot may
+                # predate it, so serve it once but do not cache it.
+                if self._changes.get(day, 0) != changes_before[day]:
+                    continue
+                old = self._days.get(day)
+                if old is not None:
+                    for booking_id in old.ids:
+                        self._day_of.pop(booking_id, None)
+                self._days[day] = entry
+                for booking_id in entry.ids:
+                    self._day_of[booking_id] = day
+        return result
+
+    # -------------------------------------------------
+    # Queries
+    # -------------------------------------------------
+    def busy_intervals(self, db: Session, day: date) -> list[tuple[datetime, datetime]]:
+        entry = self._get_day(db, day)
+        with self._lock:
+            return entry.intervals()
+
+    def free_starts(
+        self,
+        db: Session,
+        day: date,
+        duration_minutes: int,
+        work_start: time,
+        work_end: time,
+        step_minutes: int = SLOT_STEP_MINUTES,
+    ) -> list[datetime]:
+        """Start times on `day` (every step_minutes from work_start) where the service fits."""
+        entry = self._get_day(db, day)
+        duration = timedelta(minutes=duration_minutes)
+        step = timedelta(minutes=step_minutes)
+        close = datetime.combine(day, work_end)
+        slot = datetime.combine(day, work_start)
+        result = []
+        with self._lock:
+            while slot + duration <= close:
+                if not entry.overlaps(slot, slot + duration):
+                    result.append(slot)
+                slot += step
+        return result
+
+    # -------------------------------------------------
+    # Updates
+    # -------------------------------------------------
+    def apply(self, booking_id: int, status, start_time: datetime, end_time: datetime) -> None:
+        """Reflect a committed booking state (status / times) in the index."""
+        with self._lock:
+            old_day = self._day_of.pop(booking_id, None)
+            if old_day is not None and old_day in self._days:
+                self._days[old_day].remove(booking_id)
+                self._changes[old_day] = self._changes.get(old_day, 0) + 1
+            if status != BookingStatus.booked:
+                return
+            day = start_time.date()
+            self._changes[day] = self._changes.get(day, 0) + 1
+            entry = self._days.get(day)
+            if entry is not None:
+                entry.add(start_time, end_time, booking_id)
+                self._day_of[booking_id] = day
+
+    def invalidate(self, day: date | None = None) -> None:
+        with self._lock:
+            days = [day] if day is not None else list(self._days)
+            for d in days:
+                entry = self._days.pop(d, None)
+                if entry is not None:
+                    for booking_id in entry.ids:
+                        self._day_of.pop(booking_id, None)
+                self._changes[d] = self._changes.get(d, 0) + 1
+
+
+availability_index = AvailabilityIndex()
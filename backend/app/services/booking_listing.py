@@ -0,0 +1,116 @@
+"""Keyset-paginated booking listing shared by the owner and worker calendars.
+
+Pages are ordered by (start_time, id); the cursor is an opaque token holding the
+last (start_time, id) of the previous page, so every page is an index range scan
+regardless of how much history exists. Only the requested columns are selected.
+
+Without limit and cursor the whole range is returned in one response, as before
+pagination existed: the calendar frontend does not follow X-Next-Cursor.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.service import Service
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+# Поля ответа -> колонки (порядок = порядок ключей в JSON, как раньше)
+BOOKING_FIELDS = {
+    "id": Booking.id,
+    "client_name": Booking.client_name,
+    "phone": Booking.phone,
+    "email": Booking.email,
+    "service_id": Booking.service_id,
+    "service_price": Booking.service_price,
+    "service_name": Service.name,
+    "start_time": Booking.start_time,
+    "end_time": Booking.end_time,
+    "status": Booking.status,
+    "source": Booking.source,
+    "created_by": Booking.created_by,
+}
+
+
+def encode_cursor(start_time: datetime, booking_id: int) -> str:
+    raw = json.dumps([start_time.isoformat(), booking_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        start_iso, booking_id = json.loads(raw)
+        return datetime.fromisoformat(start_iso), int(booking_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(BOOKING_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in BOOKING_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def list_bookings_page(
+    db: Session,
+    from_date: str | None = None,
+    to: str | None = None,
+    worker_id: int | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """Returns (rows, next_cursor); next_cursor is None on the last page."""
+    names = parse_fields(fields)
+    # ohne limit/cursor: alles in einer Antwort (Frontend kennt keine Seiten)
+    paginated = limit is not None or cursor is not None
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+    # start_time и id нужны всегда — для курсора
+    columns = [BOOKING_FIELDS[n] for n in names] + [Booking.start_time, Booking.id]
+    q = db.query(*columns).select_from(Booking)
+    if "service_name" in names:
+        q = q.outerjoin(Service, Service.id == Booking.service_id)
+
+    if from_date:
+        try:
+            start = datetime.strptime(from_date, "%Y-%m-%d")
+            q = q.filter(Booking.start_time >= start)
+        except ValueError:
+            pass
+    if to:
+        try:
+            end = datetime.strptime(to, "%Y-%m-%d") + timedelta(days=1)
+            q = q.filter(Booking.start_time < end)
+        except ValueError:
+            pass
+    if worker_id is not None:
+        q = q.filter(Booking.created_by == worker_id)
+    if cursor:
+        after_start, after_id = decode_cursor(cursor)
+        q = q.filter(or_(
+            Booking.start_time > after_start,
+            and_(Booking.start_time == after_start, Booking.id > after_id),
+        ))
+
+    q = q.order_by(Booking.start_time, Booking.id)
+    rows = q.limit(page_size + 1).all() if paginated else q.all()
+
+    next_cursor = None
+    if paginated and len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[-2], last[-1])
+
+    return [dict(zip(names, row)) for row in rows], next_cursor
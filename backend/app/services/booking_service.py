@@ -1,14 +1,147 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date, datetime, timedelta
 from fastapi import HTTPException
+from weakref import WeakValueDictionary
 import secrets
+import threading
 
+import anyio
+
+from app.core.metrics import booking_attempts
 from app.models.booking import Booking
-from app.models.service import Service
-from app.models.settings import BusinessSettings
+from app.services.availability_index import availability_index
+from app.services.booking_stats import record_change, stats_key
+from app.services.catalog_cache import SettingsSnapshot, get_service, get_settings
+from app.services.customer_service import resolve_customer, touch_last_booking
+from app.services.email_service import queue_booking_confirmation
+from app.services.reminder_scheduler import booking_changed
 
 
-def create_booking_logic(
+# HTTPException.detail -> outcome; остальные отказы — "rejected"
+_REJECTION_OUTCOMES = {
+    "Time slot already booked": "overlap",
+    "Closed on this day": "outside_hours",
+    "Outside working hours": "outside_hours",
+}
+
+
+@contextmanager
+def _count_outcome():
+    try:
+        yield
+    except HTTPException as e:
+        booking_attempts.inc(outcome=_REJECTION_OUTCOMES.get(e.detail, "rejected"))
+        raise
+    booking_attempts.inc(outcome="created")
+
+
+# Ключ-пространство для pg_advisory_xact_lock(namespace, day) — "cw"
+_ADVISORY_LOCK_NAMESPACE = 0x6377
+
+# SQLite (локально): по одному threading.Lock на день, живёт пока кто-то его держит
+_sqlite_day_locks: "WeakValueDictionary[date, threading.Lock]" = WeakValueDictionary()
+_sqlite_day_locks_guard = threading.Lock()
+
+
+def _sqlite_day_lock(day: date) -> threading.Lock:
+    with _sqlite_day_locks_guard:
+        lock = _sqlite_day_locks.get(day)
+        if lock is None:
+            lock = threading.Lock()
+            _sqlite_day_locks[day] = lock
+    return lock
+
+
+@contextmanager
+def _day_lock(db: Session, day: date):
+    """Сериализует проверку пересечения + запись для одного дня (не глобально).
+
+    PostgreSQL: транзакционный advisory lock на (namespace, день), снимается при commit/rollback.
+    SQLite: блокировка на день внутри процесса (SQLite используется только локально, один процесс).
+    Должен охватывать проверку пересечения и commit.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :day)"),
+            {"namespace": _ADVISORY_LOCK_NAMESPACE, "day": day.toordinal()},
+        )
+        try:
+            yield
+        except Exception:
+            db.rollback()
+            raise
+        return
+
+    with _sqlite_day_lock(day):
+        try:
+            yield
+        except Exception:
+            db.rollback()
+            raise
+
+
+@asynccontextmanager
+async def _day_lock_async(db: AsyncSession, day: date):
+    """То же, что _day_lock, для AsyncSession (общие блокировки с sync-путём)."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :day)"),
+            {"namespace": _ADVISORY_LOCK_NAMESPACE, "day": day.toordinal()},
+        )
+        try:
+            yield
+        except Exception:
+            await db.rollback()
+            raise
+        return
+
+    # threading.Lock ждём в потоке, чтобы не блокировать event loop; shield — чтобы
+    # отмена запроса не оставила захваченную в потоке блокировку
+    lock = _sqlite_day_lock(day)
+    with anyio.CancelScope(shield=True):
+        await anyio.to_thread.run_sync(lock.acquire)
+    try:
+        yield
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        lock.release()
+
+
+def _check_working_hours(settings: SettingsSnapshot, start_time: datetime, end_time: datetime):
+    # --- Проверка дня недели ---
+    weekday = start_time.weekday()
+    allowed_days = [int(d) for d in settings.working_days.split(",")]
+
+    if weekday not in allowed_days:
+        raise HTTPException(status_code=400, detail="Closed on this day")
+
+    # --- Проверка рабочего времени ---
+    if start_time.time() < settings.work_start or end_time.time() > settings.work_end:
+        raise HTTPException(status_code=400, detail="Outside working hours")
+
+
+def _check_overlap(db: Session, start_time: datetime, end_time: datetime, exclude_id: int | None = None):
+    # --- Проверка пересечения в БД (единственное решение; индекс слотов — только для /public/availability:
+    # он может отставать от других воркеров на AVAILABILITY_INDEX_TTL и не должен отказывать в свободном слоте) ---
+    active_statuses = ("booked",)
+    q = db.query(Booking.id).filter(
+        Booking.status.in_(active_statuses),
+        Booking.start_time < end_time,
+        Booking.end_time > start_time
+    )
+    if exclude_id is not None:
+        q = q.filter(Booking.id != exclude_id)
+
+    if q.first():
+        raise HTTPException(status_code=400, detail="Time slot already booked")
+
+
+def _new_booking(
     db: Session,
     client_name: str,
     phone: str,
@@ -16,14 +149,15 @@ def create_booking_logic(
     service_id: int,
     start_time: datetime,
     source: str,
-    created_by: int | None = None,
-    marketing_consent: bool = False,
-):
-    service = db.query(Service).filter(Service.id == service_id).first()
+    created_by: int | None,
+    marketing_consent: bool,
+) -> Booking:
+    """Проверки, не требующие блокировки дня; возвращает ещё не добавленную запись."""
+    service = get_service(db, service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
 
-    settings = db.query(BusinessSettings).first()
+    settings = get_settings(db)
     if not settings:
         raise HTTPException(status_code=500, detail="Business settings not configured")
 
@@ -41,32 +175,12 @@ def create_booking_logic(
     if end_time.tzinfo is not None:
         end_time = end_time.replace(tzinfo=None)
 
-    # --- Проверка дня недели ---
-    weekday = start_time.weekday()
-    allowed_days = [int(d) for d in settings.working_days.split(",")]
-
-    if weekday not in allowed_days:
-        raise HTTPException(status_code=400, detail="Closed on this day")
-
-    # --- Проверка рабочего времени ---
-    if start_time.time() < settings.work_start or end_time.time() > settings.work_end:
-        raise HTTPException(status_code=400, detail="Outside working hours")
-
-    # --- Проверка пересечения (слот блокируется при booked) ---
-    active_statuses = ("booked",)
-    overlap = db.query(Booking).filter(
-        Booking.status.in_(active_statuses),
-        Booking.start_time < end_time,
-        Booking.end_time > start_time
-    ).first()
-
-    if overlap:
-        raise HTTPException(status_code=400, detail="Time slot already booked")
+    _check_working_hours(settings, start_time, end_time)
 
     cancel_token = secrets.token_urlsafe(32)
 
     now = datetime.utcnow()
-    booking = Booking(
+    return Booking(
         client_name=client_name,
         phone=phone,
         email=email,
@@ -82,8 +196,118 @@ def create_booking_logic(
         marketing_consent_at=now if marketing_consent else None,
     )
 
+
+def _insert_booking(db: Session, booking: Booking, send_confirmation: bool = False) -> None:
+    """Часть под блокировкой дня: пересечение, клиент, INSERT, статистика (commit — у вызывающего)."""
+    _check_overlap(db, booking.start_time, booking.end_time)
+    customer = resolve_customer(
+        db, booking.client_name, booking.email, booking.phone, booking.start_time, booking.marketing_consent
+    )
+    booking.customer_id = customer.id if customer else None
     db.add(booking)
-    db.commit()
+    record_change(db, None, stats_key(booking), booking.service_price)
+    if send_confirmation:
+        db.flush()  # id для dedupe_key; письмо коммитится вместе с записью
+        queue_booking_confirmation(db, booking)
+
+
+def create_booking_logic(
+    db: Session,
+    client_name: str,
+    phone: str,
+    email: str | None,
+    service_id: int,
+    start_time: datetime,
+    source: str,
+    created_by: int | None = None,
+    marketing_consent: bool = False,
+    send_confirmation: bool = False,
+):
+    """Создаёт запись или бросает HTTPException.
+
+    Гарантия: при параллельных вызовах на пересекающиеся слоты коммитится ровно одна
+    запись, остальные получают 400 "Time slot already booked". Проверка и INSERT
+    выполняются под блокировкой дня (_day_lock), другие дни не ждут.
+    send_confirmation: письмо-подтверждение в email_outbox в той же транзакции.
+    """
+    with _count_outcome():
+        booking = _new_booking(
+            db, client_name, phone, email, service_id, start_time, source, created_by, marketing_consent
+        )
+
+        with _day_lock(db, booking.start_time.date()):
+            _insert_booking(db, booking, send_confirmation)
+            db.commit()
     db.refresh(booking)
+    availability_index.apply(booking.id, booking.status, booking.start_time, booking.end_time)
+
+    return booking
+
+
+async def create_booking_logic_async(
+    db: AsyncSession,
+    client_name: str,
+    phone: str,
+    email: str | None,
+    service_id: int,
+    start_time: datetime,
+    source: str,
+    created_by: int | None = None,
+    marketing_consent: bool = False,
+    send_confirmation: bool = False,
+):
+    """create_booking_logic для AsyncSession: те же проверки и та же блокировка дня.
+
+    Синхронные части (кэш каталога, индекс слотов, клиенты, статистика) выполняются
+    через run_sync на том же соединении. Сессия с expire_on_commit=False: запись после
+    commit читается без повторного SELECT.
+    """
+    with _count_outcome():
+        booking = await db.run_sync(
+            _new_booking, client_name, phone, email, service_id, start_time, source, created_by, marketing_consent
+        )
+
+        async with _day_lock_async(db, booking.start_time.date()):
+            await db.run_sync(_insert_booking, booking, send_confirmation)
+            await db.commit()
+    availability_index.apply(booking.id, booking.status, booking.start_time, booking.end_time)
+
+    return booking
+
+
+def set_booking_status(db: Session, booking: Booking, new_status: str):
+    """Смена статуса (cancelled / completed / booked) + индекс слотов и дневная статистика."""
+    old_key = stats_key(booking)
+    booking.status = new_status
+    start_time, end_time = booking.start_time, booking.end_time
+    record_change(db, old_key, stats_key(booking), booking.service_price)
+    booking_changed(db, booking)
+    db.commit()
+    availability_index.apply(booking.id, new_status, start_time, end_time)
+    return booking
+
+
+def reschedule_booking_logic(db: Session, booking: Booking, start_time: datetime):
+    """Перенос записи: те же проверки, что при создании (кроме даты в прошлом)."""
+    if start_time.tzinfo is not None:
+        start_time = start_time.replace(tzinfo=None)
+
+    service = get_service(db, booking.service_id)
+    settings = get_settings(db)
+
+    end_time = start_time + timedelta(minutes=service.duration)
+
+    _check_working_hours(settings, start_time, end_time)
 
+    status = booking.status
+    with _day_lock(db, start_time.date()):
+        _check_overlap(db, start_time, end_time, exclude_id=booking.id)
+        old_key = stats_key(booking)
+        booking.start_time = start_time
+        booking.end_time = end_time
+        record_change(db, old_key, stats_key(booking), booking.service_price)
+        touch_last_booking(db, booking.customer_id, start_time)
+        booking_changed(db, booking)
+        db.commit()
+    availability_index.apply(booking.id, status, start_time, end_time)
     return booking
\ No newline at end of file
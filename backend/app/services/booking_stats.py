@@ -0,0 +1,86 @@
+"""Incremental maintenance of the daily_booking_stats rollup.
+
+Every booking state change (create, status change, reschedule) moves one unit from
+the old (day, source, service, creator, status) bucket to the new one, in the same
+transaction as the change. rebuild_booking_stats() recomputes everything from
+`bookings` (scripts/rebuild_booking_stats.py).
+"""
+import enum
+from datetime import date
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.booking_stats import DailyBookingStats
+
+
+def _value(v):
+    return v.value if isinstance(v, enum.Enum) else v
+
+
+def stats_key(booking: Booking) -> tuple:
+    return (
+        booking.start_time.date(),
+        _value(booking.source),
+        booking.service_id,
+        booking.created_by,
+        _value(booking.status),
+    )
+
+
+def _add(db: Session, key: tuple, bookings: int, revenue: int) -> None:
+    day, source, service_id, created_by, status = key
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    S = DailyBookingStats
+    stmt = insert(S).values(
+        day=day, source=source, service_id=service_id, created_by=created_by,
+        status=status, bookings=bookings, revenue=revenue,
+    )
+    # один атомарный UPSERT по уникальному ключу: параллельные транзакции не создают второй ряд
+    if created_by is None:
+        conflict = {"index_elements": [S.day, S.status, S.source, S.service_id], "index_where": S.created_by.is_(None)}
+    else:
+        conflict = {
+            "index_elements": [S.day, S.status, S.source, S.service_id, S.created_by],
+            "index_where": S.created_by.isnot(None),
+        }
+    db.execute(stmt.on_conflict_do_update(
+        **conflict,
+        set_={"bookings": S.bookings + stmt.excluded.bookings, "revenue": S.revenue + stmt.excluded.revenue},
+    ))
+
+
+def record_change(db: Session, old_key: tuple | None, new_key: tuple | None, price: int) -> None:
+    """Move one booking from old_key to new_key (either may be None). Caller commits."""
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        _add(db, old_key, -1, -price)
+    if new_key is not None:
+        _add(db, new_key, 1, price)
+
+
+def rebuild_booking_stats(db: Session) -> int:
+    """Recompute the whole rollup from bookings. Caller commits. Returns number of rows."""
+    db.query(DailyBookingStats).delete(synchronize_session=False)
+    day = func.date(Booking.start_time)
+    rows = (
+        db.query(
+            day, Booking.source, Booking.service_id, Booking.created_by, Booking.status,
+            func.count(Booking.id), func.coalesce(func.sum(Booking.service_price), 0),
+        )
+        .group_by(day, Booking.source, Booking.service_id, Booking.created_by, Booking.status)
+        .all()
+    )
+    db.bulk_save_objects([
+        DailyBookingStats(
+            day=d if isinstance(d, date) else date.fromisoformat(str(d)),
+            source=_value(source), service_id=service_id, created_by=created_by,
+            status=_value(status), bookings=count, revenue=revenue,
+        )
+        for d, source, service_id, created_by, status, count, revenue in rows
+    ])
+    return len(rows)
@@ -0,0 +1,165 @@
+"""Versioned in-process cache for BusinessSettings and the Service catalog.
+
+Both change a few times a year but are read on almost every request. Each cache
+keeps an immutable snapshot plus the version it was loaded at. Writers call
+invalidate_settings / invalidate_services inside their transaction: that bumps the
+row in `cache_versions` (so other uvicorn workers notice) and, once the session
+commits, drops the local snapshot. Dropping it earlier would let a concurrent request
+reload the old rows under the old version and keep them. Readers re-check the version row at most every CATALOG_CACHE_RECHECK_SECONDS,
+so a steady-state request costs no query at all.
+"""
+import os
+import threading
+import time as _time
+from dataclasses import dataclass
+from datetime import time
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from app.models.cache_version import CacheVersion
+from app.models.service import Service
+from app.models.settings import BusinessSettings
+
+CATALOG_CACHE_RECHECK_SECONDS = float(os.getenv("CATALOG_CACHE_RECHECK_SECONDS", "5"))
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    work_start: time
+    work_end: time
+    working_days: str
+
+
+@dataclass(frozen=True)
+class ServiceSnapshot:
+    id: int
+    name: str
+    price: int
+    duration: int
+    description: str | None
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    services: tuple[ServiceSnapshot, ...]
+    by_id: dict[int, ServiceSnapshot]
+
+
+def _load_settings(db: Session) -> SettingsSnapshot | None:
+    s = db.query(BusinessSettings).first()
+    if s is None:
+        return None
+    return SettingsSnapshot(work_start=s.work_start, work_end=s.work_end, working_days=s.working_days)
+
+
+def _load_services(db: Session) -> CatalogSnapshot:
+    services = tuple(
+        ServiceSnapshot(id=s.id, name=s.name, price=s.price, duration=s.duration, description=s.description)
+        for s in db.query(Service).order_by(Service.id).all()
+    )
+    return CatalogSnapshot(services=services, by_id={s.id: s for s in services})
+
+
+def _read_version(db: Session, name: str) -> int:
+    return db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar() or 0
+
+
+def bump_version(db: Session, name: str) -> None:
+    """Increment the shared version row; committed together with the caller's change."""
+    updated = db.execute(
+        update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.add(CacheVersion(name=name, version=1))
+
+
+class VersionedCache:
+    def __init__(self, name: str, loader, recheck_seconds: float = CATALOG_CACHE_RECHECK_SECONDS, clock=_time.monotonic):
+        self.name = name
+        self._loader = loader
+        self._recheck = recheck_seconds
+        self._clock = clock
+        self._value = None
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._generation = 0  # +1 bei clear(): eine Ladung von davor wird nicht gespeichert
+        self._lock = threading.Lock()
+
+    def _get(self, db: Session) -> tuple:
+        now = self._clock()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self._recheck:
+                return self._value, self._version
+            cached_version = self._version
+            generation = self._generation
+
+        version = _read_version(db, self.name)
+        with self._lock:
+            if version == cached_version and generation == self._generation:
+                self._checked_at = now
+                return self._value, self._version
+
+        # Версию читаем до загрузки: если её поднимут во время загрузки,
+        # следующая проверка увидит расхождение и загрузит заново.
+        value = self._loader(db)
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+                self._version = version
+                self._checked_at = now
+        return value, version
+
+    def get(self, db: Session):
+        return self._get(db)[0]
+
+    def version_token(self, db: Session) -> str:
+        """Short token for ETags: identical across workers for the same data version."""
+        return f"{self.name}-{self._get(db)[1]}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = None
+            self._version = None
+            self._checked_at = 0.0
+            self._generation += 1
+
+    def invalidate(self, db: Session) -> None:
+        """Bump the shared version in the caller's transaction; the local snapshot is dropped after commit."""
+        bump_version(db, self.name)
+        db.info.setdefault(_CLEAR_AFTER_COMMIT, set()).add(self)
+
+
+_CLEAR_AFTER_COMMIT = "catalog_cache.clear_after_commit"
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_committed(session: Session) -> None:
+    for cache in session.info.pop(_CLEAR_AFTER_COMMIT, ()):
+        cache.clear()
+
+
+settings_cache = VersionedCache("settings", _load_settings)
+services_cache = VersionedCache("services", _load_services)
+
+
+def get_settings(db: Session) -> SettingsSnapshot | None:
+    return settings_cache.get(db)
+
+
+def get_services(db: Session) -> tuple[ServiceSnapshot, ...]:
+    return services_cache.get(db).services
+
+
+def get_service(db: Session, service_id: int) -> ServiceSnapshot | None:
+    return services_cache.get(db).by_id.get(service_id)
+
+
+def invalidate_settings(db: Session) -> None:
+    """Call in the transaction that changes BusinessSettings."""
+    settings_cache.invalidate(db)
+
+
+def invalidate_services(db: Session) -> None:
+    """Call in the transaction that changes the Service catalog."""
+    services_cache.invalidate(db)
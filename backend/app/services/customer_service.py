@@ -0,0 +1,91 @@
+"""Resolve bookings to Customer rows by normalized email (or phone when there is no email)."""
+import re
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+
+
+def normalize_email(email: str | None) -> str | None:
+    value = (email or "").strip().lower()
+    return value or None
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    value = re.sub(r"[^\d+]", "", phone or "")
+    if value.startswith("00"):
+        value = "+" + value[2:]
+    return value or None
+
+
+def find_customer(db: Session, email: str | None, phone: str | None) -> Customer | None:
+    email_key = normalize_email(email)
+    if email_key:
+        return db.query(Customer).filter(Customer.email_normalized == email_key).first()
+    phone_key = normalize_phone(phone)
+    if phone_key:
+        return db.query(Customer).filter(
+            Customer.email_normalized.is_(None),
+            Customer.phone_normalized == phone_key,
+        ).first()
+    return None
+
+
+def apply_booking(customer: Customer, name: str, email: str | None, phone: str | None,
+                  start_time: datetime, marketing_consent: bool) -> None:
+    """Name/phone/email follow the latest appointment (total_bookings is counted by the caller)."""
+    if customer.last_booking_at is None or start_time >= customer.last_booking_at:
+        customer.last_booking_at = start_time
+        customer.name = name
+        if email:
+            customer.email = email
+        if phone:
+            customer.phone = phone
+            customer.phone_normalized = normalize_phone(phone)
+    if marketing_consent:
+        customer.marketing_consent = True
+
+
+def resolve_customer(db: Session, name: str, email: str | None, phone: str | None,
+                     start_time: datetime, marketing_consent: bool = False) -> Customer | None:
+    """Find or create the customer for a new booking and update its aggregates. Caller commits."""
+    email_key = normalize_email(email)
+    phone_key = normalize_phone(phone)
+    if not email_key and not phone_key:
+        return None
+
+    customer = find_customer(db, email, phone)
+    if customer is None:
+        customer = Customer(
+            name=name, email=email.strip() if email_key else None, phone=phone,
+            email_normalized=email_key, phone_normalized=phone_key,
+            total_bookings=0, marketing_consent=False,
+        )
+        try:
+            # параллельная запись того же нового клиента: уникальный индекс → берём существующего
+            with db.begin_nested():
+                db.add(customer)
+                db.flush()
+        except IntegrityError:
+            customer = find_customer(db, email, phone)
+            if customer is None:
+                raise
+
+    # счётчик в SQL: параллельные записи того же клиента на разные дни не теряют инкремент
+    db.execute(
+        update(Customer).where(Customer.id == customer.id).values(total_bookings=Customer.total_bookings + 1)
+    )
+    apply_booking(customer, name, email.strip() if email_key else None, phone, start_time, marketing_consent)
+    return customer
+
+
+def touch_last_booking(db: Session, customer_id: int | None, start_time: datetime) -> None:
+    """After a reschedule: keep last_booking_at = latest appointment."""
+    if customer_id is None:
+        return
+    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    if customer is not None and (customer.last_booking_at is None or start_time > customer.last_booking_at):
+        customer.last_booking_at = start_time
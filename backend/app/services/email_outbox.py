@@ -0,0 +1,290 @@
+"""Durable e-mail outbox: enqueue in the request transaction, send from a worker loop.
+
+Requests only INSERT into email_outbox, so their latency does not depend on the SMTP
+server. The worker (a thread started with the app, or scripts/email_worker.py as a
+separate process with EMAIL_OUTBOX_WORKER=off in the web service) claims due rows in
+batches, sends them over one reused SMTP connection and records the outcome:
+  sent    — delivered to the SMTP server;
+  pending — transient failure, retried after exponential backoff;
+  dead    — permanent 5xx rejection or EMAIL_MAX_ATTEMPTS failures (kept for inspection).
+Claimed rows are leased (locked_until); a crashed worker's rows become due again.
+"""
+import logging
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from time import perf_counter
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from dotenv import load_dotenv
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.metrics import registry
+from app.db.session import SessionLocal, engine
+from app.models.email_outbox import EmailOutbox
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+MAIL_USERNAME = (os.getenv("MAIL_USERNAME") or "").strip()
+MAIL_PASSWORD = (os.getenv("MAIL_PASSWORD") or "").strip().replace(" ", "")
+MAIL_FROM = (os.getenv("MAIL_FROM") or os.getenv("MAIL_USERNAME") or "").strip()
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") not in ("0", "false", "no")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "thread")  # thread | off
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_BACKOFF_SECONDS = int(os.getenv("EMAIL_BACKOFF_SECONDS", "30"))  # 30 s, 1 min, 2 min, ...
+EMAIL_BACKOFF_MAX_SECONDS = 3600
+EMAIL_LEASE_SECONDS = 300
+
+
+emails_processed = registry.counter("emails_processed_total", "Outbox send attempts by outcome.", ["outcome"])
+email_send_seconds = registry.histogram(
+    "email_send_seconds", "SMTP send latency per message (result: sent / failed).", ["result"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+@registry.collector
+def _outbox_depth():
+    # одна агрегатная выборка на scrape, общая для всех воркеров
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+        ).all()
+    counts = {"pending": 0, "sending": 0, "dead": 0, **dict(rows)}
+    counts.pop("sent", None)
+    return [("email_outbox_messages", "Outbox messages not yet sent, by status.", ["status"],
+             [([status], count) for status, count in sorted(counts.items())])]
+
+
+def smtp_configured() -> bool:
+    # Gmail (default host) needs credentials; an explicitly set SMTP_HOST may be an open relay
+    return bool(MAIL_FROM) and (bool(MAIL_USERNAME and MAIL_PASSWORD) or "SMTP_HOST" in os.environ)
+
+
+# -------------------------------------------------
+# Enqueue (web requests)
+# -------------------------------------------------
+def enqueue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    body: str,
+    dedupe_key: str | None = None,
+    html_body: str | None = None,
+) -> None:
+    """Add a message to the outbox in the caller's transaction (caller commits)."""
+    if not smtp_configured():
+        log.warning("E-Mail nicht versendet: SMTP nicht konfiguriert (MAIL_FROM / MAIL_USERNAME / MAIL_PASSWORD)")
+        return
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    stmt = insert(EmailOutbox).values(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=now,
+        dedupe_key=dedupe_key,
+        created_at=now,
+    )
+    if dedupe_key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["dedupe_key"])
+    db.execute(stmt)
+
+
+# -------------------------------------------------
+# SMTP
+# -------------------------------------------------
+class SmtpConnection:
+    """One SMTP session reused for a whole batch; reconnects if the server dropped it."""
+
+    def __init__(self, host: str | None = None, port: int | None = None, starttls: bool | None = None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self._server: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            server.starttls()
+        if MAIL_USERNAME and MAIL_PASSWORD:
+            server.login(MAIL_USERNAME, MAIL_PASSWORD)
+        return server
+
+    def send(self, to_email: str, subject: str, body: str, html_body: str | None = None) -> None:
+        if html_body:
+            msg = MIMEMultipart("alternative")
+            msg.attach(MIMEText(body, "plain", "utf-8"))
+            msg.attach(MIMEText(html_body, "html", "utf-8"))
+        else:
+            msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = MAIL_FROM
+        msg["To"] = to_email
+        for attempt in (1, 2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.sendmail(MAIL_FROM, to_email, msg.as_string())
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._server = None
+                if attempt == 2:
+                    raise
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+def _is_permanent(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and code >= 500 and not isinstance(error, smtplib.SMTPAuthenticationError)
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(EMAIL_BACKOFF_SECONDS * 2 ** (attempts - 1), EMAIL_BACKOFF_MAX_SECONDS))
+
+
+# -------------------------------------------------
+# Worker
+# -------------------------------------------------
+def _claim(db: Session, now: datetime, batch_size: int) -> list[EmailOutbox]:
+    due = or_(
+        (EmailOutbox.status == "pending") & (EmailOutbox.next_attempt_at <= now),
+        (EmailOutbox.status == "sending") & (EmailOutbox.locked_until < now),  # lease expired
+    )
+    q = select(EmailOutbox.id).where(due).order_by(EmailOutbox.next_attempt_at).limit(batch_size)
+    if db.get_bind().dialect.name == "postgresql":
+        q = q.with_for_update(skip_locked=True)
+    ids = list(db.scalars(q))
+    if not ids:
+        db.rollback()
+        return []
+    # условие due повторяется: строку мог забрать другой воркер между SELECT и UPDATE
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), due)
+        .values(status="sending", locked_until=now + timedelta(seconds=EMAIL_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    lease = now + timedelta(seconds=EMAIL_LEASE_SECONDS)
+    return list(db.scalars(
+        select(EmailOutbox).where(EmailOutbox.id.in_(ids), EmailOutbox.locked_until == lease)
+    ))
+
+
+def drain_once(
+    connection: SmtpConnection | None = None,
+    batch_size: int = EMAIL_BATCH_SIZE,
+    now: datetime | None = None,
+    session_factory=SessionLocal,
+) -> dict:
+    """Send one batch of due messages; returns counts by outcome."""
+    now = now or datetime.utcnow()
+    own_connection = connection is None
+    connection = connection or SmtpConnection()
+    result = {"sent": 0, "retry": 0, "dead": 0}
+    db = session_factory()
+    try:
+        for message in _claim(db, now, batch_size):
+            message.attempts += 1
+            message.locked_until = None
+            started = perf_counter()
+            try:
+                connection.send(message.to_email, message.subject, message.body, message.html_body)
+            except Exception as e:
+                email_send_seconds.observe(perf_counter() - started, result="failed")
+                message.last_error = f"{type(e).__name__}: {e}"[:500]
+                if _is_permanent(e) or message.attempts >= EMAIL_MAX_ATTEMPTS:
+                    message.status = "dead"
+                    result["dead"] += 1
+                    emails_processed.inc(outcome="dead")
+                    log.error("E-Mail an %s endgültig fehlgeschlagen: %s", message.to_email, message.last_error)
+                else:
+                    message.status = "pending"
+                    message.next_attempt_at = now + _backoff(message.attempts)
+                    result["retry"] += 1
+                    emails_processed.inc(outcome="retry")
+                    log.warning("E-Mail an %s fehlgeschlagen (Versuch %s): %s",
+                                message.to_email, message.attempts, message.last_error)
+            else:
+                message.status = "sent"
+                message.sent_at = datetime.utcnow()
+                message.last_error = None
+                result["sent"] += 1
+                emails_processed.inc(outcome="sent")
+                email_send_seconds.observe(perf_counter() - started, result="sent")
+            db.commit()  # outcome per message: a crash mid-batch does not resend what went out
+    finally:
+        db.close()
+        if own_connection:
+            connection.close()
+    return result
+
+
+class OutboxWorker:
+    """Background thread: drain while there is work, otherwise sleep EMAIL_POLL_SECONDS."""
+
+    def __init__(self, poll_seconds: float = EMAIL_POLL_SECONDS):
+        self._poll = poll_seconds
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        connection = SmtpConnection()
+        try:
+            while not self._stop.is_set():
+                try:
+                    result = drain_once(connection)
+                except Exception:
+                    log.exception("E-Mail-Outbox: Durchlauf fehlgeschlagen")
+                    connection.close()
+                    result = {}
+                if result.get("sent") or result.get("retry") or result.get("dead"):
+                    continue  # possibly more due rows
+                connection.close()  # idle: do not keep the SMTP session open
+                self._wake.wait(self._poll)
+                self._wake.clear()
+        finally:
+            connection.close()
+
+
+outbox_worker = OutboxWorker()
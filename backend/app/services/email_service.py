@@ -1,104 +1,111 @@
-import smtplib
+"""Письма клиентам: шаблоны — app/templates/email (email_templates), отправка — через email_outbox."""
 import logging
-from email.mime.text import MIMEText
 import os
+from dataclasses import dataclass
+from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from sqlalchemy.orm import Session
+
+from app.services.catalog_cache import get_service
+from app.services.email_outbox import enqueue_email
+from app.services.email_templates import RenderedEmail, TemplateRegistry, format_date, format_time
+
 log = logging.getLogger(__name__)
 
-MAIL_USERNAME = (os.getenv("MAIL_USERNAME") or "").strip()
-MAIL_PASSWORD = (os.getenv("MAIL_PASSWORD") or "").strip().replace(" ", "")
-MAIL_FROM = (os.getenv("MAIL_FROM") or os.getenv("MAIL_USERNAME") or "").strip()
 # Ссылка «Termin stornieren» ведёт на фронт; в Render задать FRONTEND_URL = URL Static Site
 FRONTEND_URL = os.getenv("FRONTEND_URL", os.getenv("DOMAIN", "http://localhost:5173"))
 
-SMTP_HOST = "smtp.gmail.com"
-SMTP_PORT = 587
-
 
-def _smtp_configured():
-    return bool(MAIL_USERNAME and MAIL_PASSWORD and MAIL_FROM)
+@dataclass(frozen=True)
+class BookingMail:
+    """Всё, что нужно письму о записи; собирается в транзакции, без ленивых загрузок ORM."""
+    booking_id: int
+    client_name: str
+    email: str
+    service_name: str
+    service_price: int
+    start_time: datetime
+    cancel_token: str
 
+    @property
+    def cancel_link(self) -> str:
+        return f"{FRONTEND_URL.rstrip('/')}/cancel/{self.cancel_token}"
 
-def send_email(to_email: str, subject: str, body: str):
-    if not _smtp_configured():
-        missing = []
-        if not MAIL_USERNAME:
-            missing.append("MAIL_USERNAME")
-        if not MAIL_PASSWORD:
-            missing.append("MAIL_PASSWORD")
-        if not MAIL_FROM:
-            missing.append("MAIL_FROM")
-        log.warning("E-Mail nicht versendet: SMTP nicht konfiguriert (%s)", ", ".join(missing) or "?")
-        return
 
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = MAIL_FROM
-    msg["To"] = to_email
+def booking_mail(db: Session, booking) -> BookingMail:
+    # название услуги — из кэша каталога, а не booking.service (лишний SELECT под блокировкой дня)
+    service = get_service(db, booking.service_id)
+    return BookingMail(
+        booking_id=booking.id,
+        client_name=booking.client_name,
+        email=booking.email,
+        service_name=service.name if service else "",
+        service_price=booking.service_price,
+        start_time=booking.start_time,
+        cancel_token=booking.cancel_token,
+    )
 
-    try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(MAIL_USERNAME, MAIL_PASSWORD)
-            server.sendmail(MAIL_FROM, to_email, msg.as_string())
-        log.info("E-Mail gesendet an %s (Betreff: %s)", to_email, subject)
-    except Exception as e:
-        log.exception("E-Mail-Versand fehlgeschlagen: %s", e)
 
+# Platzhalter, die Vorlagen verwenden dürfen (= Schlüssel von _context, geprüft beim Laden)
+CONTEXT_FIELDS = frozenset({"client_name", "service_name", "service_price", "date", "time", "cancel_link"})
+templates = TemplateRegistry(fields=CONTEXT_FIELDS)
 
-def send_booking_confirmation(booking):
-    if not booking.email:
-        return
 
-    cancel_link = f"{FRONTEND_URL.rstrip('/')}/cancel/{booking.cancel_token}"
+def _context(mail: BookingMail, lang: str) -> dict:
+    return {
+        "client_name": mail.client_name,
+        "service_name": mail.service_name,
+        "service_price": mail.service_price,
+        "date": format_date(mail.start_time.date(), lang),
+        "time": format_time(mail.start_time.time(), lang),
+        "cancel_link": mail.cancel_link,
+    }
 
-    formatted_date = booking.start_time.strftime("%d.%m.%Y")
-    formatted_time = booking.start_time.strftime("%H:%M")
 
-    body = f"""
-Sehr geehrte/r {booking.client_name},
+def booking_confirmation_message(mail: BookingMail, lang: str | None = None) -> RenderedEmail:
+    lang = lang or templates.default_language
+    return templates.render("booking_confirmation", _context(mail, lang), lang)
 
-vielen Dank für Ihre Buchung.
 
-Ihre Reservierung wurde erfolgreich bestätigt.
+def cancellation_message(mail: BookingMail, lang: str | None = None) -> RenderedEmail:
+    lang = lang or templates.default_language
+    return templates.render("booking_cancellation", _context(mail, lang), lang)
 
-Dienstleistung: {booking.service.name}
-Preis: €{booking.service_price}
-Datum: {formatted_date}
-Uhrzeit: {formatted_time}
 
-Hinweis:
-Bei besonders großen Fahrzeugen (z.B. SUV, Transporter, Vans) wird ein Aufpreis von €24 berechnet.
+def reminder_message(mail: BookingMail, lang: str | None = None) -> RenderedEmail:
+    lang = lang or templates.default_language
+    return templates.render("booking_reminder", _context(mail, lang), lang)
 
-Falls Sie Ihren Termin stornieren möchten, klicken Sie bitte auf folgenden Link:
-{cancel_link}
 
-Mit freundlichen Grüßen
-Ihr Team
-"""
+def _enqueue(db: Session, to_email: str, message: RenderedEmail, dedupe_key: str) -> None:
+    enqueue_email(db, to_email, message.subject, message.text, dedupe_key=dedupe_key, html_body=message.html)
 
-    send_email(booking.email, "Buchungsbestätigung", body)
 
-
-def send_cancellation_email(booking):
+# Ставят письмо в очередь в транзакции вызывающего (commit — у него): письмо уходит,
+# только если изменение записи сохранено, и ровно одно на событие (dedupe_key).
+def queue_booking_confirmation(db: Session, booking) -> None:
     if not booking.email:
         return
+    _enqueue(db, booking.email, booking_confirmation_message(booking_mail(db, booking)),
+             dedupe_key=f"booking:{booking.id}:confirmation")
 
-    formatted_date = booking.start_time.strftime("%d.%m.%Y")
-    formatted_time = booking.start_time.strftime("%H:%M")
 
-    body = f"""
-Sehr geehrte/r {booking.client_name},
+def queue_cancellation_email(db: Session, booking) -> None:
+    if not booking.email:
+        return
+    _enqueue(db, booking.email, cancellation_message(booking_mail(db, booking)),
+             dedupe_key=f"booking:{booking.id}:cancellation")
 
-Ihr Termin am {formatted_date} um {formatted_time} wurde storniert.
 
-Bei Fragen kontaktieren Sie uns bitte.
+def reminder_dedupe_key(booking) -> str:
+    # Startzeit im Schlüssel: nach einer Verschiebung ist die Erinnerung ein neues Ereignis
+    return f"booking:{booking.id}:reminder:{booking.start_time:%Y%m%dT%H%M}"
 
-Mit freundlichen Grüßen
-Ihr Team
-"""
 
-    send_email(booking.email, "Termin storniert", body)
\ No newline at end of file
+def queue_booking_reminder(db: Session, booking) -> None:
+    if not booking.email:
+        return
+    _enqueue(db, booking.email, reminder_message(booking_mail(db, booking)), dedupe_key=reminder_dedupe_key(booking))
@@ -0,0 +1,151 @@
+"""E-mail templates: loaded and compiled once, rendered by joining precomputed parts.
+
+Files live in app/templates/email as <name>.<lang>.txt (first line "Subject: ...",
+then a blank line, then the text body) and optionally <name>.<lang>.html (HTML part).
+Placeholders are {{ field }}; values are HTML-escaped in the .html variant.
+A missing language falls back to EMAIL_DEFAULT_LANGUAGE.
+
+load() rejects what would otherwise fail per e-mail inside the booking transaction:
+placeholders outside the registry's `fields` (the context keys, see email_service)
+and .html files without their .txt.
+
+Date/time formatting per language goes through an LRU cache: bulk sends (reminders)
+format the same few days and slot times over and over.
+"""
+import html
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, time
+from functools import lru_cache
+from pathlib import Path
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+EMAIL_DEFAULT_LANGUAGE = os.getenv("EMAIL_DEFAULT_LANGUAGE", "de")
+
+# strftime-Formate je Sprache
+DATE_FORMATS = {"de": "%d.%m.%Y", "en": "%d/%m/%Y"}
+TIME_FORMATS = {"de": "%H:%M", "en": "%H:%M"}
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class TemplateError(Exception):
+    pass
+
+
+class CompiledTemplate:
+    """Literal parts and field names alternate: render is one join, no parsing."""
+
+    __slots__ = ("_parts", "_escape", "fields")
+
+    def __init__(self, source: str, escape: bool = False):
+        self._parts = _PLACEHOLDER.split(source)  # [literal, field, literal, field, ..., literal]
+        self._escape = escape
+        self.fields = frozenset(self._parts[1::2])
+
+    def render(self, context: dict) -> str:
+        parts = self._parts
+        out = [parts[0]]
+        for i in range(1, len(parts), 2):
+            value = str(context[parts[i]])
+            out.append(html.escape(value) if self._escape else value)
+            out.append(parts[i + 1])
+        return "".join(out)
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    subject: CompiledTemplate
+    text: CompiledTemplate
+    html: CompiledTemplate | None
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    text: str
+    html: str | None
+
+
+def _read(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def _compile(text_path: Path) -> EmailTemplate:
+    source = _read(text_path)
+    first_line, _, body = source.partition("\n")
+    if not first_line.startswith("Subject:"):
+        raise TemplateError(f"{text_path.name}: first line must be 'Subject: ...'")
+    html_path = text_path.with_suffix(".html")
+    return EmailTemplate(
+        subject=CompiledTemplate(first_line[len("Subject:"):].strip()),
+        text=CompiledTemplate(body.lstrip("\n")),
+        html=CompiledTemplate(_read(html_path), escape=True) if html_path.exists() else None,
+    )
+
+
+class TemplateRegistry:
+    def __init__(
+        self,
+        directory: Path = TEMPLATE_DIR,
+        default_language: str = EMAIL_DEFAULT_LANGUAGE,
+        fields: frozenset[str] | None = None,
+    ):
+        self._directory = directory
+        self.default_language = default_language
+        self.fields = fields  # erlaubte Platzhalter; None = keine Prüfung
+        self._templates: dict[tuple[str, str], EmailTemplate] | None = None
+
+    def _check_fields(self, path: Path, template: EmailTemplate) -> None:
+        if self.fields is None:
+            return
+        parts = [template.subject, template.text] + ([template.html] if template.html else [])
+        unknown = set().union(*(part.fields for part in parts)) - self.fields
+        if unknown:
+            raise TemplateError(f"{path.stem}: unknown placeholder(s) {', '.join(sorted(unknown))}")
+
+    def load(self) -> int:
+        """Compile and check all templates (called at startup, so a broken file fails the deploy)."""
+        templates = {}
+        for path in sorted(self._directory.glob("*.txt")):
+            name, _, lang = path.stem.rpartition(".")
+            if not name:
+                raise TemplateError(f"{path.name}: expected <name>.<lang>.txt")
+            template = _compile(path)
+            self._check_fields(path, template)
+            templates[(name, lang)] = template
+        for path in sorted(self._directory.glob("*.html")):
+            if not path.with_suffix(".txt").exists():
+                raise TemplateError(f"{path.name}: no {path.with_suffix('.txt').name} (subject and text part)")
+        self._templates = templates
+        return len(templates)
+
+    def get(self, name: str, lang: str | None = None) -> EmailTemplate:
+        if self._templates is None:
+            self.load()
+        template = self._templates.get((name, lang or self.default_language))
+        if template is None:
+            template = self._templates.get((name, self.default_language))
+        if template is None:
+            raise TemplateError(f"Unknown e-mail template: {name}")
+        return template
+
+    def render(self, name: str, context: dict, lang: str | None = None) -> RenderedEmail:
+        template = self.get(name, lang)
+        return RenderedEmail(
+            subject=template.subject.render(context),
+            text=template.text.render(context),
+            html=template.html.render(context) if template.html else None,
+        )
+
+
+@lru_cache(maxsize=4096)
+def format_date(value: date, lang: str) -> str:
+    return value.strftime(DATE_FORMATS.get(lang) or DATE_FORMATS[EMAIL_DEFAULT_LANGUAGE])
+
+
+@lru_cache(maxsize=1024)
+def format_time(value: time, lang: str) -> str:
+    return value.strftime(TIME_FORMATS.get(lang) or TIME_FORMATS[EMAIL_DEFAULT_LANGUAGE])
+
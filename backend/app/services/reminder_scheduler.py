@@ -0,0 +1,172 @@
+"""Appointment reminders: e-mail REMINDER_HOURS before a booking starts.
+
+A cursor row (scheduler_cursors, name "booking_reminders") holds the (start_time, id)
+of the last booking handled. Each tick reads the next `booked` bookings after the
+cursor up to now + REMINDER_HOURS, in batches, through ix_bookings_status_start_end,
+queues a reminder per booking in email_outbox and moves the cursor in the same
+transaction. Nothing is rescanned; a restart continues from the cursor, and a
+cursor behind `now` (scheduler was down) skips appointments already in the past.
+
+Several processes may run it: on PostgreSQL the cursor row is locked (FOR UPDATE)
+for the tick, everywhere the dedupe_key "booking:<id>:reminder:<start>" keeps it at
+one mail per appointment time.
+
+Bookings made less than REMINDER_HOURS in advance get no reminder (the confirmation
+was just sent). A booking that is rescheduled or set back to `booked` can land behind
+the cursor, so booking_changed() (called in the same transaction) drops a pending
+reminder for the old time and queues the new one right away whenever the new start
+is inside the reminder window; later starts are picked up by the ticks as usual.
+It never touches the cursor row: request paths must not wait for a running tick.
+If both enqueue the same reminder, the dedupe_key keeps one.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.booking import Booking
+from app.models.email_outbox import EmailOutbox
+from app.models.scheduler_cursor import SchedulerCursor
+from app.services.email_outbox import smtp_configured
+from app.services.email_service import queue_booking_reminder, reminder_dedupe_key
+
+log = logging.getLogger(__name__)
+
+REMINDER_SCHEDULER = os.getenv("REMINDER_SCHEDULER", "thread")  # thread | off
+REMINDER_HOURS = float(os.getenv("REMINDER_HOURS", "24"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "60"))
+
+CURSOR_NAME = "booking_reminders"
+
+
+def _lock_cursor(db: Session, now: datetime) -> SchedulerCursor:
+    # first run: start at `now`, appointments before that are not reminded
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    db.execute(
+        insert(SchedulerCursor)
+        .values(name=CURSOR_NAME, position=now, last_id=0)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    q = select(SchedulerCursor).where(SchedulerCursor.name == CURSOR_NAME)
+    if db.get_bind().dialect.name == "postgresql":
+        q = q.with_for_update()
+    return db.scalars(q).one()
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        clock=datetime.utcnow,
+        session_factory=SessionLocal,
+        hours: float = REMINDER_HOURS,
+        batch_size: int = REMINDER_BATCH_SIZE,
+    ):
+        self._clock = clock
+        self._session_factory = session_factory
+        self.lead = timedelta(hours=hours)
+        self.batch_size = batch_size
+
+    def run_batch(self, db: Session, now: datetime) -> tuple[int, bool]:
+        """One batch in the caller's transaction: (reminders queued, more bookings due)."""
+        cursor = _lock_cursor(db, now)
+        after_time, after_id = max((cursor.position, cursor.last_id), (now, 0))
+        bookings = list(db.scalars(
+            select(Booking)
+            .where(
+                Booking.status == "booked",
+                or_(
+                    Booking.start_time > after_time,
+                    and_(Booking.start_time == after_time, Booking.id > after_id),
+                ),
+                Booking.start_time <= now + self.lead,
+            )
+            .order_by(Booking.start_time, Booking.id)
+            .limit(self.batch_size)
+        ))
+        queued = 0
+        for booking in bookings:
+            if booking.email and booking.created_at <= booking.start_time - self.lead:
+                queue_booking_reminder(db, booking)
+                queued += 1
+        if bookings:
+            cursor.position, cursor.last_id = bookings[-1].start_time, bookings[-1].id
+        elif cursor.position < now:
+            cursor.position, cursor.last_id = now, 0
+        cursor.updated_at = now
+        return queued, len(bookings) == self.batch_size
+
+    def booking_changed(self, db: Session, booking: Booking) -> None:
+        """After a reschedule or status change, before the caller commits."""
+        stale = [EmailOutbox.dedupe_key.like(f"booking:{booking.id}:reminder%"), EmailOutbox.status == "pending"]
+        if booking.status == "booked":
+            stale.append(EmailOutbox.dedupe_key != reminder_dedupe_key(booking))
+        db.execute(delete(EmailOutbox).where(*stale).execution_options(synchronize_session=False))
+        if booking.status != "booked" or not booking.email or not smtp_configured():
+            return
+        now = self._clock()
+        # ohne Cursor-Sperre: alles im Fenster sofort einplanen, Doppeltes verhindert der dedupe_key
+        if now < booking.start_time <= now + self.lead:
+            queue_booking_reminder(db, booking)
+
+    def tick(self) -> int:
+        """Queue all reminders that are due now; returns how many were queued."""
+        if not smtp_configured():
+            return 0
+        now = self._clock()
+        total = 0
+        db = self._session_factory()
+        try:
+            more = True
+            while more:
+                queued, more = self.run_batch(db, now)
+                db.commit()  # batch and cursor together; releases the cursor lock
+                total += queued
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if total:
+            log.info("Erinnerungen eingeplant: %d", total)
+        return total
+
+
+class ReminderLoop:
+    """Background thread: one tick every REMINDER_POLL_SECONDS."""
+
+    def __init__(self, scheduler: ReminderScheduler, poll_seconds: float = REMINDER_POLL_SECONDS):
+        self._scheduler = scheduler
+        self._poll = poll_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="booking-reminders", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._scheduler.tick()
+            except Exception:
+                log.exception("Erinnerungen: Durchlauf fehlgeschlagen")
+            self._stop.wait(self._poll)
+
+
+reminder_scheduler = ReminderScheduler()
+booking_changed = reminder_scheduler.booking_changed
+reminder_loop = ReminderLoop(reminder_scheduler)
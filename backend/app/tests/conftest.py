@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+# Тесты работают на отдельной SQLite-базе (если DATABASE_URL не задан явно),
+# переменная должна быть выставлена до импорта app.*
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test_crm.db")
+# тесты логинятся часто с одного адреса
+os.environ.setdefault("LOGIN_MAX_PER_IP", "1000")
+# письма из outbox в тестах отправляются явно (drain_once)
+os.environ.setdefault("EMAIL_OUTBOX_WORKER", "off")
+os.environ.setdefault("REMINDER_SCHEDULER", "off")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_started():
+    # startup-события создают owner, настройки и сервисы по умолчанию
+    with TestClient(app):
+        yield
@@ -0,0 +1,113 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.security import create_access_token
+from app.db.session import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def _login(username: str, password: str) -> dict:
+    response = client.post("/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_cached_user_skips_db():
+    headers = _login("owner", "admin123")
+    assert client.get("/owner/dashboard", headers=headers).status_code == 200
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/owner/dashboard", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []
+
+
+def test_deleted_worker_is_rejected_immediately():
+    owner = _login("owner", "admin123")
+    worker = client.post("/owner/workers", headers=owner, json={"username": "cache-w", "password": "secret1"}).json()
+    headers = _login("cache-w", "secret1")
+    assert client.get("/worker/bookings", headers=headers).status_code == 200
+
+    assert client.delete(f"/owner/workers/{worker['id']}", headers=owner).status_code == 200
+    assert client.get("/worker/bookings", headers=headers).status_code == 401
+
+
+def test_worker_password_change_revokes_old_tokens():
+    owner = _login("owner", "admin123")
+    worker = client.post("/owner/workers", headers=owner, json={"username": "revoke-w", "password": "secret1"}).json()
+    old = _login("revoke-w", "secret1")
+
+    response = client.put(f"/owner/workers/{worker['id']}", headers=owner, json={"password": "secret2"})
+    assert response.status_code == 200
+    assert client.get("/worker/bookings", headers=old).status_code == 401
+    assert client.get("/worker/bookings", headers=_login("revoke-w", "secret2")).status_code == 200
+
+
+def test_token_without_version_matches_version_zero():
+    owner = _login("owner", "admin123")
+    worker = client.post("/owner/workers", headers=owner, json={"username": "legacy-w", "password": "secret1"}).json()
+    token = create_access_token({"user_id": worker["id"], "role": "worker"})
+    assert client.get("/worker/bookings", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_unknown_user_token():
+    token = create_access_token({"user_id": 999999, "role": "owner"})
+    response = client.get("/owner/dashboard", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_login_rehashes_weaker_password_hash():
+    from passlib.context import CryptContext
+    from app.db.session import SessionLocal
+    from app.models.user import User
+
+    weak = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000)
+    db = SessionLocal()
+    db.add(User(username="rehash-w", password_hash=weak.hash("secret1"), role="worker"))
+    db.commit()
+
+    _login("rehash-w", "secret1")
+
+    db.expire_all()
+    stored = db.query(User.password_hash).filter(User.username == "rehash-w").scalar()
+    db.close()
+    assert not stored.startswith("$pbkdf2-sha256$1000$")
+    _login("rehash-w", "secret1")
+
+
+def test_login_throttled_per_username():
+    for _ in range(5):
+        response = client.post("/auth/login", data={"username": "nobody", "password": "wrong"})
+        assert response.status_code == 401
+    response = client.post("/auth/login", data={"username": "Nobody", "password": "wrong"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+
+
+def test_deactivated_or_deleted_worker_loses_access():
+    owner = _login("owner", "admin123")
+    worker_id = client.post("/owner/workers", json={"username": "leaving", "password": "secret1"}, headers=owner).json()["id"]
+    worker = _login("leaving", "secret1")
+    assert client.get("/worker/bookings", headers=worker).status_code == 200
+
+    response = client.put(f"/owner/workers/{worker_id}", json={"is_active": False}, headers=owner)
+    assert response.status_code == 200 and response.json()["is_active"] is False
+    assert client.get("/worker/bookings", headers=worker).status_code == 401
+    assert client.post("/auth/login", data={"username": "leaving", "password": "secret1"}).status_code == 401
+
+    # reaktiviert: der alte Token bleibt ungültig, neue Anmeldung nötig
+    client.put(f"/owner/workers/{worker_id}", json={"is_active": True}, headers=owner)
+    assert client.get("/worker/bookings", headers=worker).status_code == 401
+    worker = _login("leaving", "secret1")
+
+    assert client.delete(f"/owner/workers/{worker_id}", headers=owner).status_code == 200
+    assert client.get("/worker/bookings", headers=worker).status_code == 401
+    # neuer Mitarbeiter mit (evtl.) derselben id übernimmt den alten Token nicht
+    client.post("/owner/workers", json={"username": "successor", "password": "secret2"}, headers=owner)
+    assert client.get("/worker/bookings", headers=worker).status_code == 401
@@ -0,0 +1,83 @@
+from datetime import date, datetime, time, timedelta
+
+from app.services.availability_index import AvailabilityIndex, DayIntervals
+
+
+def _dt(hour, minute=0):
+    return datetime(2030, 3, 4, hour, minute)
+
+
+def test_day_intervals_overlap():
+    day = DayIntervals([(_dt(9), _dt(10), 1), (_dt(12), _dt(13, 30), 2)], loaded_at=0)
+
+    assert day.overlaps(_dt(9, 30), _dt(10))
+    assert day.overlaps(_dt(13), _dt(14))
+    assert not day.overlaps(_dt(10), _dt(12))
+    assert not day.overlaps(_dt(13, 30), _dt(14))
+    # eigene Buchung beim Verschieben ignorieren
+    assert not day.overlaps(_dt(12, 30), _dt(13), exclude_id=2)
+
+
+class _FakeSession:
+    """Отдаёт фиксированные строки вместо запроса в БД и считает запросы."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, *args):
+        self.queries += 1
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def test_index_apply_and_free_starts():
+    index = AvailabilityIndex(ttl=3600)
+    db = _FakeSession([(_dt(9), _dt(10), 1)])
+
+    free = index.free_starts(db, _dt(0).date(), 60, time(8, 0), time(11, 0))
+    assert free == [_dt(8), _dt(10)]
+
+    index.apply(2, "booked", _dt(10), _dt(11))
+    index.apply(1, "cancelled", _dt(9), _dt(10))
+    free = index.free_starts(db, _dt(0).date(), 60, time(8, 0), time(11, 0))
+    assert free == [_dt(8), _dt(8, 30), _dt(9)]
+    assert db.queries == 1
+
+
+def test_public_availability_endpoint():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    monday = date(2042, 6, 2) - timedelta(days=date(2042, 6, 2).weekday())
+    saturday = monday + timedelta(days=5)
+    past_monday = date(2020, 3, 2)
+    booked = client.post("/public/bookings", json={
+        "client_name": "Slots", "phone": "1", "email": "slots@test.at", "service_id": 1,
+        "start_time": f"{monday.isoformat()}T10:00:00",
+    })
+    assert booked.status_code == 200
+
+    response = client.get("/public/availability", params={
+        "service_id": 1, "from": monday.isoformat(), "to": saturday.isoformat(),
+    })
+    assert response.status_code == 200
+    body = response.json()
+    duration = body["duration"]
+    starts = body["days"][monday.isoformat()]
+    assert starts[0] == "07:30" and "10:00" not in starts
+    # direkt vor und nach der Buchung (10:00 + Dauer) ist frei
+    before = (datetime.combine(monday, time(10)) - timedelta(minutes=duration)).strftime("%H:%M")
+    after = (datetime.combine(monday, time(10)) + timedelta(minutes=duration)).strftime("%H:%M")
+    assert before in starts and after in starts
+    assert body["days"][saturday.isoformat()] == []  # Ruhetag
+
+    past = client.get("/public/availability", params={"service_id": 1, "from": past_monday.isoformat()}).json()
+    assert past["days"] == {past_monday.isoformat(): []}
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -9,12 +10,39 @@ def test_root():
     assert response.status_code == 200
 
 def test_create_booking():
-    response = client.post("/public/bookings", params={
+    today = datetime.utcnow().date()
+    next_monday = today + timedelta(days=7 - today.weekday())
+    response = client.post("/public/bookings", json={
         "client_name": "Max",
         "phone": "123456",
         "email": "test@test.at",
         "service_id": 1,
-        "start_time": "2026-03-02T10:00:00"
+        "start_time": f"{next_monday.isoformat()}T10:00:00"
     })
 
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+
+def test_cancel_by_token():
+    today = datetime.utcnow().date()
+    next_monday = today + timedelta(days=7 - today.weekday())
+    response = client.post("/public/bookings", json={
+        "client_name": "Anna",
+        "phone": "654321",
+        "email": "anna@test.at",
+        "service_id": 1,
+        "start_time": f"{next_monday.isoformat()}T14:00:00"
+    })
+    assert response.status_code == 200
+
+    from app.db.session import SessionLocal
+    from app.models.booking import Booking
+    db = SessionLocal()
+    token = db.query(Booking.cancel_token).filter(Booking.id == response.json()["id"]).scalar()
+    db.close()
+
+    assert client.get(f"/public/cancel/{token}").status_code == 200
+    # слот снова свободен
+    by_date = client.get("/public/bookings/by-date", params={"date": next_monday.isoformat()}).json()
+    assert all(not b["start_time"].endswith("T14:00:00") for b in by_date)
+    assert client.get("/public/cancel/invalid").status_code == 404
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.services.booking_service import create_booking_logic, create_booking_logic_async
+
+N_PARALLEL = 8
+
+
+def _next_monday(weeks_ahead: int) -> datetime:
+    today = datetime.utcnow().date()
+    monday = today + timedelta(days=7 - today.weekday() + 7 * weeks_ahead)
+    return datetime(monday.year, monday.month, monday.day)
+
+
+def _create_in_parallel(start_times):
+    barrier = threading.Barrier(len(start_times))
+    results = []
+
+    def worker(start_time):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            booking = create_booking_logic(
+                db=db,
+                client_name="Race",
+                phone="0",
+                email=None,
+                service_id=1,
+                start_time=start_time,
+                source="website",
+            )
+            results.append(("ok", booking.id))
+        except HTTPException as e:
+            results.append(("error", e.detail))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in start_times]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_parallel_creates_same_slot_exactly_one_wins():
+    slot = _next_monday(10).replace(hour=10)
+
+    results = _create_in_parallel([slot] * N_PARALLEL)
+
+    assert len([r for r in results if r[0] == "ok"]) == 1
+    assert all(r[1] == "Time slot already booked" for r in results if r[0] == "error")
+
+
+def test_parallel_creates_different_days_all_win():
+    monday = _next_monday(11).replace(hour=10)
+
+    results = _create_in_parallel([monday + timedelta(days=i) for i in range(5)])
+
+    assert all(r[0] == "ok" for r in results)
+
+
+def test_parallel_async_creates_same_slot_exactly_one_wins():
+    slot = _next_monday(12).replace(hour=10)
+
+    async def create():
+        async with AsyncSessionLocal() as db:
+            try:
+                booking = await create_booking_logic_async(
+                    db=db,
+                    client_name="Race",
+                    phone="0",
+                    email=None,
+                    service_id=1,
+                    start_time=slot,
+                    source="website",
+                )
+                return ("ok", booking.id)
+            except HTTPException as e:
+                return ("error", e.detail)
+
+    async def run():
+        return await asyncio.gather(*(create() for _ in range(N_PARALLEL)))
+
+    results = asyncio.run(run())
+
+    assert len([r for r in results if r[0] == "ok"]) == 1
+    assert all(r[1] == "Time slot already booked" for r in results if r[0] == "error")
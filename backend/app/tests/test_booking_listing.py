@@ -0,0 +1,93 @@
+import secrets
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.db.session import SessionLocal
+from app.main import app
+from app.models.booking import Booking
+from app.services.booking_listing import list_bookings_page
+
+DAY = datetime(2043, 1, 5)
+RANGE = {"from_date": "2043-01-05", "to": "2043-01-06"}
+
+
+@pytest.fixture
+def bookings():
+    db = SessionLocal()
+    # drei Termine mit gleicher Startzeit: Reihenfolge nur über id
+    starts = [DAY.replace(hour=9)] * 3 + [DAY.replace(hour=11), DAY.replace(hour=8), DAY + timedelta(days=1, hours=10)]
+    rows = [
+        Booking(
+            client_name=f"Page {i}", phone="0", service_id=1, service_price=10, start_time=start,
+            end_time=start + timedelta(minutes=30), status="booked", cancel_token=secrets.token_urlsafe(16),
+        )
+        for i, start in enumerate(starts)
+    ]
+    db.add_all(rows)
+    db.commit()
+    expected = [b.id for b in sorted(rows, key=lambda b: (b.start_time, b.id))]
+    yield db, expected
+    db.query(Booking).filter(Booking.id.in_(expected)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def test_cursor_round_trip_over_http(bookings):
+    _, expected = bookings
+    client = TestClient(app)
+    token = client.post("/auth/login", data={"username": "owner", "password": "admin123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"from": RANGE["from_date"], "to": RANGE["to"], "limit": 2, "fields": "id,start_time"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/owner/bookings", params=params, headers=headers)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == expected and pages == 3
+
+
+def test_limit_boundary(bookings):
+    db, expected = bookings
+    rows, cursor = list_bookings_page(db, **RANGE, limit=len(expected), fields="id")
+    assert [r["id"] for r in rows] == expected and cursor is None
+
+    rows, cursor = list_bookings_page(db, **RANGE, limit=len(expected) - 1, fields="id")
+    assert len(rows) == len(expected) - 1 and cursor is not None
+    rest, cursor = list_bookings_page(db, **RANGE, cursor=cursor, limit=len(expected) - 1, fields="id")
+    assert [r["id"] for r in rest] == expected[-1:] and cursor is None
+
+
+def test_without_limit_or_cursor_everything_is_returned(bookings, monkeypatch):
+    db, expected = bookings
+    monkeypatch.setattr("app.services.booking_listing.DEFAULT_PAGE_SIZE", 2)
+    rows, cursor = list_bookings_page(db, **RANGE, fields="id")
+    assert [r["id"] for r in rows] == expected and cursor is None
+
+    # erst mit einem Cursor greift die Standard-Seitengröße
+    rows, cursor = list_bookings_page(db, **RANGE, limit=1, fields="id")
+    rows, cursor = list_bookings_page(db, **RANGE, cursor=cursor, fields="id")
+    assert [r["id"] for r in rows] == expected[1:3] and cursor is not None
+
+
+def test_equal_start_times_are_ordered_by_id(bookings):
+    db, expected = bookings
+    tied = expected[1:4]  # 09:00 x3 nach 08:00
+    rows, cursor = list_bookings_page(db, **RANGE, limit=2, fields="id,start_time")
+    assert [r["id"] for r in rows] == [expected[0], tied[0]]
+    rows, cursor = list_bookings_page(db, **RANGE, cursor=cursor, limit=1, fields="id")
+    assert [r["id"] for r in rows] == [tied[1]]
+    rows, _ = list_bookings_page(db, **RANGE, cursor=cursor, limit=1, fields="id")
+    assert [r["id"] for r in rows] == [tied[2]]
+
+    with pytest.raises(HTTPException):
+        list_bookings_page(db, cursor="not-a-cursor")
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app.db.session import SessionLocal
+from app.models.booking_stats import DailyBookingStats
+from app.services.booking_service import create_booking_logic, reschedule_booking_logic, set_booking_status
+from app.services.booking_stats import rebuild_booking_stats
+
+
+def _totals(db):
+    S = DailyBookingStats
+    rows = db.query(
+        S.day, S.source, S.service_id, S.created_by, S.status, func.sum(S.bookings), func.sum(S.revenue)
+    ).group_by(S.day, S.source, S.service_id, S.created_by, S.status).all()
+    return {tuple(r[:5]): (r[5], r[6]) for r in rows if r[5]}
+
+
+def test_incremental_rollup_matches_rebuild():
+    today = datetime.utcnow().date()
+    monday = today + timedelta(days=7 - today.weekday() + 7 * 20)
+    base = datetime(monday.year, monday.month, monday.day, 9)
+    db = SessionLocal()
+    try:
+        bookings = [
+            create_booking_logic(db, "Stats", "0", None, service_id, base + timedelta(days=i, hours=i), source)
+            for i, (service_id, source) in enumerate([(1, "website"), (2, "phone"), (1, "worker"), (3, "website")])
+        ]
+        set_booking_status(db, bookings[0], "completed")
+        set_booking_status(db, bookings[1], "cancelled")
+        reschedule_booking_logic(db, bookings[2], base + timedelta(days=1, hours=5))
+        set_booking_status(db, bookings[2], "completed")
+
+        incremental = _totals(db)
+        rebuild_booking_stats(db)
+        db.commit()
+
+        assert _totals(db) == incremental
+    finally:
+        db.close()
+
+
+def test_bucket_has_one_row_and_deltas_apply_once():
+    import pytest
+    from sqlalchemy.exc import IntegrityError
+
+    from app.services.booking_stats import record_change
+
+    key = (datetime(2044, 2, 1).date(), "website", 1, None, "booked")
+    db = SessionLocal()
+    try:
+        record_change(db, None, key, 30)
+        record_change(db, None, key, 30)
+        record_change(db, key, None, 30)
+        db.commit()
+        rows = db.query(DailyBookingStats).filter(DailyBookingStats.day == key[0]).all()
+        assert [(r.bookings, r.revenue) for r in rows] == [(1, 30)]
+
+        db.add(DailyBookingStats(day=key[0], source="website", service_id=1, created_by=None, status="booked"))
+        with pytest.raises(IntegrityError):
+            db.flush()
+        db.rollback()
+    finally:
+        db.query(DailyBookingStats).filter(DailyBookingStats.day == key[0]).delete()
+        db.commit()
+        db.close()
+
+
+def test_migration_merges_duplicates_from_the_old_index(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.session import Base
+    from app.models.booking import Booking
+    from scripts import migrate_booking_stats
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2044, 3, 7, 10)
+    with engine.begin() as conn:
+        for index in DailyBookingStats.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {index.name}"))
+        conn.execute(text(
+            "CREATE INDEX ix_daily_booking_stats_key ON daily_booking_stats (day, status, source, service_id, created_by)"
+        ))
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(Booking(client_name="M", phone="0", service_id=1, service_price=30, start_time=start,
+                   end_time=start + timedelta(minutes=30), status="booked", source="website", cancel_token="m"))
+    for _ in range(2):  # doppelter Bucket aus einer Race
+        db.add(DailyBookingStats(day=start.date(), source="website", service_id=1, status="booked",
+                                 bookings=1, revenue=30))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(migrate_booking_stats, "engine", engine)
+    monkeypatch.setattr(migrate_booking_stats, "SessionLocal", Session)
+    migrate_booking_stats.main()
+    migrate_booking_stats.main()
+
+    db = Session()
+    try:
+        assert [(r.bookings, r.revenue) for r in db.query(DailyBookingStats)] == [(1, 30)]
+        indexes = {ix["name"]: ix["unique"] for ix in inspect(engine).get_indexes("daily_booking_stats")}
+        assert indexes == {"ux_daily_booking_stats_key": 1, "ux_daily_booking_stats_key_no_creator": 1}
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,63 @@
+from app.db.session import SessionLocal
+from app.models.service import Service
+from app.services.catalog_cache import VersionedCache, _load_services, invalidate_services
+
+
+def test_other_worker_sees_invalidation():
+    # zwei Caches = zwei uvicorn-Worker mit eigenem Prozess-Cache
+    worker_a = VersionedCache("services", _load_services, recheck_seconds=0)
+    worker_b = VersionedCache("services", _load_services, recheck_seconds=0)
+    db = SessionLocal()
+    try:
+        before = len(worker_b.get(db).services)
+        token_before = worker_b.version_token(db)
+
+        db.add(Service(name="Cache-Test", price=1, duration=15))
+        invalidate_services(db)
+        db.commit()
+
+        assert len(worker_a.get(db).services) == before + 1
+        assert len(worker_b.get(db).services) == before + 1
+        assert worker_b.version_token(db) != token_before
+    finally:
+        db.close()
+
+
+def test_snapshot_is_dropped_after_commit_not_before():
+    cache = VersionedCache("services", _load_services, recheck_seconds=60)
+    writer, reader = SessionLocal(), SessionLocal()
+    try:
+        before = len(cache.get(reader).services)
+
+        writer.add(Service(name="Cache-Commit-Test", price=1, duration=15))
+        cache.invalidate(writer)
+        writer.flush()
+        # paralleler Request vor dem Commit: alte Daten, aber nicht für das ganze Recheck-Fenster
+        reader.rollback()
+        assert len(cache.get(reader).services) == before
+        writer.commit()
+
+        reader.rollback()
+        assert len(cache.get(reader).services) == before + 1
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_load_overtaken_by_clear_is_not_kept():
+    loads = []
+
+    def loader(db):
+        loads.append(1)
+        if len(loads) == 1:
+            cache.clear()  # Commit eines Schreibers während der Ladung
+        return len(loads)
+
+    cache = VersionedCache("services", loader, recheck_seconds=60)
+    db = SessionLocal()
+    try:
+        assert cache.get(db) == 1
+        assert cache.get(db) == 2 and cache.get(db) == 2
+        assert cache.version_token(db).startswith("services-") and "None" not in cache.version_token(db)
+    finally:
+        db.close()
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base, SessionLocal
+from app.models.booking import Booking
+from app.models.customer import Customer
+from app.services import customer_service
+from app.services.customer_service import normalize_email, normalize_phone, resolve_customer
+
+START = datetime(2041, 3, 4, 10)
+
+
+def test_normalization():
+    assert normalize_email("  Max@Example.AT ") == "max@example.at"
+    assert normalize_email("   ") is None
+    assert normalize_phone("0043 (660) 123-45 67") == "+436601234567"
+    assert normalize_phone("+43 660 1234567") == "+436601234567"
+    assert normalize_phone("") is None
+
+
+def test_same_email_or_phone_is_one_customer():
+    db = SessionLocal()
+    try:
+        first = resolve_customer(db, "Eva", "Eva.Dedupe@Test.at", "1", START)
+        again = resolve_customer(db, "Eva M.", " eva.dedupe@test.AT", "2", START.replace(day=5), True)
+        by_phone = resolve_customer(db, "Tom", None, "0043 660 555", START)
+        by_phone_again = resolve_customer(db, "Tom", "", "+43660555", START)
+        db.commit()
+
+        assert again.id == first.id and by_phone_again.id == by_phone.id != first.id
+        db.refresh(first)
+        assert (first.total_bookings, first.name, first.phone, first.marketing_consent) == (2, "Eva M.", "2", True)
+        assert resolve_customer(db, "Anon", None, None, START) is None
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_concurrent_bookings_do_not_lose_increments():
+    setup = SessionLocal()
+    customer_id = resolve_customer(setup, "Lena", "lena.race@test.at", None, START).id
+    setup.commit()
+    setup.close()
+
+    # beide Sessions haben den Kunden mit total_bookings=1 geladen, bevor eine committet
+    a, b = SessionLocal(), SessionLocal()
+    try:
+        a.get(Customer, customer_id), b.get(Customer, customer_id)
+        resolve_customer(a, "Lena", "lena.race@test.at", None, START.replace(day=6))
+        a.commit()
+        resolve_customer(b, "Lena", "lena.race@test.at", None, START.replace(day=7))
+        b.commit()
+        b.expire_all()
+        assert b.get(Customer, customer_id).total_bookings == 3
+    finally:
+        a.close()
+        b.close()
+
+
+def test_unique_index_race_reuses_the_existing_customer(monkeypatch):
+    db = SessionLocal()
+    try:
+        existing = resolve_customer(db, "Ina", "ina.race@test.at", None, START)
+        db.commit()
+
+        # der erste Lookup sieht den parallel angelegten Kunden noch nicht
+        real_find = customer_service.find_customer
+        calls = []
+
+        def find_after_first_call(*args):
+            calls.append(args)
+            return None if len(calls) == 1 else real_find(*args)
+
+        monkeypatch.setattr(customer_service, "find_customer", find_after_first_call)
+        customer = resolve_customer(db, "Ina", "INA.race@test.at", None, START.replace(day=8))
+        db.commit()
+
+        assert customer.id == existing.id and len(calls) == 2
+        db.refresh(customer)
+        assert customer.total_bookings == 2
+    finally:
+        db.close()
+
+
+def test_migrate_customers_backfill(tmp_path, monkeypatch):
+    from scripts import migrate_customers
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fixture.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    for i, (email, phone) in enumerate([
+        ("A@x.at", "1"), ("a@x.at ", "2"), (None, "0043 1"), (None, "+431"), (None, None),
+    ]):
+        db.add(Booking(
+            client_name=f"C{i}", email=email, phone=phone or "", service_id=1, service_price=10,
+            start_time=START.replace(day=1 + i), end_time=START.replace(day=1 + i, hour=11),
+            status="booked", source="website", cancel_token=f"t{i}",
+        ))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(migrate_customers, "engine", engine)
+    monkeypatch.setattr(migrate_customers, "SessionLocal", Session)
+    monkeypatch.setattr(migrate_customers, "BATCH_SIZE", 2)
+    migrate_customers.run()
+    migrate_customers.run()  # erneuter Lauf ändert nichts
+
+    db = Session()
+    try:
+        customers = {c.email_normalized or c.phone_normalized: c for c in db.query(Customer)}
+        assert {key: c.total_bookings for key, c in customers.items()} == {"a@x.at": 2, "+431": 2}
+        assert customers["a@x.at"].name == "C1" and customers["+431"].last_booking_at == START.replace(day=4)
+        assert db.query(Booking).filter(Booking.customer_id.is_(None)).count() == 1
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.db.pool import InstrumentedQueuePool, pool_stats
+from app.db.session import engine, pool_budget
+
+
+def test_pool_stats_count_checkouts_and_timeouts(tmp_path):
+    small = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    held = small.connect()
+    stats = pool_stats(small)
+    assert stats["checked_out"] == 1 and stats["checkouts"] == 1
+
+    with pytest.raises(PoolTimeoutError):
+        small.connect()
+    assert pool_stats(small)["timeouts"] == 1
+
+    held.close()
+    with small.connect():
+        pass
+    stats = pool_stats(small)
+    assert stats["checked_out"] == 0 and stats["checkouts"] == 2
+    small.dispose()
+
+
+def test_sqlite_uses_wal():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+@pytest.mark.parametrize("max_connections, workers, async_share", [
+    (97, 1, 0.5), (97, 2, 0.5), (97, 4, 0.25), (20, 3, 0.75), (4, 2, 0.5), (5, 2, 0.9), (2, 1, 0.0),
+])
+def test_sync_and_async_pools_share_the_connection_limit(max_connections, workers, async_share):
+    budget = pool_budget(max_connections, workers, async_share)
+    per_worker = sum(size + overflow for size, overflow in budget.values())
+    assert per_worker * workers <= max_connections
+    assert all(size >= 1 for size, _ in budget.values())
+
+
+def test_pool_budget_split():
+    assert pool_budget(97, 2, 0.5) == {"sync": (16, 8), "async": (16, 8)}
+    assert pool_budget(97, 2, 0.25) == {"sync": (24, 12), "async": (8, 4)}
+
+
+@pytest.mark.parametrize("max_connections, workers", [(1, 1), (3, 2), (4, 3)])
+def test_pool_budget_below_two_connections_per_worker_is_a_config_error(max_connections, workers):
+    with pytest.raises(ValueError, match="DB_MAX_CONNECTIONS"):
+        pool_budget(max_connections, workers, 0.5)
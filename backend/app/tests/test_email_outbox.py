@@ -0,0 +1,132 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.session import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.services import email_outbox
+from app.services.email_outbox import SmtpConnection, drain_once, enqueue_email
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class _Handler:
+    """SMTP stand-in: 451 for tempfail@, 550 for reject@, accepts everything else."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("tempfail@"):
+            return "451 Try again later"
+        if address.startswith("reject@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos[0], envelope.content))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = _Handler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_outbox, "MAIL_FROM", "crm@example.com")
+    db = SessionLocal()
+    db.query(EmailOutbox).delete()
+    db.commit()
+    db.close()
+
+    connection = SmtpConnection("127.0.0.1", port, starttls=False)
+    yield handler, connection
+    connection.close()
+    controller.stop()
+
+
+def _enqueue(*messages):
+    db = SessionLocal()
+    try:
+        for to_email, dedupe_key in messages:
+            enqueue_email(db, to_email, "Test", "Hallo", dedupe_key=dedupe_key)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _row(to_email):
+    db = SessionLocal()
+    try:
+        return db.query(EmailOutbox).filter(EmailOutbox.to_email == to_email).one()
+    finally:
+        db.close()
+
+
+def test_batch_is_sent_over_one_connection_once_per_dedupe_key(smtp):
+    handler, connection = smtp
+    _enqueue(("a@example.com", "k:1"), ("b@example.com", "k:2"), ("a@example.com", "k:1"), ("c@example.com", None))
+
+    assert drain_once(connection) == {"sent": 3, "retry": 0, "dead": 0}
+    assert sorted(to for to, _ in handler.messages) == ["a@example.com", "b@example.com", "c@example.com"]
+    assert handler.sessions == 1
+    assert drain_once(connection) == {"sent": 0, "retry": 0, "dead": 0}
+    assert _row("b@example.com").status == "sent"
+
+
+def test_transient_failures_back_off_then_dead_letter(smtp, monkeypatch):
+    _, connection = smtp
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 2)
+    _enqueue(("tempfail@example.com", None), ("reject@example.com", None))
+    now = datetime.utcnow()
+    failed_before = email_outbox.email_send_seconds.dump().get('["failed"]', [0])
+
+    assert drain_once(connection, now=now) == {"sent": 0, "retry": 1, "dead": 1}
+    assert sum(email_outbox.email_send_seconds.dump()['["failed"]'][:-1]) == sum(failed_before[:-1]) + 2
+    assert _row("reject@example.com").status == "dead"  # 5xx: no retry
+    row = _row("tempfail@example.com")
+    assert row.status == "pending" and row.attempts == 1 and row.next_attempt_at > now
+
+    # not due yet
+    assert drain_once(connection, now=now + timedelta(seconds=1)) == {"sent": 0, "retry": 0, "dead": 0}
+    assert drain_once(connection, now=row.next_attempt_at) == {"sent": 0, "retry": 0, "dead": 1}
+    row = _row("tempfail@example.com")
+    assert row.status == "dead" and row.attempts == 2 and "451" in row.last_error
+
+
+def test_booking_mail_is_rendered_without_lazy_loads():
+    from app.models.user import User  # noqa: F401  (relationship("User") on Booking)
+    from app.models.booking import Booking
+    from app.services.catalog_cache import get_services
+    from app.services.email_service import booking_confirmation_message, booking_mail
+
+    db = SessionLocal()
+    try:
+        service = get_services(db)[0]
+        # transient instance: touching booking.service would load nothing and give None
+        booking = Booking(
+            id=42, client_name="Anna", email="anna@example.com", service_id=service.id,
+            service_price=service.price, start_time=datetime(2030, 5, 6, 9, 30), cancel_token="tok",
+        )
+        message = booking_confirmation_message(booking_mail(db, booking))
+    finally:
+        db.close()
+
+    assert message.subject == "Buchungsbestätigung"
+    assert f"Dienstleistung: {service.name}" in message.text
+    assert "06.05.2030" in message.text and "09:30" in message.text
+    assert message.text.rstrip().endswith("Ihr Team")
+    assert "/cancel/tok" in message.text and 'href="http' in message.html
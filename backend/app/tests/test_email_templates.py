@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.email_service import (
+    CONTEXT_FIELDS, BookingMail, _context, booking_confirmation_message, cancellation_message, templates,
+)
+from app.services.email_templates import TemplateError, TemplateRegistry
+
+MAIL = BookingMail(
+    booking_id=1, client_name="<b>Jörg</b> & Co", email="j@example.com", service_name="Innenreinigung",
+    service_price=49, start_time=datetime(2030, 1, 2, 7, 30), cancel_token="abc",
+)
+
+
+def test_language_variants_and_fallback():
+    de = cancellation_message(MAIL)
+    en = cancellation_message(MAIL, "en")
+    assert de.subject == "Termin storniert" and "02.01.2030 um 07:30" in de.text
+    assert en.subject == "Appointment cancelled" and "02/01/2030 at 07:30" in en.text
+    assert cancellation_message(MAIL, "fr").subject == "Termin storniert"
+
+
+def test_html_part_escapes_values_text_part_does_not():
+    message = booking_confirmation_message(MAIL)
+    assert "Sehr geehrte/r <b>Jörg</b> & Co," in message.text
+    assert "&lt;b&gt;Jörg&lt;/b&gt; &amp; Co" in message.html and "<b>Jörg" not in message.html
+
+
+def test_template_without_subject_line_fails_at_load(tmp_path):
+    (tmp_path / "broken.de.txt").write_text("Hallo {{ client_name }}\n", encoding="utf-8")
+    with pytest.raises(TemplateError):
+        TemplateRegistry(tmp_path).load()
+
+
+def test_shipped_templates_use_only_context_fields():
+    assert set(_context(MAIL, "de")) == CONTEXT_FIELDS
+    assert TemplateRegistry(fields=CONTEXT_FIELDS).load() == len(list(templates._directory.glob("*.txt")))
+
+
+def test_unknown_placeholder_fails_at_load(tmp_path):
+    (tmp_path / "typo.de.txt").write_text("Subject: Termin\n\nAm {{ date }} um {{ tme }}\n", encoding="utf-8")
+    with pytest.raises(TemplateError, match="tme"):
+        TemplateRegistry(tmp_path, fields=CONTEXT_FIELDS).load()
+
+
+def test_html_without_text_part_fails_at_load(tmp_path):
+    (tmp_path / "orphan.de.html").write_text("<p>{{ client_name }}</p>", encoding="utf-8")
+    with pytest.raises(TemplateError, match="orphan.de.txt"):
+        TemplateRegistry(tmp_path, fields=CONTEXT_FIELDS).load()
@@ -0,0 +1,69 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Histogram, Registry
+from app.main import app
+
+
+def test_metrics_endpoint_reports_route_templates_and_booking_outcomes():
+    client = TestClient(app)
+    client.get("/public/cancel/does-not-exist")
+    client.post("/public/bookings", json={
+        "client_name": "M", "phone": "0", "email": "m@test.at", "service_id": 1,
+        "start_time": "2030-01-07T03:00:00",  # Montag, vor Öffnung
+    })
+
+    text = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/public/cancel/{token}",status="404"}' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/public/cancel/{token}",le="+Inf"}' in text
+    assert 'booking_attempts_total{outcome="outside_hours"}' in text
+    assert 'email_outbox_messages{status="pending"}' in text
+    assert "process_resident_memory_bytes{pid=" in text
+    assert 'db_pool_checked_out{pid=' in text
+
+
+def test_worker_files_are_summed(tmp_path, monkeypatch):
+    from app.core import metrics
+
+    monkeypatch.setattr(metrics, "METRICS_MULTIPROCESS", True)
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+
+    def worker_state(requests: int, latency: float) -> Registry:
+        registry = Registry()
+        registry.counter("requests_total", "r", ["route"]).inc(requests, route="/a")
+        registry.histogram("latency_seconds", "l", buckets=(0.1, 1)).observe(latency)
+        return registry
+
+    other = worker_state(3, 0.05)
+    other.flush(force=True)
+    (tmp_path / f"{os.getpid()}.json").rename(tmp_path / "999999999.json")  # exited worker
+
+    text = worker_state(2, 0.5).render()
+    assert 'requests_total{route="/a"} 5' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h", "doc", buckets=(1, 2))
+    for value in (0.5, 1.5, 3):
+        histogram.observe(value)
+    samples = list(histogram.samples(histogram.dump()))
+    assert [value for name, _, value in samples if name == "h_bucket"] == [1, 2, 3]
+
+
+def test_metrics_need_the_token_and_are_off_on_render_without_one(monkeypatch):
+    from app import main
+
+    client = TestClient(app)
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", "")
+    monkeypatch.setattr(main, "METRICS_ENABLED", False)
+    assert client.get("/metrics").status_code == 404
+
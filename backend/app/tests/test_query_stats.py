@@ -0,0 +1,38 @@
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db import query_stats
+from app.db.query_stats import param_shape
+from app.db.session import engine
+from app.main import app
+
+
+def test_server_timing_counts_queries_of_sync_and_async_handlers():
+    client = TestClient(app)
+    response = client.get("/public/bookings/by-date", params={"date": "2030-01-07"})
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=") and 'desc="1 queries"' in timing
+
+    # def handler in the threadpool, sync session
+    token = client.post("/auth/login", data={"username": "owner", "password": "admin123"}).json()["access_token"]
+    response = client.get("/owner/customers", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert 'desc="0 queries"' not in response.headers["server-timing"]
+
+
+def test_slow_query_is_logged_with_parameter_shape(monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.db.query_stats"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :name, :n"), {"name": "secret-value", "n": 3})
+    line = next(r.getMessage() for r in caplog.records if "slow_query" in r.getMessage())
+    assert "SELECT ?, ?" in line or "SELECT %(name)s" in line
+    assert "secret-value" not in line
+
+
+def test_param_shape():
+    assert param_shape({"id_1": 5, "name": "x"}) == {"id_1": "int", "name": "str"}
+    assert param_shape([(1, "a"), (2, "b")], executemany=True) == "2 x (int, str)"
@@ -0,0 +1,90 @@
+import pytest
+from fastapi import HTTPException, Request
+
+from app.core.rate_limit import DatabaseBackend, MemoryBackend, RateLimiter, get_client_ip
+from app.db.session import engine
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sliding_window_allows_limit_then_decays():
+    clock = _Clock(60 * 1000)  # start of a window
+    limiter = RateLimiter(MemoryBackend(), clock=clock)
+    for _ in range(5):
+        limiter.hit("t", "ip", limit=5, window=60)
+    with pytest.raises(HTTPException) as exc:
+        limiter.hit("t", "ip", limit=5, window=60)
+    assert exc.value.status_code == 429 and exc.value.headers["Retry-After"]
+
+    # next window, half way: previous window (6 hits) counts half
+    clock.now += 90
+    limiter.hit("t", "ip", limit=5, window=60)  # 3 + 1
+    limiter.hit("t", "ip", limit=5, window=60)  # 3 + 2
+    with pytest.raises(HTTPException):
+        limiter.hit("t", "ip", limit=5, window=60)
+
+    clock.now += 120
+    limiter.hit("t", "ip", limit=5, window=60)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_keys=100)
+    limiter = RateLimiter(backend, clock=_Clock())
+    for i in range(1000):
+        limiter.hit("t", f"10.0.{i // 256}.{i % 256}", limit=5, window=60)
+    assert len(backend) == 100
+
+
+def test_database_backend_is_shared_between_limiters():
+    clock = _Clock(60 * 2000)
+    worker_a = RateLimiter(DatabaseBackend(engine), clock=clock)
+    worker_b = RateLimiter(DatabaseBackend(engine), clock=clock)
+
+    for _ in range(3):
+        worker_a.hit("shared", "ip", limit=5, window=60)
+    worker_b.hit("shared", "ip", limit=5, window=60)
+    worker_b.hit("shared", "ip", limit=5, window=60)
+    with pytest.raises(HTTPException):
+        worker_a.hit("shared", "ip", limit=5, window=60)
+
+    worker_a.reset("shared", "ip")
+    worker_b.hit("shared", "ip", limit=5, window=60)
+
+
+def test_check_does_not_count():
+    limiter = RateLimiter(MemoryBackend(), clock=_Clock())
+    for _ in range(10):
+        limiter.check("f", "user", limit=2, window=60)
+    limiter.record("f", "user", window=60)
+    limiter.record("f", "user", window=60)
+    with pytest.raises(HTTPException):
+        limiter.check("f", "user", limit=2, window=60)
+
+
+def _request(forwarded: str | None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.9", 1234)})
+
+
+def test_client_ip_is_taken_from_the_trusted_proxy_hop():
+    # клиент подставил свой заголовок, прокси Render дописал реальный адрес справа
+    spoofed = _request("1.2.3.4, 203.0.113.7")
+    assert get_client_ip(spoofed, trusted_hops=1) == "203.0.113.7"
+    assert get_client_ip(spoofed, trusted_hops=2) == "1.2.3.4"
+    assert get_client_ip(_request("203.0.113.7"), trusted_hops=2) == "203.0.113.7"
+    assert get_client_ip(spoofed, trusted_hops=0) == "10.0.0.9"
+    assert get_client_ip(_request(None), trusted_hops=1) == "10.0.0.9"
+    assert get_client_ip(_request(" , "), trusted_hops=1) == "10.0.0.9"
+
+
+def test_forwarded_header_is_ignored_without_a_configured_proxy():
+    from app.core import rate_limit
+
+    assert rate_limit.TRUSTED_PROXY_HOPS == 0  # Default: kein Proxy davor
+    assert get_client_ip(_request("1.2.3.4")) == "10.0.0.9"
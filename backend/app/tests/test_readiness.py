@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.db.query_stats import QueryStats, _current
+from app.db.readiness import ReadinessCheck
+from app.db.session import engine
+from app.main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_livez_and_readyz_do_not_query_the_database():
+    client = TestClient(app)
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        assert client.get("/livez").json() == {"status": "ok"}
+        response = client.get("/readyz")
+    finally:
+        _current.reset(token)
+    assert response.status_code == 200  # startup-Thread hat bereits geprüft
+    assert response.json()["ready"] is True
+    assert stats.count == 0
+
+
+def test_result_is_cached_and_expires():
+    clock = FakeClock()
+    check = ReadinessCheck(engine, interval=10, timeout=2, clock=clock)
+    assert check.status() == {"ready": False, "error": "not checked yet", "db_latency_ms": None,
+                              "checked_seconds_ago": None}
+
+    assert check.check() is True
+    clock.now += 11
+    assert check.status()["ready"] is True
+    clock.now += 2  # länger als interval + timeout keine Prüfung
+    assert check.status()["error"] == "stale"
+
+
+def test_slow_or_failing_database_is_not_ready():
+    clock = FakeClock()
+    check = ReadinessCheck(engine, interval=10, timeout=2, clock=clock)
+    check.check()
+    check._running_since = clock.now  # Prüfung hängt
+    clock.now += 3
+    assert check.status() == {"ready": False, "error": "timeout", "db_latency_ms": 0.0, "checked_seconds_ago": 3.0}
+
+    broken = ReadinessCheck(create_engine("sqlite:////nonexistent/dir/db.sqlite"), clock=clock)
+    assert broken.check() is False
+    assert broken.status()["error"] == "OperationalError"
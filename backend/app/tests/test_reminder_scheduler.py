@@ -0,0 +1,116 @@
+import secrets
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.db.session import SessionLocal, engine
+from app.models.booking import Booking
+from app.models.email_outbox import EmailOutbox
+from app.models.scheduler_cursor import SchedulerCursor
+from app.services import email_outbox
+from app.services.booking_service import reschedule_booking_logic, set_booking_status
+from app.services.email_service import reminder_dedupe_key
+from app.services.reminder_scheduler import CURSOR_NAME, ReminderScheduler, reminder_scheduler
+
+NOW = datetime(2040, 3, 5, 8, 0)
+
+
+class _Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture
+def bookings(monkeypatch):
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_outbox, "MAIL_FROM", "crm@example.com")
+
+    def add(name, hours, status="booked", email="kunde@example.com", booked_hours_before=72):
+        start = NOW + timedelta(hours=hours)
+        db.add(Booking(
+            client_name=name, phone="0", email=email, service_id=1, service_price=10,
+            start_time=start, end_time=start + timedelta(minutes=30), status=status,
+            cancel_token=secrets.token_urlsafe(16), created_at=start - timedelta(hours=booked_hours_before),
+        ))
+
+    db = SessionLocal()
+    db.query(SchedulerCursor).filter(SchedulerCursor.name == CURSOR_NAME).delete()
+    add("A", 2)
+    add("B", 23)
+    add("C", 30)
+    add("late", 5, booked_hours_before=1)
+    add("cancelled", 3, status="cancelled")
+    add("no-email", 4, email=None)
+    db.commit()
+    yield
+    db.query(Booking).filter(Booking.start_time >= NOW).delete()
+    db.query(EmailOutbox).filter(EmailOutbox.dedupe_key.like("booking:%:reminder:%")).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def _reminded() -> list[str]:
+    db = SessionLocal()
+    try:
+        keys = {key for key, in db.query(EmailOutbox.dedupe_key)}
+        rows = db.query(Booking).filter(Booking.start_time >= NOW).order_by(Booking.start_time)
+        return [booking.client_name for booking in rows if reminder_dedupe_key(booking) in keys]
+    finally:
+        db.close()
+
+
+def test_reminders_are_queued_once_in_batches(bookings):
+    clock = _Clock(NOW)
+    scheduler = ReminderScheduler(clock=clock, hours=24, batch_size=2)
+
+    assert scheduler.tick() == 2
+    assert _reminded() == ["A", "B"]
+
+    # next tick, a restart or a second process: nothing new
+    assert scheduler.tick() == 0
+    assert ReminderScheduler(clock=clock, hours=24, batch_size=2).tick() == 0
+
+    clock.now += timedelta(hours=7)
+    assert scheduler.tick() == 1
+    assert _reminded() == ["A", "B", "C"]
+
+
+def test_lost_cursor_does_not_duplicate_reminders(bookings):
+    scheduler = ReminderScheduler(clock=_Clock(NOW), hours=24)
+    assert scheduler.tick() == 2
+
+    db = SessionLocal()
+    db.query(SchedulerCursor).filter(SchedulerCursor.name == CURSOR_NAME).delete()
+    db.commit()
+    db.close()
+
+    scheduler.tick()
+    assert _reminded() == ["A", "B"]
+
+
+def test_rescheduled_booking_gets_a_reminder_for_the_new_time(bookings, monkeypatch):
+    assert ReminderScheduler(clock=_Clock(NOW), hours=24).tick() == 2  # A, B; Cursor steht bei B (+23h)
+    monkeypatch.setattr(reminder_scheduler, "_clock", _Clock(NOW))
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+
+    db = SessionLocal()
+    try:
+        by_name = {b.client_name: b for b in db.query(Booking).filter(Booking.start_time >= NOW)}
+        # C (+30h, noch vor dem Cursor-Fenster) rückt hinter den Cursor, A wird nach erster Erinnerung verschoben
+        reschedule_booking_logic(db, by_name["C"], NOW + timedelta(hours=8))
+        reschedule_booking_logic(db, by_name["A"], NOW + timedelta(hours=6, minutes=30))
+        set_booking_status(db, by_name["B"], "cancelled")
+        keys = db.query(EmailOutbox.dedupe_key).filter(EmailOutbox.dedupe_key.like("booking:%:reminder:%")).all()
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert not [sql for sql in statements if "scheduler_cursors" in sql]  # Requests warten nie auf den Tick
+    assert _reminded() == ["A", "C"]
+    assert len(keys) == 2  # alte Erinnerungen für A und B (noch nicht gesendet) sind entfernt
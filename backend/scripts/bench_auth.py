@@ -0,0 +1,76 @@
+"""
+Бенчмарк аутентификации: стоимость get_current_user на запрос.
+  before — прежний путь: decode JWT + SELECT users по id на каждый запрос
+  after  — текущий: decode JWT + реестр пользователей в памяти (версия проверяется раз в N секунд)
+Каждая итерация открывает свою сессию, как get_db в запросе; считаются и SQL-запросы.
+Запуск: из корня backend: python -m scripts.bench_auth --requests 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+from sqlalchemy import event
+
+from app.core.security import ALGORITHM, SECRET_KEY, create_user_token, get_current_user
+from app.db.session import Base, SessionLocal, engine
+from app.models.user import User
+
+
+def before(token: str, db):
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return db.query(User).filter(User.id == payload["user_id"]).first()
+
+
+def after(token: str, db):
+    return get_current_user(token, db)
+
+
+def run(name: str, fn, token: str, requests: int) -> None:
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        for _ in range(requests):
+            db = SessionLocal()
+            try:
+                fn(token, db)
+            finally:
+                db.close()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    print(f"{name:6} {elapsed / requests * 1e6:8.1f} µs/request  "
+          f"{requests / elapsed:9.0f} req/s  {statements[0] / requests:.3f} queries/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_current_user overhead: DB lookup vs in-memory registry")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).first()
+        if user is None:
+            sys.exit("No users in the database (start the app once to create the owner).")
+        token = create_user_token(user)
+        after(token, db)  # warm up the registry
+    finally:
+        db.close()
+
+    run("before", before, token, args.requests)
+    run("after", after, token, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Бенчмарк публичного API: async-путь (app.main, /public на AsyncSession) против того же
+эндпоинта на sync-сессии (sync_app ниже: def-хендлер + create_booking_logic, как было раньше).
+Оба варианта запускаются через uvicorn с одинаковым числом воркеров; нагрузка — httpx.
+
+  POST /public/bookings      — каждая заявка на свой слот (без конфликтов)
+  GET  /public/availability  — неделя свободных слотов
+
+Без DATABASE_URL каждый прогон идёт на своей временной SQLite-базе; с DATABASE_URL (Postgres)
+прогоны используют разные диапазоны дат, записи остаются в базе ("Bench ..." в client_name).
+Запуск: из корня backend: python -m scripts.bench_public_api --requests 1000 --concurrency 100 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI, Query
+from sqlalchemy.orm import Session
+
+from app.core.rate_limit import booking_rate_limit
+from app.db.session import get_db
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.routers.public import PublicBookingRequest
+from app.services.booking_service import create_booking_logic
+
+# -----------------------------------------------------
+# Sync-вариант для сравнения (тот же код, что /public до перехода на async)
+# -----------------------------------------------------
+sync_app = FastAPI(title="public API, sync session")
+
+
+@sync_app.post("/public/bookings", dependencies=[Depends(booking_rate_limit)])
+def sync_create_public_booking(
+    data: PublicBookingRequest,
+    db: Session = Depends(get_db),
+):
+    booking = create_booking_logic(
+        db=db,
+        client_name=data.client_name,
+        phone=data.phone,
+        email=data.email,
+        service_id=data.service_id,
+        start_time=data.start_time,
+        source="website",
+        created_by=None,
+        marketing_consent=data.marketing_consent,
+        send_confirmation=True,
+    )
+    return {"message": "Booking created", "id": booking.id}
+
+
+@sync_app.get("/public/availability")
+def sync_public_availability(
+    service_id: int,
+    from_date: str = Query(..., alias="from"),
+    to: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    from app.routers.public import _availability
+
+    first_day = datetime.strptime(from_date, "%Y-%m-%d").date()
+    last_day = datetime.strptime(to, "%Y-%m-%d").date()
+    return _availability(db, service_id, first_day, last_day)
+
+
+APPS = {
+    "async": "app.main:app",
+    "sync": "scripts.bench_public_api:sync_app",
+}
+
+
+# -----------------------------------------------------
+# Нагрузка
+# -----------------------------------------------------
+def _booking_slots(first_day: date, count: int, duration: int):
+    """Непересекающиеся слоты в рабочие часы (Пн–Пт 08:00–17:00 по умолчанию)."""
+    step = timedelta(minutes=-(-duration // 30) * 30)
+    day = first_day
+    slots = []
+    while len(slots) < count:
+        if day.weekday() < 5:
+            start = datetime(day.year, day.month, day.day, 8)
+            while start + step <= datetime(day.year, day.month, day.day, 17) and len(slots) < count:
+                slots.append(start)
+                start += step
+        day += timedelta(days=1)
+    return slots, day
+
+
+async def _run_load(base_url: str, make_request, total: int, concurrency: int):
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+        "statuses": statuses,
+    }
+
+
+def _start_server(app_path: str, port: int, workers: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{app_path} did not start")
+
+
+def _prepare_database(env: dict) -> None:
+    """Таблицы + owner/настройки/услуги через startup-события app.main (в отдельном процессе)."""
+    code = "from app.main import app\nfor handler in app.router.on_startup: handler()"
+    subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def bench(mode: str, args, first_day: date) -> tuple[dict, date]:
+    # скрипт играет роль прокси: адрес клиента — из X-Forwarded-For
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), TRUSTED_PROXY_HOPS="1")
+    if not os.getenv("DATABASE_URL"):
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_{mode}.db"
+    _prepare_database(env)
+
+    slots, next_free_day = _booking_slots(first_day, args.requests, args.duration)
+    results = {}
+    proc = _start_server(APPS[mode], args.port, args.workers, env)
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+
+        async def book(client, i):
+            # разные X-Forwarded-For, чтобы не упираться в лимит заявок с одного IP
+            headers = {"X-Forwarded-For": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"}
+            return await client.post("/public/bookings", headers=headers, json={
+                "client_name": f"Bench {i}", "phone": f"+43 {i}", "email": f"bench{i}@example.at",
+                "service_id": args.service_id, "start_time": slots[i].isoformat(),
+            })
+
+        async def availability(client, i):
+            day = first_day + timedelta(days=random.randint(0, 30))
+            params = {"service_id": args.service_id, "from": day.isoformat(), "to": (day + timedelta(days=6)).isoformat()}
+            return await client.get("/public/availability", params=params)
+
+        results["bookings"] = asyncio.run(_run_load(base_url, book, args.requests, args.concurrency))
+        results["availability"] = asyncio.run(_run_load(base_url, availability, args.requests, args.concurrency))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results, next_free_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description="public API: async vs sync session")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (same for both modes)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--service-id", type=int, default=1)
+    parser.add_argument("--duration", type=int, default=60, help="service duration in minutes")
+    parser.add_argument("--mode", choices=["both", "async", "sync"], default="both")
+    args = parser.parse_args()
+
+    first_day = date.today() + timedelta(days=365)
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        results, first_day = bench(mode, args, first_day)
+        for name, r in results.items():
+            print(f"{mode:5} {name:12} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  "
+                  f"p95 {r['p95_ms']:7.1f} ms  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
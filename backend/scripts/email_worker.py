@@ -0,0 +1,38 @@
+"""
+Отправка писем из email_outbox отдельным процессом (вместо потока в web-процессе).
+В web-сервисе при этом выставить EMAIL_OUTBOX_WORKER=off. Можно запускать несколько
+экземпляров: на PostgreSQL строки забираются через FOR UPDATE SKIP LOCKED.
+Запуск: из корня backend: python -m scripts.email_worker [--once]
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.email_outbox import OutboxWorker, drain_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the email outbox")
+    parser.add_argument("--once", action="store_true", help="send one batch and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.once:
+        print(drain_once())
+        return
+
+    worker = OutboxWorker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop(timeout=0))
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Index advisor: EXPLAIN для основных запросов роутеров, отмечает полные сканы таблиц.
+SQLite: строки "SCAN <table>" без индекса; PostgreSQL: узлы "Seq Scan".
+
+С --seed N во временной транзакции добавляются N синтетических записей (bookings,
+work_times, customers) и выполняется ANALYZE; в конце всё откатывается, БД не меняется.
+Код выхода 1, если найден неожиданный полный скан.
+Запуск: из корня backend: python -m scripts.explain_queries --seed 20000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+from datetime import date, datetime, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.db.session import Base, engine
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.models.booking import Booking, BookingSource, BookingStatus
+from app.models.booking_stats import DailyBookingStats
+from app.models.customer import Customer
+from app.models.work_time import WorkTime
+from app.routers.owner import export_filter
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.stmt, **kw)
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+def representative_queries(day: date, worker_id: int):
+    """(name, statement, tables where a full scan is fine) — те же фильтры, что в роутерах/сервисах."""
+    day_start = datetime.combine(day, time.min)
+    start = datetime.combine(day, time(10, 0))
+    end = start + timedelta(minutes=60)
+    cursor_start, cursor_id = start, 1
+
+    return [
+        ("overlap check (booking_service._check_overlap)",
+         select(Booking.id).where(
+             Booking.status.in_(("booked",)),
+             Booking.start_time < end,
+             Booking.end_time > start,
+         ).limit(1), ()),
+        ("availability index load (/public/availability, by-date)",
+         select(Booking.start_time, Booking.end_time, Booking.id).where(
+             Booking.status == BookingStatus.booked,
+             Booking.start_time >= day_start,
+             Booking.start_time < day_start + timedelta(days=7),
+         ), ()),
+        ("booking list page (/owner/bookings, keyset)",
+         select(Booking.id, Booking.client_name, Booking.start_time).where(
+             Booking.start_time >= day_start,
+             Booking.start_time < day_start + timedelta(days=7),
+             or_(Booking.start_time > cursor_start,
+                 and_(Booking.start_time == cursor_start, Booking.id > cursor_id)),
+         ).order_by(Booking.start_time, Booking.id).limit(501), ()),
+        ("booking list page by worker (/owner/bookings?worker_id)",
+         select(Booking.id, Booking.start_time).where(
+             Booking.start_time >= day_start,
+             Booking.start_time < day_start + timedelta(days=7),
+             Booking.created_by == worker_id,
+         ).order_by(Booking.start_time, Booking.id).limit(501), ()),
+        ("worker bookings by date (/worker/bookings/by-date)",
+         select(Booking).where(
+             Booking.created_by == worker_id,
+             Booking.start_time >= day_start,
+             Booking.start_time < day_start + timedelta(days=1),
+         ).order_by(Booking.start_time), ()),
+        ("cancel by token (/public/cancel)",
+         select(Booking.id).where(Booking.cancel_token == "x"), ()),
+        ("export range (/owner/export)",
+         select(Booking.id, Service.name).outerjoin(Service, Service.id == Booking.service_id)
+         .where(*export_filter(day_start, day_start + timedelta(days=31)))
+         .order_by(Booking.start_time), ("services",)),
+        ("open shift (/worker/worktime/start|end)",
+         select(WorkTime.id).where(
+             WorkTime.worker_id == worker_id,
+             WorkTime.date == day,
+             WorkTime.end_time.is_(None),
+         ), ()),
+        ("worktime list (/worker/worktime)",
+         select(WorkTime).where(WorkTime.worker_id == worker_id)
+         .order_by(WorkTime.date.desc(), WorkTime.start_time.desc()), ()),
+        ("customer lookup (customer_service.find_customer)",
+         select(Customer.id).where(Customer.email_normalized == "a@b.at"), ()),
+        ("customers list (/owner/customers)",
+         select(Customer).where(Customer.email_normalized.isnot(None))
+         .order_by(Customer.last_booking_at.desc()).limit(100), ()),
+        # Rollup is small (days x sources x services x workers x statuses), scanning it is fine
+        ("analytics rollup (/owner/analytics)",
+         select(DailyBookingStats.status, func.sum(DailyBookingStats.bookings))
+         .group_by(DailyBookingStats.status), ("daily_booking_stats",)),
+    ]
+
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?(?: LEFT-JOIN)?$")
+
+
+def _sqlite_plan(conn, stmt):
+    rows = conn.execute(Explain(stmt)).fetchall()
+    lines = [row[3] for row in rows]
+    scans = [m.group(1) for m in (_SQLITE_SCAN.match(line) for line in lines) if m]
+    return lines, scans
+
+
+def _pg_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _pg_nodes(child)
+
+
+def _pg_plan(conn, stmt):
+    raw = conn.execute(Explain(stmt)).scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    lines, scans = [], []
+    for node in _pg_nodes(plan):
+        relation = node.get("Relation Name")
+        index = node.get("Index Name")
+        lines.append(" ".join(p for p in (node["Node Type"], relation, index and f"using {index}") if p))
+        if node["Node Type"] == "Seq Scan":
+            scans.append(relation)
+    return lines, scans
+
+
+def seed(conn, n: int, day: date) -> int:
+    """Synthetic data around `day`; returns the worker id used in the queries."""
+    service_id = conn.execute(select(Service.id).limit(1)).scalar()
+    if service_id is None:
+        service_id = conn.execute(
+            insert(Service).values(name="explain", price=10, duration=60).returning(Service.id)
+        ).scalar()
+    worker_id = conn.execute(select(User.id).where(User.role == "worker").limit(1)).scalar()
+    if worker_id is None:
+        worker_id = conn.execute(
+            insert(User).values(username="explain-worker", password_hash="-", role="worker", is_active=True)
+            .returning(User.id)
+        ).scalar()
+
+    rnd = random.Random(42)
+    statuses = list(BookingStatus)
+    sources = list(BookingSource)
+    bookings, customers = [], []
+    for i in range(n):
+        start = datetime.combine(day - timedelta(days=rnd.randint(-180, 180)), time(8)) + timedelta(
+            minutes=30 * rnd.randint(0, 20)
+        )
+        bookings.append({
+            "client_name": f"Seed {i}", "phone": f"+43 {i}", "email": f"seed{i}@example.at",
+            "service_id": service_id, "service_price": 10,
+            "start_time": start, "end_time": start + timedelta(minutes=60),
+            "status": rnd.choice(statuses), "source": rnd.choice(sources),
+            "cancel_token": f"explain-{i}", "marketing_consent": False,
+            "created_by": worker_id if i % 3 == 0 else None, "created_at": start,
+        })
+        customers.append({
+            "name": f"Seed {i}", "email": f"seed{i}@example.at", "phone": f"+43 {i}",
+            "email_normalized": f"seed{i}@example.at", "phone_normalized": f"+43{i}",
+            "total_bookings": 1, "last_booking_at": start, "marketing_consent": False,
+            "created_at": start,
+        })
+    conn.execute(insert(Booking), bookings)
+    conn.execute(insert(Customer), customers)
+    conn.execute(insert(WorkTime), [
+        {"worker_id": worker_id, "start_time": datetime.combine(day - timedelta(days=i), time(8)),
+         "end_time": datetime.combine(day - timedelta(days=i), time(16)), "pause_minutes": 30,
+         "total_hours": 7.5, "date": day - timedelta(days=i), "created_at": datetime.combine(day, time(16))}
+        for i in range(1, max(2, n // 20))
+    ])
+    conn.exec_driver_sql("ANALYZE")
+    return worker_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="synthetic bookings to add (rolled back)")
+    args = parser.parse_args()
+
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        plan = _sqlite_plan
+    elif dialect == "postgresql":
+        plan = _pg_plan
+    else:
+        sys.exit(f"EXPLAIN is not supported for {dialect}")
+
+    Base.metadata.create_all(bind=engine)
+    day = date.today()
+    problems = 0
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            worker_id = seed(conn, args.seed, day) if args.seed else 1
+            for name, stmt, scan_ok in representative_queries(day, worker_id):
+                lines, scans = plan(conn, stmt)
+                flagged = any(table not in scan_ok for table in scans)
+                problems += flagged
+                print(f"{'SEQ SCAN' if flagged else 'ok':8}  {name}")
+                for line in lines:
+                    print(f"          {line}")
+        finally:
+            trans.rollback()
+
+    print(f"\n{problems} quer{'y' if problems == 1 else 'ies'} with unexpected full scans.")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
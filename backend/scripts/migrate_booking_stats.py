@@ -0,0 +1,55 @@
+"""
+Миграция: уникальный ключ daily_booking_stats и первичное заполнение агрегатов.
+- таблицы ещё нет — создаётся (с уникальными индексами);
+- старый неуникальный индекс ix_daily_booking_stats_key — агрегаты пересчитываются из bookings
+  (возможные дубли ключа сливаются), индекс заменяется уникальными;
+- таблица пуста, а записи есть — агрегаты заполняются из bookings.
+Выполняется один раз в build-шаге (не при старте каждого uvicorn-воркера). Повторный запуск безопасен.
+Запуск: из корня backend: python -m scripts.migrate_booking_stats
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.db.session import engine, SessionLocal
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.models.booking import Booking
+from app.models.booking_stats import DailyBookingStats
+from app.services.booking_stats import rebuild_booking_stats
+
+OLD_INDEX = "ix_daily_booking_stats_key"
+
+
+def main():
+    table = DailyBookingStats.__table__
+    table.create(bind=engine, checkfirst=True)
+    old_index = OLD_INDEX in {ix["name"] for ix in inspect(engine).get_indexes(table.name)}
+
+    db = SessionLocal()
+    try:
+        empty = db.query(DailyBookingStats.id).first() is None
+        if old_index or (empty and db.query(Booking.id).first() is not None):
+            if old_index:
+                db.execute(text(f"DROP INDEX {OLD_INDEX}"))
+                print(f"Dropped non-unique index {OLD_INDEX}.")
+            rows = rebuild_booking_stats(db)
+            db.flush()
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                index.create(bind=db.connection(), checkfirst=True)
+                print(f"Index {index.name} ensured.")
+            db.commit()
+            print(f"Booking stats rebuilt ({rows} rows).")
+        else:
+            print("Booking stats up to date.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
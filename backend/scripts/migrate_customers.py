@@ -0,0 +1,99 @@
+"""
+Миграция: таблица customers + bookings.customer_id и заполнение для существующих записей.
+Заполнение идёт пачками (BATCH_SIZE) по id; повторный запуск обрабатывает только записи
+без customer_id, поэтому скрипт можно прерывать и запускать снова.
+Запуск: из корня backend: python -m scripts.migrate_customers
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, update
+from app.db.session import engine, SessionLocal
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.models.booking import Booking
+from app.models.customer import Customer
+from app.services.customer_service import apply_booking, find_customer, normalize_email, normalize_phone
+
+BATCH_SIZE = int(os.getenv("MIGRATE_BATCH_SIZE", "1000"))
+
+
+def add_column():
+    Customer.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE bookings ADD COLUMN customer_id INTEGER REFERENCES customers(id)"))
+            print("Added column bookings.customer_id.")
+        except Exception as e:
+            if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
+                print("Column bookings.customer_id already exists.")
+            else:
+                raise
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_customer_id ON bookings (customer_id)"))
+
+
+def backfill():
+    db = SessionLocal()
+    cache = {}  # ("e", email) / ("p", phone) -> Customer
+    last_id = 0
+    total = 0
+    try:
+        while True:
+            rows = (
+                db.query(
+                    Booking.id, Booking.client_name, Booking.email, Booking.phone,
+                    Booking.start_time, Booking.marketing_consent,
+                )
+                .filter(Booking.customer_id.is_(None), Booking.id > last_id)
+                .order_by(Booking.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not rows:
+                break
+
+            assignments = []
+            for booking_id, name, email, phone, start_time, consent in rows:
+                email_key, phone_key = normalize_email(email), normalize_phone(phone)
+                key = ("e", email_key) if email_key else ("p", phone_key) if phone_key else None
+                if key is None:
+                    continue
+                customer = cache.get(key) or find_customer(db, email, phone)
+                if customer is None:
+                    customer = Customer(
+                        name=name, email=email.strip() if email_key else None, phone=phone,
+                        email_normalized=email_key, phone_normalized=phone_key,
+                        total_bookings=0, marketing_consent=False,
+                    )
+                    db.add(customer)
+                    db.flush()
+                cache[key] = customer
+                customer.total_bookings += 1  # Skript läuft allein, Zählen im Speicher reicht
+                apply_booking(customer, name, email.strip() if email_key else None, phone, start_time, bool(consent))
+                assignments.append({"id": booking_id, "customer_id": customer.id})
+
+            if assignments:
+                db.execute(update(Booking), assignments)
+            db.commit()
+            last_id = rows[-1][0]
+            total += len(assignments)
+            print(f"  ... {total} booking(s) linked (up to id {last_id})")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"Backfill done: {total} booking(s) linked to customers.")
+
+
+def run():
+    add_column()
+    backfill()
+    print("Done.")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,31 @@
+"""
+Миграция: колонка email_outbox.html_body (HTML-часть писем из шаблонов .html).
+Таблица без неё создана create_all до появления шаблонов; новые БД получают колонку сразу.
+Запуск: из корня backend: python -m scripts.migrate_email_html
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.db.session import engine
+
+
+def run():
+    if not inspect(engine).has_table("email_outbox"):
+        print("Table email_outbox does not exist yet (created on app startup).")
+        return
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE email_outbox ADD COLUMN html_body TEXT"))
+            print("Added column email_outbox.html_body.")
+        except Exception as e:
+            if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
+                print("Column email_outbox.html_body already exists.")
+            else:
+                raise
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,41 @@
+"""
+Миграция: составные индексы для bookings и work_times (см. __table_args__ моделей).
+create_all создаёт их только для новых таблиц; здесь они добавляются в существующую БД.
+Повторный запуск безопасен (checkfirst).
+Запуск: из корня backend: python -m scripts.migrate_indexes
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+from app.db.session import engine
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.models.booking import Booking
+from app.models.work_time import WorkTime
+
+TABLES = (Booking.__table__, WorkTime.__table__)
+
+
+def main():
+    inspector = inspect(engine)
+    for table in TABLES:
+        if not inspector.has_table(table.name):
+            print(f"Table {table.name} does not exist yet, skipped (create_all will add the indexes).")
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                print(f"Index {index.name} already exists.")
+                continue
+            index.create(bind=engine, checkfirst=True)
+            print(f"Created index {index.name}.")
+    if engine.dialect.name in ("sqlite", "postgresql"):
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+
+if __name__ == "__main__":
+    main()
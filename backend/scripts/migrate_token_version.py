@@ -0,0 +1,28 @@
+"""
+Миграция: колонка users.token_version (версия JWT для отзыва токенов).
+Существующие пользователи получают 0 — их текущие токены (без "tv") остаются действительными.
+Запуск: из корня backend: python -m scripts.migrate_token_version
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def run():
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER DEFAULT 0 NOT NULL"))
+            print("Added column users.token_version.")
+        except Exception as e:
+            if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
+                print("Column users.token_version already exists.")
+            else:
+                raise
+
+
+if __name__ == "__main__":
+    run()
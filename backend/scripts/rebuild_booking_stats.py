@@ -0,0 +1,34 @@
+"""
+Пересчёт таблицы daily_booking_stats из bookings (аналитика владельца).
+Нужен после ручных правок bookings в БД или если агрегаты разошлись.
+Запуск: из корня backend: python -m scripts.rebuild_booking_stats
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db.session import SessionLocal, engine, Base
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.models.booking import Booking
+from app.models.booking_stats import DailyBookingStats
+from app.services.booking_stats import rebuild_booking_stats
+
+
+def main():
+    Base.metadata.create_all(bind=engine, tables=[DailyBookingStats.__table__])
+    db = SessionLocal()
+    try:
+        rows = rebuild_booking_stats(db)
+        db.commit()
+        print(f"Done. {rows} aggregate row(s) written.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Напоминания о записях отдельным процессом (вместо потока в web-процессе).
+В web-сервисе при этом выставить REMINDER_SCHEDULER=off. Письма отправляет воркер email_outbox.
+Запуск: из корня backend: python -m scripts.reminder_scheduler [--once]
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.user import User  # load before Booking so relationship("User") resolves
+from app.models.service import Service
+from app.services.reminder_scheduler import reminder_loop, reminder_scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue appointment reminder e-mails")
+    parser.add_argument("--once", action="store_true", help="run one tick and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.once:
+        print(f"Reminders queued: {reminder_scheduler.tick()}")
+        return
+
+    signal.signal(signal.SIGTERM, lambda *_: reminder_loop.stop(timeout=0))
+    try:
+        reminder_loop.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app.db.session import SessionLocal
 from app.models.user import User
-from app.core.security import hash_password
+from app.core.security import hash_password, invalidate_users, revoke_tokens
 
 
 def main():
@@ -33,6 +33,8 @@ def main():
             print("Error: No user 'owner' found in database.")
             sys.exit(1)
         owner.password_hash = hash_password(password)
+        revoke_tokens(owner)  # sign out existing sessions
+        invalidate_users(db)
         db.commit()
         print("OK: Owner password updated. Log in with username 'owner' and your new password.")
     finally:
@@ -13,6 +13,7 @@ from app.db.session import SessionLocal
 from app.models.user import User  # load before Booking so relationship("User") resolves
 from app.models.service import Service
 from app.models.booking import Booking
+from app.services.catalog_cache import invalidate_services
 
 SERVICES = {
     "car_spa": {
@@ -117,6 +118,8 @@ def main():
             db.add(s)
             print(f"  + {data['name']} (€{data['price']}, {data['duration']} min)")
 
+        # работающие uvicorn-воркеры увидят новую версию каталога
+        invalidate_services(db)
         db.commit()
         print("Done. Services seeded.")
     except Exception as e:
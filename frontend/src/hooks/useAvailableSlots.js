@@ -1,19 +1,20 @@
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useRef } from "react";
+import { addDays } from "date-fns";
 import { publicApi } from "../lib/api";
-import {
-  formatDate,
-  generateTimeSlots,
-  combineDateAndTime,
-  addDuration,
-  isWorkingDay,
-} from "../utils/date";
+import { formatDate } from "../utils/date";
 import { getErrorMessage } from "../utils/error";
 
+// Backend liefert freie Startzeiten für eine ganze Woche auf einmal
+const RANGE_DAYS = 7;
+const CACHE_MAX_AGE_MS = 60 * 1000;
+
 export function useAvailableSlots(date, service) {
   const [settings, setSettings] = useState(null);
-  const [bookings, setBookings] = useState([]);
+  const [slots, setSlots] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  // "serviceId:yyyy-MM-dd" -> { times: ["08:00", ...], at: Date.now() }
+  const cache = useRef(new Map());
 
   useEffect(() => {
     let cancelled = false;
@@ -32,47 +33,36 @@ export function useAvailableSlots(date, service) {
     return () => { cancelled = true; };
   }, []);
 
+  const serviceId = service?.id;
+
   useEffect(() => {
-    if (!settings || !date) {
-      setBookings([]);
+    if (!settings || !date || serviceId == null) {
+      setSlots([]);
       return;
     }
     let cancelled = false;
     const d = formatDate(date);
+    const key = `${serviceId}:${d}`;
+    const cached = cache.current.get(key);
+    if (cached && Date.now() - cached.at < CACHE_MAX_AGE_MS) {
+      setSlots(cached.times);
+      return;
+    }
     publicApi
-      .getBookingsByDate(d)
+      .getAvailability(serviceId, d, formatDate(addDays(date, RANGE_DAYS - 1)))
       .then((data) => {
-        if (!cancelled) setBookings(Array.isArray(data) ? data : []);
+        const days = data?.days ?? {};
+        const at = Date.now();
+        for (const [day, times] of Object.entries(days)) {
+          cache.current.set(`${serviceId}:${day}`, { times, at });
+        }
+        if (!cancelled) setSlots(days[d] ?? []);
       })
       .catch(() => {
-        if (!cancelled) setBookings([]);
+        if (!cancelled) setSlots([]);
       });
     return () => { cancelled = true; };
-  }, [settings, date]);
-
-  const slots = useMemo(() => {
-    if (!settings) return [];
-    const start = settings.work_start?.slice(0, 5) || "09:00";
-    const end = settings.work_end?.slice(0, 5) || "18:00";
-    return generateTimeSlots(start, end, 30);
-  }, [settings]);
-
-  const duration = service?.duration ?? 30;
-
-  const availableSlots = useMemo(() => {
-    if (!date || !settings) return [];
-    if (!isWorkingDay(date, settings)) return [];
-    return slots.filter((timeStr) => {
-      const slotStart = combineDateAndTime(date, timeStr);
-      const slotEnd = addDuration(slotStart, duration);
-      for (const b of bookings) {
-        const bookingStart = new Date(b.start_time);
-        const bookingEnd = new Date(b.end_time);
-        if (slotStart < bookingEnd && slotEnd > bookingStart) return false;
-      }
-      return true;
-    });
-  }, [date, settings, slots, bookings, duration]);
+  }, [settings, date, serviceId]);
 
-  return { settings, slots: availableSlots, loading, error };
+  return { settings, slots, loading, error };
 }
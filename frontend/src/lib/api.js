@@ -46,6 +46,8 @@ export const publicApi = {
   getServices: () => api.get("/public/services").then((r) => r.data),
   getBookingsByDate: (date) =>
     api.get("/public/bookings/by-date", { params: { date } }).then((r) => r.data),
+  getAvailability: (service_id, from, to) =>
+    api.get("/public/availability", { params: { service_id, from, to } }).then((r) => r.data),
   createBooking: (body) => api.post("/public/bookings", body).then((r) => r.data),
   cancelByToken: (token) => api.get(`/public/cancel/${token}`).then((r) => r.data),
 };
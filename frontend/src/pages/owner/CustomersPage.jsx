@@ -1,30 +1,48 @@
 import { useEffect, useState } from "react";
 import toast from "react-hot-toast";
 import Layout from "../../components/Layout";
-import { Card, Button } from "../../components/ui";
+import { Card, Button, Input } from "../../components/ui";
 import { ownerApi } from "../../lib/api";
 import { getErrorMessage } from "../../utils/error";
 
+const PAGE_SIZE = 100;
+
 export default function CustomersPage() {
   const [customers, setCustomers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [hasMore, setHasMore] = useState(false);
   const [marketingOnly, setMarketingOnly] = useState(false);
+  const [search, setSearch] = useState("");
   const [exporting, setExporting] = useState(false);
 
-  const load = () => {
-    setLoading(true);
-    const params = marketingOnly ? { marketing: true } : {};
+  const load = (offset = 0) => {
+    if (offset === 0) setLoading(true);
+    else setLoadingMore(true);
+    const params = { limit: PAGE_SIZE, offset };
+    if (marketingOnly) params.marketing = true;
+    if (search.trim()) params.search = search.trim();
     ownerApi
       .getCustomers(params)
-      .then((data) => setCustomers(Array.isArray(data) ? data : []))
+      .then((data) => {
+        const page = Array.isArray(data) ? data : [];
+        setCustomers((prev) => (offset === 0 ? page : [...prev, ...page]));
+        setHasMore(page.length === PAGE_SIZE);
+      })
       .catch(() => {
         toast.error(getErrorMessage(null, "Kunden konnten nicht geladen werden."));
-        setCustomers([]);
+        if (offset === 0) setCustomers([]);
       })
-      .finally(() => setLoading(false));
+      .finally(() => {
+        setLoading(false);
+        setLoadingMore(false);
+      });
   };
 
-  useEffect(() => load(), [marketingOnly]);
+  useEffect(() => {
+    const t = setTimeout(() => load(0), 300);
+    return () => clearTimeout(t);
+  }, [marketingOnly, search]);
 
   const handleExport = async () => {
     setExporting(true);
@@ -56,6 +74,11 @@ export default function CustomersPage() {
           />
           Nur mit Marketing-Zustimmung
         </label>
+        <Input
+          placeholder="Suche (Name, Email, Telefon)"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+        />
         <Button size="sm" onClick={handleExport} loading={exporting}>
           Export CSV
         </Button>
@@ -97,6 +120,11 @@ export default function CustomersPage() {
               </tbody>
             </table>
           </div>
+          {hasMore && (
+            <Button size="sm" variant="secondary" onClick={() => load(customers.length)} loading={loadingMore}>
+              Mehr laden
+            </Button>
+          )}
         </Card>
       )}
     </Layout>
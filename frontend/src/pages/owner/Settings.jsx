@@ -3,6 +3,7 @@ import toast from "react-hot-toast";
 import Layout from "../../components/Layout";
 import { Card, Button, Input } from "../../components/ui";
 import { ownerApi } from "../../lib/api";
+import { useAuth } from "../../context/AuthContext";
 import { getErrorMessage } from "../../utils/error";
 
 const DAY_LABELS = [
@@ -22,6 +23,7 @@ function timeToInputValue(t) {
 }
 
 export default function Settings() {
+  const { login } = useAuth();
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
   const [workStart, setWorkStart] = useState("09:00");
@@ -82,7 +84,9 @@ export default function Settings() {
     }
     setPasswordSaving(true);
     try {
-      await ownerApi.changePassword(passwordCurrent, passwordNew);
+      const data = await ownerApi.changePassword(passwordCurrent, passwordNew);
+      // alte Tokens sind nach der Änderung ungültig – neuen übernehmen
+      if (data?.access_token) login(data.access_token);
       toast.success("Passwort geändert.");
       setPasswordCurrent("");
       setPasswordNew("");